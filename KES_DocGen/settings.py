@@ -55,6 +55,8 @@ INSTALLED_APPS = [
     "factures_app",
     "opportunites_app",
     "status_traking",
+    "analytics_app",
+    "exports_app",
 ]
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",  # CORS Middleware
@@ -65,8 +67,13 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "document.middleware.IdentityMapMiddleware",
 ]
 
+# Identity map par requête : activée pour les vues qui déclarent
+# ``identity_map = True`` ou, si True, pour toutes les vues
+IDENTITY_MAP_ENABLED = False
+
 ROOT_URLCONF = "KES_DocGen.urls"
 
 # Configuration de l'authentification
@@ -174,6 +181,18 @@ STATICFILES_DIRS = [
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Matrice de co-occurrence des produits (commande construire_cooccurrences)
+COOCCURRENCE_PRODUITS_FICHIER = BASE_DIR / "var" / "cooccurrence_produits.npz"
+
+# Exports en arrière-plan (exports_app.jobs) : threads et durée de réutilisation (s)
+EXPORTS_WORKERS = 2
+EXPORTS_TTL = 3600
+# Au-delà (s), un export « en cours » est considéré comme interrompu
+EXPORTS_DUREE_MAX = 3600
+# Fichiers d'export : hors de MEDIA_ROOT (servi sans contrôle d'accès par
+# nginx), téléchargés uniquement via l'action « telecharger »
+EXPORTS_ROOT = BASE_DIR / "var" / "exports"
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
@@ -183,7 +202,7 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 # Configuration de l'authentification
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "api.authentication.backends.CachedJWTAuthentication",
     ],
     #'DEFAULT_PERMISSION_CLASSES': [
     #   'rest_framework.permissions.IsAuthenticated',
@@ -222,6 +241,15 @@ SIMPLE_JWT = {
     "AUTH_TOKEN_CLASSES": ("rest_framework_simplejwt.tokens.AccessToken",),
 }
 
+# Cache des jetons validés (taille maximale, durée de vie en secondes) ; les
+# révocations passent par le cache CACHE_ALIAS, partagé seulement s'il est
+# adossé à Redis (REDIS_URL), sinon propre à chaque processus
+TOKEN_CACHE = {
+    "MAX_SIZE": 10000,
+    "TTL": 300,
+    "CACHE_ALIAS": "auth",
+}
+
 # Autoriser certaines méthodes (GET, POST, etc.)
 CORS_ALLOW_METHODS = [
     "GET",
@@ -237,6 +265,24 @@ CSRF_TRUSTED_ORIGINS = [
     "http://192.168.1.160",
 ]
 
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "kd-back",
+    },
+    "auth": (
+        {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": os.environ["REDIS_URL"]}
+        if os.environ.get("REDIS_URL")
+        else {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "kd-back-auth"}
+    ),
+}
+
+# Cache stale-while-revalidate des endpoints de statistiques (secondes)
+STATS_CACHE = {
+    "SOFT_TTL": 60,
+    "HARD_TTL": 600,
+}
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
@@ -30,4 +30,6 @@ urlpatterns = [
     path('api/', include('proformas_app.urls')),
     path('api/', include('factures_app.urls')),
     path('api/', include('opportunites_app.urls')),
+    path('api/', include('analytics_app.urls')),
+    path('api/', include('exports_app.urls')),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
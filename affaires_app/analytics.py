@@ -0,0 +1,23 @@
+from analytics_app.pivot import annee, mois, register, trimestre
+
+from .models import Affaire
+
+register(
+    'affaires', Affaire,
+    champ_date='date_creation',
+    dimensions={
+        'statut': 'statut',
+        'entity': 'offre__entity__code',
+        'client': 'offre__client__nom',
+        'produit': 'offre__produit_principal__code',
+        'responsable': 'responsable__username',
+        'mois': mois('date_creation'),
+        'trimestre': trimestre('date_creation'),
+        'annee': annee('date_creation'),
+    },
+    mesures={
+        'montant_total': 'montant_total',
+        'montant_facture': 'montant_facture',
+        'montant_paye': 'montant_paye',
+    },
+)
@@ -1,5 +1,7 @@
 from rest_framework import permissions
 
+from document.permissions import memoize_for_request
+
 
 class AffairePermission(permissions.BasePermission):
     """
@@ -13,6 +15,13 @@ class AffairePermission(permissions.BasePermission):
     - Seuls les utilisateurs avec la permission 'delete_affaire' peuvent supprimer une affaire
     """
     
+    def _has_perm(self, request, perm):
+        """Permission Django mémorisée pour la durée de la requête."""
+        return memoize_for_request(
+            request, ('perm', request.user.pk, perm),
+            lambda: request.user.has_perm(perm)
+        )
+
     def has_permission(self, request, view):
         """Vérifie les permissions au niveau de la vue."""
         # Les utilisateurs non authentifiés n'ont aucun accès
@@ -25,19 +34,19 @@ class AffairePermission(permissions.BasePermission):
         
         # Pour créer une affaire, l'utilisateur doit avoir la permission
         if view.action == 'create':
-            return request.user.has_perm('affaires_app.add_affaire')
+            return self._has_perm(request, 'affaires_app.add_affaire')
         
         # Pour modifier un statut, l'utilisateur doit avoir la permission
         if view.action == 'change_statut':
-            return request.user.has_perm('affaires_app.change_statut_affaire')
+            return self._has_perm(request, 'affaires_app.change_statut_affaire')
         
         # Pour générer une facture
         if view.action == 'generer_facture':
-            return request.user.has_perm('document.add_facture')
+            return self._has_perm(request, 'document.add_facture')
         
         # Pour marquer un rapport comme terminé
         if view.action == 'marquer_rapport_termine':
-            return request.user.has_perm('document.change_rapport')
+            return self._has_perm(request, 'document.change_rapport')
         
         # Pour les autres actions, on vérifie au niveau de l'objet
         return True
@@ -49,27 +58,27 @@ class AffairePermission(permissions.BasePermission):
             return True
         
         # Le créateur de l'affaire a tous les droits dessus
-        if obj.createur == request.user:
+        if obj.createur_id == request.user.pk:
             return True
         
         # Le responsable de l'affaire peut la modifier
-        if obj.responsable == request.user:
+        if obj.responsable_id == request.user.pk:
             return True
         
         # Pour la modification, il faut la permission adéquate
         if view.action in ['update', 'partial_update', 'change_statut']:
-            return request.user.has_perm('affaires_app.change_affaire')
+            return self._has_perm(request, 'affaires_app.change_affaire')
         
         # Pour la suppression, il faut la permission adéquate
         if view.action == 'destroy':
-            return request.user.has_perm('affaires_app.delete_affaire')
+            return self._has_perm(request, 'affaires_app.delete_affaire')
         
         # Pour les actions spécifiques
         if view.action == 'generer_facture':
-            return request.user.has_perm('document.add_facture')
+            return self._has_perm(request, 'document.add_facture')
         
         if view.action == 'marquer_rapport_termine':
-            return request.user.has_perm('document.change_rapport')
+            return self._has_perm(request, 'document.change_rapport')
         
         # Par défaut, on refuse l'accès
         return False
\ No newline at end of file
@@ -11,6 +11,8 @@ from api import user
 from api.user.models import User
 from api.user.serializers import UserSerializer
 from document.utils import log_user_action
+from exports_app.columns import format_date
+from exports_app.mixins import ExportMixin
 from offres_app.models import Offre
 from offres_app.serializers import OffreSerializer
 
@@ -30,12 +32,13 @@ from .filters import AffaireFilter
 from .permissions import AffairePermission
 
 
-class AffaireViewSet(viewsets.ModelViewSet):
+class AffaireViewSet(ExportMixin, viewsets.ModelViewSet):
     """
     ViewSet pour la gestion des affaires.
     Fournit les opérations CRUD standard ainsi que des actions personnalisées.
     """
 
+    identity_map = True
     queryset = Affaire.objects.all()
     permission_classes = [IsAuthenticated, AffairePermission]
     filter_backends = [
@@ -54,6 +57,18 @@ class AffaireViewSet(viewsets.ModelViewSet):
     ]
     ordering = ["-date_creation"]
 
+    export_filename = "affaires"
+    export_columns = [
+        ("Référence", "reference"),
+        ("Client", "offre__client__nom"),
+        ("Date de début", "date_debut", format_date),
+        ("Date de fin prévue", "date_fin_prevue", format_date),
+        ("Statut", "statut"),
+        ("Montant total", "montant_total"),
+        ("Montant facturé", "montant_facture"),
+        ("Montant payé", "montant_paye"),
+    ]
+
     def get_serializer_class(self):
         """Sélectionne le sérialiseur approprié selon l'action."""
         if self.action == ["create", "update"]:
@@ -326,54 +341,6 @@ class AffaireViewSet(viewsets.ModelViewSet):
 
         return Response(data)
 
-    @action(detail=False, methods=["get"])
-    def export_csv(self, request):
-        """
-        Exporte la liste des affaires en CSV.
-        """
-        from django.http import HttpResponse
-        import csv
-
-        # Application des filtres
-        queryset = self.filter_queryset(self.get_queryset())
-
-        response = HttpResponse(content_type="text/csv")
-        response["Content-Disposition"] = 'attachment; filename="affaires.csv"'
-
-        writer = csv.writer(response)
-        writer.writerow(
-            [
-                "Référence",
-                "Client",
-                "Date de début",
-                "Date de fin prévue",
-                "Statut",
-                "Montant total",
-                "Montant facturé",
-                "Montant payé",
-            ]
-        )
-
-        for affaire in queryset:
-            writer.writerow(
-                [
-                    affaire.reference,
-                    affaire.offre.client.nom,
-                    affaire.date_debut.strftime("%d/%m/%Y"),
-                    (
-                        affaire.date_fin_prevue.strftime("%d/%m/%Y")
-                        if affaire.date_fin_prevue
-                        else ""
-                    ),
-                    dict(Affaire.STATUT_CHOICES).get(affaire.statut, affaire.statut),
-                    affaire.montant_total,
-                    affaire.montant_facture,
-                    affaire.montant_paye,
-                ]
-            )
-
-        return response
-
     @action(detail=True, methods=["get"])
     def export_pdf(self, request, pk=None):
         """
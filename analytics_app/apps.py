@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class AnalyticsAppConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'analytics_app'
+
+    def ready(self):
+        # Enregistre les sources de pivot déclarées dans <app>/analytics.py
+        autodiscover_modules('analytics')
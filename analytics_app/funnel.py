@@ -0,0 +1,211 @@
+"""
+Entonnoir de conversion et temps passé par statut, à partir de StatusChange.
+
+Les objets (offres ou affaires) sont regroupés par mois de création. Pour
+une cohorte, l'historique est lu en une seule requête ; la fonction de
+fenêtre ``LAG`` sur (content_type, object_id) ordonnée par
+``date_changement`` donne, pour chaque changement, la date d'entrée dans
+le statut quitté. Le premier changement est rapporté à la date de
+création de l'objet ; une ligne sans ancien statut (création) marque
+seulement le statut initial.
+
+Les changements « RESPONSABLE:… » enregistrés par
+``Affaire.assigner_responsable`` ne sont pas des transitions de statut et
+sont ignorés. Le temps passé dans le statut courant (non terminé) n'est
+pas compté.
+
+Le résultat brut de chaque mois est mis en cache (court pour le mois en
+cours, plus long pour les mois passés) ; la commande
+``calculer_entonnoir`` le précalcule.
+"""
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db.models import F, Window
+from django.db.models.functions import Lag
+from django.utils import timezone
+
+from status_traking.models import PREFIXE_PSEUDO_STATUT, StatusChange
+
+from .timeseries import filtre_periode, periode_suivante, periodes
+
+SOURCES_ENTONNOIR = {
+    'offre': {'modele': 'offres_app.Offre', 'entity': 'entity__code'},
+    'affaire': {'modele': 'affaires_app.Affaire', 'entity': 'offre__entity__code'},
+}
+
+TTL_MOIS_COURANT = 300
+TTL_MOIS_PASSE = 6 * 3600
+
+
+def _cle_cache(source, mois):
+    return f'entonnoir:{source}:{mois.isoformat()}'
+
+
+def _groupe_vide():
+    return {'objets': 0, 'entrees': defaultdict(int), 'transitions': defaultdict(int), 'durees': defaultdict(list)}
+
+
+def calculer_mois(source, mois):
+    """
+    Données brutes de la cohorte créée pendant ``mois`` (premier jour du mois),
+    par entité : nombre d'objets, entrées par statut, transitions et durées
+    (en secondes) passées dans chaque statut quitté.
+    """
+    definition = SOURCES_ENTONNOIR[source]
+    model = apps.get_model(definition['modele'])
+    fin = periode_suivante(mois, 'month') - timedelta(days=1)
+    cohorte = model._default_manager.filter(**filtre_periode(model, 'date_creation', mois, fin))
+    objets = {
+        pk: (statut, entity, creation)
+        for pk, statut, entity, creation in cohorte.values_list('pk', 'statut', definition['entity'], 'date_creation')
+    }
+
+    changements = (
+        StatusChange.objects
+        .filter(content_type=ContentType.objects.get_for_model(model), object_id__in=cohorte.values('pk'))
+        .exclude(nouveau_statut__startswith=PREFIXE_PSEUDO_STATUT)
+        .annotate(entree=Window(
+            Lag('date_changement'),
+            partition_by=[F('content_type'), F('object_id')],
+            order_by=F('date_changement').asc(),
+        ))
+        .values_list('object_id', 'ancien_statut', 'nouveau_statut', 'date_changement', 'entree')
+        .order_by()
+    )
+
+    groupes = defaultdict(_groupe_vide)
+    statut_initial = {}
+    for object_id, ancien, nouveau, date_changement, entree in changements:
+        _statut, entity, creation = objets[object_id]
+        if not ancien:
+            # Enregistrement de création (ancien statut vide) : simple point d'entrée
+            statut_initial[object_id] = nouveau
+            continue
+        if entree is None:
+            statut_initial[object_id] = ancien
+            entree = creation
+        groupe = groupes[entity]
+        groupe['entrees'][nouveau] += 1
+        groupe['transitions'][f'{ancien}>{nouveau}'] += 1
+        groupe['durees'][ancien].append(max((date_changement - entree).total_seconds(), 0.0))
+
+    for pk, (statut, entity, _creation) in objets.items():
+        groupe = groupes[entity]
+        groupe['objets'] += 1
+        groupe['entrees'][statut_initial.get(pk, statut)] += 1
+
+    return {
+        entity: {
+            'objets': groupe['objets'],
+            'entrees': dict(groupe['entrees']),
+            'transitions': dict(groupe['transitions']),
+            'durees': {statut: sorted(valeurs) for statut, valeurs in groupe['durees'].items()},
+        }
+        for entity, groupe in groupes.items()
+    }
+
+
+def donnees_mois(source, mois, courant=False, forcer=False):
+    """``calculer_mois`` avec cache par (source, mois)."""
+    cle = _cle_cache(source, mois)
+    donnees = None if forcer else cache.get(cle)
+    if donnees is None:
+        donnees = calculer_mois(source, mois)
+        cache.set(cle, donnees, TTL_MOIS_COURANT if courant else TTL_MOIS_PASSE)
+    return donnees
+
+
+def _percentile(valeurs_triees, p):
+    """Percentile au rang le plus proche d'une liste triée."""
+    if not valeurs_triees:
+        return None
+    rang = min(len(valeurs_triees), max(1, math.ceil(p / 100 * len(valeurs_triees)))) - 1
+    return valeurs_triees[rang]
+
+
+def _fusionner(groupes):
+    total = {'objets': 0, 'entrees': defaultdict(int), 'transitions': defaultdict(int), 'durees': defaultdict(list)}
+    for groupe in groupes:
+        total['objets'] += groupe['objets']
+        for nom in ('entrees', 'transitions'):
+            for cle, valeur in groupe[nom].items():
+                total[nom][cle] += valeur
+        for statut, valeurs in groupe['durees'].items():
+            total['durees'][statut].extend(valeurs)
+    return total
+
+
+def _resume(groupe):
+    """Taux de conversion par transition et durées médiane / p90 (en jours)."""
+    entrees = groupe['entrees']
+    transitions = []
+    for cle, nombre in sorted(groupe['transitions'].items()):
+        depuis, vers = cle.split('>', 1)
+        transitions.append({
+            'depuis': depuis,
+            'vers': vers,
+            'nombre': nombre,
+            'taux': round(nombre / entrees[depuis], 4) if entrees.get(depuis) else None,
+        })
+    durees = {}
+    for statut, valeurs in groupe['durees'].items():
+        valeurs = sorted(valeurs)
+        durees[statut] = {
+            'nombre': len(valeurs),
+            'mediane_jours': round(_percentile(valeurs, 50) / 86400, 2),
+            'p90_jours': round(_percentile(valeurs, 90) / 86400, 2),
+        }
+    return {
+        'objets': groupe['objets'],
+        'entrees': dict(entrees),
+        'transitions': transitions,
+        'durees': durees,
+    }
+
+
+def entonnoir(source, date_debut, date_fin, par_entity=False):
+    """
+    Entonnoir des cohortes créées entre ``date_debut`` et ``date_fin``.
+
+    Returns:
+        dict: une entrée par mois et une synthèse de la période, chacune
+        globale et, si ``par_entity``, ventilée par entité.
+    """
+    if source not in SOURCES_ENTONNOIR:
+        raise ValueError(f"source doit valoir {', '.join(SOURCES_ENTONNOIR)}.")
+    if date_debut > date_fin:
+        raise ValueError("date_debut doit précéder date_fin.")
+
+    mois_courant = timezone.localdate().replace(day=1)
+    resultat_mois = []
+    cumul = defaultdict(list)
+    for mois in periodes(date_debut, date_fin, 'month'):
+        donnees = donnees_mois(source, mois, courant=mois >= mois_courant)
+        entree = {'periode': mois.isoformat(), **_resume(_fusionner(donnees.values()))}
+        if par_entity:
+            entree['entites'] = [
+                {'entity': entity, **_resume(_fusionner([groupe]))}
+                for entity, groupe in sorted(donnees.items(), key=lambda item: str(item[0]))
+            ]
+        resultat_mois.append(entree)
+        for entity, groupe in donnees.items():
+            cumul[entity].append(groupe)
+
+    synthese = _resume(_fusionner(g for groupes in cumul.values() for g in groupes))
+    if par_entity:
+        synthese['entites'] = [
+            {'entity': entity, **_resume(_fusionner(groupes))}
+            for entity, groupes in sorted(cumul.items(), key=lambda item: str(item[0]))
+        ]
+    return {
+        'source': source,
+        'date_debut': date_debut.isoformat(),
+        'date_fin': date_fin.isoformat(),
+        'periode': synthese,
+        'mois': resultat_mois,
+    }
@@ -0,0 +1,235 @@
+"""
+Classement des responsables.
+
+Les indicateurs courants de chaque responsable (montant gagné, opportunités
+et affaires ouvertes, affaires en retard, facturé, encaissé) sont stockés
+dans ``CompteurResponsable``. Toute sauvegarde ou suppression d'une
+affaire, d'une opportunité ou d'une facture programme, après le commit,
+le recalcul des compteurs des responsables concernés (ancien et nouveau) :
+trois requêtes agrégées quel que soit le nombre de responsables touchés.
+
+Le classement courant est une simple lecture de ``CompteurResponsable``.
+Sur une période, il est calculé à partir des agrégats journaliers
+(``DailyRollup``) des documents créés pendant la période, les montants
+encaissés étant ceux des factures payées pendant la période ; seul le nombre
+d'affaires en retard, qui dépend de la date du jour, provient des
+compteurs. La commande ``rafraichir_compteurs`` recalcule tout (à lancer
+chaque nuit pour suivre les affaires qui passent en retard).
+"""
+import threading
+from decimal import Decimal
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from .models import CompteurResponsable, DailyRollup
+
+STATUTS_AFFAIRE_OUVERTS = ['VALIDE', 'EN_COURS', 'EN_PAUSE']
+STATUTS_OPPORTUNITE_FERMES = ['GAGNEE', 'PERDUE']
+STATUTS_FACTURE_NON_FACTURES = ['BROUILLON', 'ANNULEE']
+
+INDICATEURS = [
+    'montant_gagne',
+    'opportunites_ouvertes',
+    'affaires_ouvertes',
+    'affaires_en_retard',
+    'montant_facture',
+    'montant_encaisse',
+]
+
+
+def _modele(label):
+    return apps.get_model(label)
+
+
+def recalculer(user_ids):
+    """Recalcule les compteurs des utilisateurs ``user_ids``."""
+    user_ids = {pk for pk in user_ids if pk is not None}
+    if not user_ids:
+        return 0
+    user_ids = set(get_user_model().objects.filter(pk__in=user_ids).values_list('pk', flat=True))
+    valeurs = {pk: {nom: 0 for nom in INDICATEURS} for pk in user_ids}
+
+    ouverte = Q(statut__in=STATUTS_AFFAIRE_OUVERTS)
+    for ligne in (
+        _modele('affaires_app.Affaire').objects.filter(responsable_id__in=user_ids)
+        .values('responsable_id')
+        .annotate(
+            affaires_ouvertes=Count('pk', filter=ouverte),
+            affaires_en_retard=Count('pk', filter=ouverte & Q(date_fin_prevue__lt=timezone.now())),
+        )
+        .order_by()
+    ):
+        valeurs[ligne.pop('responsable_id')].update(ligne)
+
+    for ligne in (
+        _modele('opportunites_app.Opportunite').objects.filter(responsable_id__in=user_ids)
+        .values('responsable_id')
+        .annotate(
+            montant_gagne=Sum('montant_estime', filter=Q(statut='GAGNEE')),
+            opportunites_ouvertes=Count('pk', filter=~Q(statut__in=STATUTS_OPPORTUNITE_FERMES)),
+        )
+        .order_by()
+    ):
+        valeurs[ligne.pop('responsable_id')].update(ligne)
+
+    for ligne in (
+        _modele('factures_app.Facture').objects.filter(affaire__responsable_id__in=user_ids)
+        .values(responsable=F('affaire__responsable_id'))
+        .annotate(
+            montant_facture=Sum('montant_ttc', filter=~Q(statut__in=STATUTS_FACTURE_NON_FACTURES)),
+            montant_encaisse=Sum('montant_paye'),
+        )
+        .order_by()
+    ):
+        valeurs[ligne.pop('responsable')].update(ligne)
+
+    CompteurResponsable.objects.bulk_create(
+        [
+            CompteurResponsable(user_id=pk, **{nom: valeur or 0 for nom, valeur in indicateurs.items()})
+            for pk, indicateurs in valeurs.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=INDICATEURS + ['calcule_le'],
+    )
+    return len(valeurs)
+
+
+def recalculer_tous(taille_lot=500):
+    """Recalcule les compteurs de tous les responsables ; retourne leur nombre."""
+    ids = set(_modele('affaires_app.Affaire').objects.values_list('responsable_id', flat=True).distinct())
+    ids |= set(_modele('opportunites_app.Opportunite').objects.values_list('responsable_id', flat=True).distinct())
+    ids |= set(CompteurResponsable.objects.values_list('user_id', flat=True))
+    ids = sorted(pk for pk in ids if pk is not None)
+    total = 0
+    for debut in range(0, len(ids), taille_lot):
+        total += recalculer(ids[debut:debut + taille_lot])
+    return total
+
+
+# ---------------------------------------------------------------------------
+# Mise à jour incrémentale
+# ---------------------------------------------------------------------------
+
+_pending = threading.local()
+
+
+def memoriser_responsable(instance):
+    """Retient le responsable (ou l'affaire, pour une facture) chargé."""
+    champ = 'affaire_id' if instance._meta.label == 'factures_app.Facture' else 'responsable_id'
+    instance._compteur_origine = instance.__dict__.get(champ)
+
+
+def responsables_touches(instance):
+    """(utilisateurs, affaires) dont les compteurs doivent être recalculés."""
+    origine = getattr(instance, '_compteur_origine', None)
+    if instance._meta.label == 'factures_app.Facture':
+        return set(), {origine, instance.affaire_id}
+    return {origine, instance.responsable_id}, set()
+
+
+def planifier(touches):
+    """Programme le recalcul après le commit ; regroupe les demandes d'une transaction."""
+    users, affaires = touches
+    users = {pk for pk in users if pk is not None}
+    affaires = {pk for pk in affaires if pk is not None}
+    if not users and not affaires:
+        return
+    en_attente = getattr(_pending, 'touches', None)
+    if en_attente is None:
+        en_attente = _pending.touches = (set(), set())
+    en_attente[0].update(users)
+    en_attente[1].update(affaires)
+    transaction.on_commit(_executer)
+
+
+def _executer():
+    en_attente = getattr(_pending, 'touches', None)
+    if not en_attente:
+        return
+    _pending.touches = None
+    users, affaires = en_attente
+    if affaires:
+        users |= set(
+            _modele('affaires_app.Affaire').objects.filter(pk__in=affaires).values_list('responsable_id', flat=True)
+        )
+    recalculer(users)
+
+
+# ---------------------------------------------------------------------------
+# Classement
+# ---------------------------------------------------------------------------
+
+def _utilisateurs(ids):
+    return {
+        user['pk']: user
+        for user in get_user_model().objects.filter(pk__in=ids).values('pk', 'username', 'email', 'departement')
+    }
+
+
+def classement(tri='montant_gagne', limite=20, date_debut=None, date_fin=None):
+    """
+    Classement des responsables selon l'indicateur ``tri``.
+
+    Sans période : lecture directe des compteurs. Avec ``date_debut`` /
+    ``date_fin`` : indicateurs des documents créés pendant la période
+    (factures payées pendant la période pour ``montant_encaisse``), lus
+    dans les agrégats journaliers.
+    """
+    if tri not in INDICATEURS:
+        raise ValueError(f"tri doit valoir {', '.join(INDICATEURS)}.")
+
+    if date_debut is None and date_fin is None:
+        lignes = list(
+            CompteurResponsable.objects.order_by(F(tri).desc(), 'user_id')
+            .values('user_id', *INDICATEURS)[:limite]
+        )
+    else:
+        rollups = DailyRollup.objects.filter(responsable__isnull=False)
+        if date_debut:
+            rollups = rollups.filter(jour__gte=date_debut)
+        if date_fin:
+            rollups = rollups.filter(jour__lte=date_fin)
+        lignes = list(
+            rollups.values(user_id=F('responsable_id'))
+            .annotate(
+                montant_gagne=Sum('montant_ht', filter=Q(source='OPPORTUNITE', statut='GAGNEE')),
+                opportunites_ouvertes=Sum(
+                    'nombre', filter=Q(source='OPPORTUNITE') & ~Q(statut__in=STATUTS_OPPORTUNITE_FERMES)
+                ),
+                affaires_ouvertes=Sum('nombre', filter=Q(source='AFFAIRE', statut__in=STATUTS_AFFAIRE_OUVERTS)),
+                montant_facture=Sum(
+                    'montant_ttc', filter=Q(source='FACTURE') & ~Q(statut__in=STATUTS_FACTURE_NON_FACTURES)
+                ),
+                montant_encaisse=Sum('montant_paye', filter=Q(source='ENCAISSEMENT')),
+            )
+            .order_by()
+        )
+        en_retard = dict(
+            CompteurResponsable.objects.filter(user_id__in=[ligne['user_id'] for ligne in lignes])
+            .values_list('user_id', 'affaires_en_retard')
+        )
+        for ligne in lignes:
+            ligne['affaires_en_retard'] = en_retard.get(ligne['user_id'], 0)
+            for nom in INDICATEURS:
+                ligne[nom] = ligne[nom] or 0
+        lignes.sort(key=lambda ligne: (-ligne[tri], ligne['user_id']))
+        lignes = lignes[:limite]
+
+    utilisateurs = _utilisateurs([ligne['user_id'] for ligne in lignes])
+    for rang, ligne in enumerate(lignes, start=1):
+        ligne['rang'] = rang
+        ligne['user'] = utilisateurs.get(ligne['user_id'])
+        for nom in INDICATEURS:
+            if isinstance(ligne[nom], Decimal):
+                ligne[nom] = float(ligne[nom])
+    return {
+        'tri': tri,
+        'date_debut': date_debut.isoformat() if date_debut else None,
+        'date_fin': date_fin.isoformat() if date_fin else None,
+        'classement': lignes,
+    }
@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from analytics_app.funnel import SOURCES_ENTONNOIR, donnees_mois
+from analytics_app.timeseries import debut_periode
+
+
+class Command(BaseCommand):
+    help = "Précalcule et met en cache l'entonnoir de conversion des derniers mois"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mois', type=int, default=12, help="Nombre de mois à précalculer (mois courant inclus)")
+        parser.add_argument('--source', choices=list(SOURCES_ENTONNOIR), action='append',
+                            help="Source à précalculer (répétable) ; toutes par défaut")
+
+    def handle(self, *args, **options):
+        courant = debut_periode(timezone.localdate(), 'month')
+        liste_mois = [courant]
+        for _ in range(options['mois'] - 1):
+            liste_mois.append(debut_periode(liste_mois[-1] - timedelta(days=1), 'month'))
+
+        for source in options['source'] or list(SOURCES_ENTONNOIR):
+            for mois in reversed(liste_mois):
+                donnees = donnees_mois(source, mois, courant=mois == courant, forcer=True)
+                objets = sum(groupe['objets'] for groupe in donnees.values())
+                self.stdout.write(f"{source:<8} {mois:%Y-%m}  {objets:>6} objet(s)")
+        self.stdout.write(self.style.SUCCESS("Entonnoir précalculé"))
@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from analytics_app.leaderboard import recalculer_tous
+
+
+class Command(BaseCommand):
+    help = "Recalcule les compteurs de performance de tous les responsables"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--taille-lot', type=int, default=500, help="Nombre de responsables par lot")
+
+    def handle(self, *args, **options):
+        debut = time.perf_counter()
+        total = recalculer_tous(taille_lot=options['taille_lot'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} compteur(s) recalculé(s) en {time.perf_counter() - debut:.2f} s"
+        ))
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from analytics_app.rollups import SOURCES, rebuild
+
+
+class Command(BaseCommand):
+    help = "Reconstruit les agrégats journaliers (DailyRollup) à partir des documents"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', choices=list(SOURCES), action='append',
+                            help="Source à reconstruire (répétable) ; toutes par défaut")
+        parser.add_argument('--depuis', help="Premier jour à reconstruire (AAAA-MM-JJ)")
+        parser.add_argument('--jusqu-a', dest='jusqua', help="Dernier jour à reconstruire (AAAA-MM-JJ)")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Taille des lots d'insertion")
+
+    def handle(self, *args, **options):
+        bornes = {}
+        for option, nom in (('depuis', 'date_debut'), ('jusqua', 'date_fin')):
+            if options[option]:
+                valeur = parse_date(options[option])
+                if valeur is None:
+                    raise CommandError(f"Date invalide : {options[option]}")
+                bornes[nom] = valeur
+
+        for source in options['source'] or list(SOURCES):
+            debut = time.perf_counter()
+            lignes = rebuild(source, batch_size=options['batch_size'], **bornes)
+            self.stdout.write(f"{source:<12} {lignes:>8} ligne(s) en {time.perf_counter() - debut:.2f} s")
+        self.stdout.write(self.style.SUCCESS("Agrégats reconstruits"))
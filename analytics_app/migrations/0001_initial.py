@@ -0,0 +1,44 @@
+# Generated by Django 5.1.4 on 2026-10-18 22:34
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('document', '0029_rename_category_departement_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('FACTURE', 'Facture'), ('PROFORMA', 'Proforma'), ('OFFRE', 'Offre'), ('AFFAIRE', 'Affaire'), ('OPPORTUNITE', 'Opportunité')], max_length=20, verbose_name='Source')),
+                ('jour', models.DateField(verbose_name='Jour')),
+                ('statut', models.CharField(max_length=30, verbose_name='Statut')),
+                ('nombre', models.PositiveIntegerField(default=0, verbose_name='Nombre de documents')),
+                ('montant_ht', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=18, verbose_name='Montant HT')),
+                ('montant_ttc', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=18, verbose_name='Montant TTC')),
+                ('montant_paye', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=18, verbose_name='Montant payé')),
+                ('valeur_pipeline', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=18, verbose_name='Valeur pondérée du pipeline')),
+                ('calcule_le', models.DateTimeField(auto_now=True, verbose_name='Calculé le')),
+                ('departement', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='document.departement')),
+                ('entity', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='document.entity')),
+                ('produit', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='document.product')),
+                ('responsable', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Agrégat journalier',
+                'verbose_name_plural': 'Agrégats journaliers',
+                'ordering': ['source', 'jour'],
+                'indexes': [models.Index(fields=['source', 'jour'], name='analytics_a_source_ef2336_idx'), models.Index(fields=['source', 'statut', 'jour'], name='analytics_a_source_6a9eeb_idx')],
+            },
+        ),
+    ]
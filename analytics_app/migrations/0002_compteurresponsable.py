@@ -0,0 +1,34 @@
+# Generated by Django 5.1.4 on 2026-10-18 22:44
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics_app', '0001_initial'),
+        ('api_user', '0002_user_departement'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompteurResponsable',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='compteur_performance', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('montant_gagne', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=18, verbose_name='Montant gagné')),
+                ('opportunites_ouvertes', models.PositiveIntegerField(default=0, verbose_name='Opportunités ouvertes')),
+                ('affaires_ouvertes', models.PositiveIntegerField(default=0, verbose_name='Affaires ouvertes')),
+                ('affaires_en_retard', models.PositiveIntegerField(default=0, verbose_name='Affaires en retard')),
+                ('montant_facture', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=18, verbose_name='Montant facturé')),
+                ('montant_encaisse', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=18, verbose_name='Montant encaissé')),
+                ('calcule_le', models.DateTimeField(auto_now=True, verbose_name='Calculé le')),
+            ],
+            options={
+                'verbose_name': 'Compteur de performance',
+                'verbose_name_plural': 'Compteurs de performance',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-18 23:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics_app', '0002_compteurresponsable'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dailyrollup',
+            name='source',
+            field=models.CharField(choices=[('FACTURE', 'Facture'), ('ENCAISSEMENT', 'Encaissement'), ('PROFORMA', 'Proforma'), ('OFFRE', 'Offre'), ('AFFAIRE', 'Affaire'), ('OPPORTUNITE', 'Opportunité')], max_length=20, verbose_name='Source'),
+        ),
+    ]
@@ -0,0 +1,132 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import models
+from django.db.models.signals import post_delete, post_init, post_save
+
+
+class DailyRollup(models.Model):
+    """
+    Agrégat journalier des documents commerciaux.
+
+    Une ligne résume, pour une source et un jour (de création, ou de
+    paiement pour les encaissements), les documents
+    partageant la même combinaison entité × département × produit ×
+    responsable × statut. Les lignes sont maintenues par
+    ``analytics_app.rollups`` et reconstruites par ``rebuild_rollups``.
+    """
+    SOURCE_CHOICES = [
+        ('FACTURE', 'Facture'),
+        ('ENCAISSEMENT', 'Encaissement'),
+        ('PROFORMA', 'Proforma'),
+        ('OFFRE', 'Offre'),
+        ('AFFAIRE', 'Affaire'),
+        ('OPPORTUNITE', 'Opportunité'),
+    ]
+
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES, verbose_name="Source")
+    jour = models.DateField(verbose_name="Jour")
+
+    # Dimensions
+    entity = models.ForeignKey('document.Entity', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    departement = models.ForeignKey('document.Departement', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    produit = models.ForeignKey('document.Product', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    responsable = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    statut = models.CharField(max_length=30, verbose_name="Statut")
+
+    # Mesures
+    nombre = models.PositiveIntegerField(default=0, verbose_name="Nombre de documents")
+    montant_ht = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal('0'), verbose_name="Montant HT")
+    montant_ttc = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal('0'), verbose_name="Montant TTC")
+    montant_paye = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal('0'), verbose_name="Montant payé")
+    valeur_pipeline = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal('0'), verbose_name="Valeur pondérée du pipeline")
+
+    calcule_le = models.DateTimeField(auto_now=True, verbose_name="Calculé le")
+
+    class Meta:
+        verbose_name = "Agrégat journalier"
+        verbose_name_plural = "Agrégats journaliers"
+        ordering = ['source', 'jour']
+        indexes = [
+            models.Index(fields=['source', 'jour']),
+            models.Index(fields=['source', 'statut', 'jour']),
+        ]
+
+    def __str__(self):
+        return f"{self.source} {self.jour} {self.statut} ({self.nombre})"
+
+
+class CompteurResponsable(models.Model):
+    """
+    Indicateurs courants d'un responsable, maintenus par
+    ``analytics_app.leaderboard`` à chaque sauvegarde d'affaire,
+    d'opportunité ou de facture le concernant.
+    """
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name='compteur_performance')
+    montant_gagne = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal('0'), verbose_name="Montant gagné")
+    opportunites_ouvertes = models.PositiveIntegerField(default=0, verbose_name="Opportunités ouvertes")
+    affaires_ouvertes = models.PositiveIntegerField(default=0, verbose_name="Affaires ouvertes")
+    affaires_en_retard = models.PositiveIntegerField(default=0, verbose_name="Affaires en retard")
+    montant_facture = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal('0'), verbose_name="Montant facturé")
+    montant_encaisse = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal('0'), verbose_name="Montant encaissé")
+    calcule_le = models.DateTimeField(auto_now=True, verbose_name="Calculé le")
+
+    class Meta:
+        verbose_name = "Compteur de performance"
+        verbose_name_plural = "Compteurs de performance"
+
+    def __str__(self):
+        return f"Compteurs de {self.user}"
+
+
+# Mise à jour incrémentale des agrégats journaliers (voir analytics_app.rollups)
+SOURCES_SUIVIES = [
+    'factures_app.Facture',
+    'proformas_app.Proforma',
+    'offres_app.Offre',
+    'affaires_app.Affaire',
+    'opportunites_app.Opportunite',
+]
+
+
+def _memoriser_jour_rollup(sender, instance, **kwargs):
+    from .rollups import memoriser_jour
+    memoriser_jour(instance)
+
+
+def _planifier_rollup(sender, instance, **kwargs):
+    from .rollups import jours_touches, memoriser_jour, planifier
+    for source, jours in jours_touches(instance).items():
+        planifier(source, jours)
+    memoriser_jour(instance)
+
+
+for _modele in SOURCES_SUIVIES:
+    post_init.connect(_memoriser_jour_rollup, sender=_modele, dispatch_uid=f'rollup_init_{_modele}')
+    post_save.connect(_planifier_rollup, sender=_modele, dispatch_uid=f'rollup_save_{_modele}')
+    post_delete.connect(_planifier_rollup, sender=_modele, dispatch_uid=f'rollup_delete_{_modele}')
+
+
+# Compteurs de performance par responsable (voir analytics_app.leaderboard)
+SOURCES_COMPTEURS = [
+    'affaires_app.Affaire',
+    'opportunites_app.Opportunite',
+    'factures_app.Facture',
+]
+
+
+def _memoriser_responsable(sender, instance, **kwargs):
+    from .leaderboard import memoriser_responsable
+    memoriser_responsable(instance)
+
+
+def _planifier_compteurs(sender, instance, **kwargs):
+    from .leaderboard import memoriser_responsable, planifier, responsables_touches
+    planifier(responsables_touches(instance))
+    memoriser_responsable(instance)
+
+
+for _modele in SOURCES_COMPTEURS:
+    post_init.connect(_memoriser_responsable, sender=_modele, dispatch_uid=f'compteurs_init_{_modele}')
+    post_save.connect(_planifier_compteurs, sender=_modele, dispatch_uid=f'compteurs_save_{_modele}')
+    post_delete.connect(_planifier_compteurs, sender=_modele, dispatch_uid=f'compteurs_delete_{_modele}')
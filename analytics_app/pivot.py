@@ -0,0 +1,237 @@
+"""
+Tableaux croisés déclaratifs.
+
+Chaque application décrit dans son module ``analytics.py`` les dimensions
+et mesures autorisées pour ses modèles :
+
+    from analytics_app.pivot import mois, register
+
+    register(
+        'factures', Facture,
+        champ_date='date_creation',
+        dimensions={'statut': 'statut', 'entity': 'affaire__offre__entity__code', 'mois': mois('date_creation')},
+        mesures={'montant_ttc': 'montant_ttc'},
+    )
+
+Ces modules sont chargés au démarrage (``AnalyticsAppConfig.ready``).
+Une demande ``rows=entity&cols=statut&measure=sum:montant_ttc`` est
+compilée en une seule requête GROUP BY ; seules les dimensions et mesures
+déclarées sont acceptées.
+"""
+from decimal import Decimal
+
+from django.db.models import Avg, Count, DateField, F, Max, Min, Sum
+from django.db.models.functions import TruncMonth, TruncQuarter, TruncYear
+from django.utils.dateparse import parse_date
+
+from .timeseries import filtre_periode
+
+AGREGATS = {
+    'count': Count,
+    'sum': Sum,
+    'avg': Avg,
+    'min': Min,
+    'max': Max,
+}
+
+# Garde-fou contre les croisements de dimensions à forte cardinalité
+MAX_CELLULES = 10000
+
+registre = {}
+
+
+def mois(champ):
+    return TruncMonth(champ, output_field=DateField())
+
+
+def trimestre(champ):
+    return TruncQuarter(champ, output_field=DateField())
+
+
+def annee(champ):
+    return TruncYear(champ, output_field=DateField())
+
+
+class PivotSource:
+    """Modèle exposé au pivot, avec ses dimensions et mesures autorisées."""
+
+    def __init__(self, nom, model, dimensions, mesures=None, champ_date=None, queryset=None):
+        self.nom = nom
+        self.model = model
+        self.dimensions = dimensions
+        self.mesures = mesures or {}
+        self.champ_date = champ_date
+        self._queryset = queryset
+
+    def get_queryset(self):
+        if self._queryset is not None:
+            return self._queryset.all()
+        return self.model._default_manager.all()
+
+    def decrire(self):
+        return {
+            'source': self.nom,
+            'dimensions': list(self.dimensions),
+            'mesures': ['count'] + [f'{agregat}:{nom}' for nom in self.mesures for agregat in AGREGATS if agregat != 'count'],
+            'filtre_date': self.champ_date is not None,
+        }
+
+
+def register(nom, model, dimensions, mesures=None, champ_date=None, queryset=None):
+    """Déclare une source de pivot ; retourne la ``PivotSource`` créée."""
+    source = PivotSource(nom, model, dimensions, mesures, champ_date, queryset)
+    registre[nom] = source
+    return source
+
+
+def get_source(nom):
+    try:
+        return registre[nom]
+    except KeyError:
+        raise ValueError(f"Source inconnue : {nom}")
+
+
+def _expression(source, dimension):
+    chemin = source.dimensions[dimension]
+    return chemin if not isinstance(chemin, str) else None
+
+
+def _liste(valeur):
+    return [element.strip() for element in (valeur or '').split(',') if element.strip()]
+
+
+def parse_mesure(source, spec):
+    """``sum:montant_ttc`` → (nom de colonne, agrégat)."""
+    agregat, _, champ = spec.partition(':')
+    if agregat not in AGREGATS:
+        raise ValueError(f"Agrégat inconnu : {agregat} (attendu : {', '.join(AGREGATS)}).")
+    if agregat == 'count' and not champ:
+        return 'count', Count('pk')
+    if champ not in source.mesures:
+        raise ValueError(
+            f"Mesure non autorisée : {champ} (autorisées : {', '.join(source.mesures) or 'count'})."
+        )
+    return f'{agregat}_{champ}', AGREGATS[agregat](source.mesures[champ])
+
+
+def _valeur(valeur):
+    if isinstance(valeur, Decimal):
+        return float(valeur)
+    return valeur
+
+
+def pivot(source, rows=(), cols=(), mesures=('count',), filtres=None, date_debut=None, date_fin=None, queryset=None):
+    """
+    Exécute le tableau croisé en une requête GROUP BY.
+
+    Args:
+        source (PivotSource | str): source déclarée.
+        rows, cols: dimensions en lignes et en colonnes.
+        mesures: spécifications ``count`` ou ``<agregat>:<mesure>``.
+        filtres (dict): égalités sur des dimensions déclarées.
+        date_debut, date_fin (date): bornes sur ``champ_date``.
+        queryset: queryset de départ (restreint par l'appelant), sinon celui de la source.
+
+    Returns:
+        dict: ``lignes`` et ``colonnes`` (valeurs distinctes de chaque axe),
+        ``cellules`` (une entrée par combinaison non vide) et ``totaux``
+        (pour les mesures additives).
+    """
+    if isinstance(source, str):
+        source = get_source(source)
+    rows, cols = list(rows), list(cols)
+    for dimension in rows + cols + list(filtres or {}):
+        if dimension not in source.dimensions:
+            raise ValueError(
+                f"Dimension non autorisée : {dimension} (autorisées : {', '.join(source.dimensions)})."
+            )
+    if len(set(rows + cols)) != len(rows + cols):
+        raise ValueError("Une dimension ne peut apparaître qu'une fois.")
+
+    agregats = dict(parse_mesure(source, spec) for spec in mesures or ('count',))
+
+    qs = source.get_queryset() if queryset is None else queryset
+    for dimension, valeur in (filtres or {}).items():
+        expression = _expression(source, dimension)
+        if expression is not None:
+            qs = qs.annotate(**{f'filtre_{dimension}': expression}).filter(**{f'filtre_{dimension}': valeur})
+        else:
+            qs = qs.filter(**{source.dimensions[dimension]: valeur})
+    if date_debut or date_fin:
+        if not source.champ_date:
+            raise ValueError(f"La source {source.nom} ne permet pas de filtrer par date.")
+        bornes = filtre_periode(qs.model, source.champ_date, date_debut or date_fin, date_fin or date_debut)
+        if not date_debut:
+            bornes = {k: v for k, v in bornes.items() if not k.endswith('__gte')}
+        if not date_fin:
+            bornes = {k: v for k, v in bornes.items() if k.endswith('__gte')}
+        qs = qs.filter(**bornes)
+
+    # Les dimensions sont renommées pour ne pas entrer en conflit avec les champs du modèle
+    axes = {f'd_{dimension}': dimension for dimension in rows + cols}
+    annotations = {}
+    for alias, dimension in axes.items():
+        expression = _expression(source, dimension)
+        chemin = source.dimensions[dimension]
+        annotations[alias] = expression if expression is not None else F(chemin)
+
+    lignes = (
+        qs.annotate(**annotations)
+        .values(*annotations)
+        .annotate(**agregats)
+        .order_by(*annotations)
+    )[:MAX_CELLULES + 1]
+
+    cellules = []
+    valeurs_lignes, valeurs_colonnes = {}, {}
+    totaux = {nom: 0 for nom in agregats if nom == 'count' or nom.startswith('sum_')}
+    for ligne in lignes:
+        cellule = {dimension: _valeur(ligne[alias]) for alias, dimension in axes.items()}
+        for nom in agregats:
+            cellule[nom] = _valeur(ligne[nom]) if ligne[nom] is not None else 0
+            if nom in totaux:
+                totaux[nom] += cellule[nom]
+        cellules.append(cellule)
+        valeurs_lignes.setdefault(tuple(cellule[d] for d in rows), None)
+        valeurs_colonnes.setdefault(tuple(cellule[d] for d in cols), None)
+
+    tronque = len(cellules) > MAX_CELLULES
+    return {
+        'source': source.nom,
+        'rows': rows,
+        'cols': cols,
+        'mesures': list(agregats),
+        'lignes': [list(cle) for cle in valeurs_lignes] if rows else [],
+        'colonnes': [list(cle) for cle in valeurs_colonnes] if cols else [],
+        'cellules': cellules[:MAX_CELLULES],
+        'totaux': totaux,
+        'tronque': tronque,
+    }
+
+
+def parametres_pivot(source, query_params, reserves=('rows', 'cols', 'measure', 'date_debut', 'date_fin')):
+    """
+    Lit ``rows``, ``cols``, ``measure`` (répétable ou séparé par des
+    virgules) et les filtres de dimension depuis les paramètres de requête.
+    Seuls les paramètres nommés d'après une dimension déclarée de ``source``
+    filtrent ; les autres (``page``, ``format``, anti-cache…) sont ignorés.
+    """
+    if isinstance(source, str):
+        source = get_source(source)
+    parametres = {
+        'rows': _liste(query_params.get('rows')),
+        'cols': _liste(query_params.get('cols')),
+        'mesures': [spec for valeur in query_params.getlist('measure') for spec in _liste(valeur)] or ['count'],
+        'filtres': {
+            cle: valeur for cle, valeur in query_params.items()
+            if cle in source.dimensions and cle not in reserves and valeur != ''
+        },
+    }
+    for nom in ('date_debut', 'date_fin'):
+        brut = query_params.get(nom)
+        if brut:
+            valeur = parse_date(brut)
+            if valeur is None:
+                raise ValueError(f"{nom} doit être une date au format AAAA-MM-JJ.")
+            parametres[nom] = valeur
+    return parametres
@@ -0,0 +1,278 @@
+"""
+Agrégats journaliers (``DailyRollup``) des documents commerciaux.
+
+Chaque source (facture, proforma, offre, affaire, opportunité) est décrite
+par les chemins de ses dimensions, par ses mesures et par le champ date
+qui fixe le jour de rattachement (``date_creation`` par défaut). Un jour
+d'une source est recalculé en une requête GROUP BY puis remplace les lignes
+existantes :
+
+- à chaque sauvegarde/suppression d'un document, le jour concerné (ancien
+  et nouveau) de chaque source du modèle est recalculé après le commit ;
+- la commande ``rebuild_rollups`` reconstruit une plage complète.
+
+Les encaissements forment une source à part (``ENCAISSEMENT``) : le
+``montant_paye`` des factures y est rattaché au jour de ``date_paiement``.
+Cette date n'étant renseignée qu'au solde de la facture, un paiement
+partiel n'apparaît qu'au jour où la facture est soldée. Le
+``montant_paye`` de la source ``AFFAIRE`` reste, lui, le cumul payé des
+affaires créées ce jour-là.
+
+Les mises à jour en masse (``QuerySet.update``, ``bulk_create``) ne
+déclenchent pas les signaux : appeler ``refresh_days`` ou
+``rebuild_rollups`` après ce type d'opération. De même, la modification
+d'une dimension portée par un parent (entité d'une offre déjà facturée)
+n'est reportée qu'à la prochaine reconstruction.
+"""
+import threading
+from decimal import Decimal
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailyRollup
+
+MONTANT = DecimalField(max_digits=18, decimal_places=2)
+
+SOURCES = {
+    'FACTURE': {
+        'modele': 'factures_app.Facture',
+        'dimensions': {
+            'entity': 'affaire__offre__entity',
+            'departement': 'affaire__offre__produit_principal__departement',
+            'produit': 'affaire__offre__produit_principal',
+            'responsable': 'affaire__responsable',
+        },
+        'mesures': lambda: {
+            'montant_ht': Sum('montant_ht'),
+            'montant_ttc': Sum('montant_ttc'),
+        },
+    },
+    'ENCAISSEMENT': {
+        'modele': 'factures_app.Facture',
+        'champ_date': 'date_paiement',
+        'dimensions': {
+            'entity': 'affaire__offre__entity',
+            'departement': 'affaire__offre__produit_principal__departement',
+            'produit': 'affaire__offre__produit_principal',
+            'responsable': 'affaire__responsable',
+        },
+        'mesures': lambda: {
+            'montant_paye': Sum('montant_paye'),
+        },
+    },
+    'PROFORMA': {
+        'modele': 'proformas_app.Proforma',
+        'dimensions': {
+            'entity': 'offre__entity',
+            'departement': 'offre__produit_principal__departement',
+            'produit': 'offre__produit_principal',
+            'responsable': 'offre__user',
+        },
+        'mesures': lambda: {
+            'montant_ht': Sum('montant_ht'),
+            'montant_ttc': Sum('montant_ttc'),
+        },
+    },
+    'OFFRE': {
+        'modele': 'offres_app.Offre',
+        'dimensions': {
+            'entity': 'entity',
+            'departement': 'produit_principal__departement',
+            'produit': 'produit_principal',
+            'responsable': 'user',
+        },
+        'mesures': lambda: {
+            'montant_ht': Sum('montant'),
+            # Offres encore ouvertes
+            'valeur_pipeline': Sum('montant', filter=Q(statut__in=['BROUILLON', 'ENVOYE', 'EN_NEGOCIATION'])),
+        },
+    },
+    'AFFAIRE': {
+        'modele': 'affaires_app.Affaire',
+        'dimensions': {
+            'entity': 'offre__entity',
+            'departement': 'offre__produit_principal__departement',
+            'produit': 'offre__produit_principal',
+            'responsable': 'responsable',
+        },
+        'mesures': lambda: {
+            'montant_ht': Sum('montant_total'),
+            'montant_paye': Sum('montant_paye'),
+        },
+    },
+    'OPPORTUNITE': {
+        'modele': 'opportunites_app.Opportunite',
+        'dimensions': {
+            'entity': 'entity',
+            'departement': 'produit_principal__departement',
+            'produit': 'produit_principal',
+            'responsable': 'responsable',
+        },
+        'mesures': lambda: {
+            'montant_ht': Sum('montant_estime'),
+            # Montant estimé × probabilité, comme Opportunite.valeur_ponderee
+            'valeur_pipeline': Sum(
+                ExpressionWrapper(F('montant_estime') * F('probabilite') / 100, output_field=MONTANT),
+                filter=~Q(statut__in=['GAGNEE', 'PERDUE']),
+            ),
+        },
+    },
+}
+
+CHAMP_DATE = 'date_creation'
+MESURES = ('montant_ht', 'montant_ttc', 'montant_paye', 'valeur_pipeline')
+
+
+def modele_source(source):
+    return apps.get_model(SOURCES[source]['modele'])
+
+
+def champ_date(source):
+    """Champ date qui fixe le jour de rattachement des documents de ``source``."""
+    return SOURCES[source].get('champ_date', CHAMP_DATE)
+
+
+def sources_du_modele(model):
+    """Noms des sources alimentées par ``model``."""
+    label = model._meta.label
+    return [nom for nom, definition in SOURCES.items() if definition['modele'] == label]
+
+
+def jour_local(valeur):
+    """Jour (fuseau courant) d'une date/heure ; None si absente."""
+    if valeur is None:
+        return None
+    if timezone.is_aware(valeur):
+        valeur = timezone.localtime(valeur)
+    return valeur.date()
+
+
+def _lignes(source, queryset):
+    """Agrège ``queryset`` par jour et par combinaison de dimensions."""
+    definition = SOURCES[source]
+    dimensions = {f'dim_{nom}': F(chemin) for nom, chemin in definition['dimensions'].items()}
+    return (
+        queryset
+        .annotate(rollup_jour=TruncDate(champ_date(source)), **dimensions)
+        .values('rollup_jour', 'statut', *dimensions)
+        .annotate(nombre=Count('pk'), **definition['mesures']())
+        .order_by()
+    )
+
+
+def _construire(source, ligne):
+    return DailyRollup(
+        source=source,
+        jour=ligne['rollup_jour'],
+        entity_id=ligne['dim_entity'],
+        departement_id=ligne['dim_departement'],
+        produit_id=ligne['dim_produit'],
+        responsable_id=ligne['dim_responsable'],
+        statut=ligne['statut'] or '',
+        nombre=ligne['nombre'],
+        **{mesure: ligne.get(mesure) or Decimal('0') for mesure in MESURES},
+    )
+
+
+def refresh_days(source, jours):
+    """Recalcule les agrégats de ``source`` pour les jours donnés."""
+    jours = sorted({jour for jour in jours if jour is not None})
+    if not jours:
+        return 0
+    queryset = modele_source(source)._default_manager.filter(**{f'{champ_date(source)}__date__in': jours})
+    nouvelles = [_construire(source, ligne) for ligne in _lignes(source, queryset)]
+    with transaction.atomic():
+        DailyRollup.objects.filter(source=source, jour__in=jours).delete()
+        DailyRollup.objects.bulk_create(nouvelles)
+    return len(nouvelles)
+
+
+def refresh_day(source, jour):
+    return refresh_days(source, [jour])
+
+
+def rebuild(source, date_debut=None, date_fin=None, batch_size=1000):
+    """
+    Reconstruit les agrégats de ``source`` sur [date_debut, date_fin]
+    (tout l'historique si les bornes sont absentes). Retourne le nombre
+    de lignes écrites.
+    """
+    champ = champ_date(source)
+    queryset = modele_source(source)._default_manager.filter(**{f'{champ}__isnull': False})
+    rollups = DailyRollup.objects.filter(source=source)
+    if date_debut:
+        queryset = queryset.filter(**{f'{champ}__date__gte': date_debut})
+        rollups = rollups.filter(jour__gte=date_debut)
+    if date_fin:
+        queryset = queryset.filter(**{f'{champ}__date__lte': date_fin})
+        rollups = rollups.filter(jour__lte=date_fin)
+
+    total = 0
+    with transaction.atomic():
+        rollups.delete()
+        lot = []
+        for ligne in _lignes(source, queryset).iterator(chunk_size=batch_size):
+            lot.append(_construire(source, ligne))
+            if len(lot) >= batch_size:
+                DailyRollup.objects.bulk_create(lot)
+                total += len(lot)
+                lot = []
+        DailyRollup.objects.bulk_create(lot)
+        total += len(lot)
+    return total
+
+
+# ---------------------------------------------------------------------------
+# Mise à jour incrémentale
+# ---------------------------------------------------------------------------
+
+_pending = threading.local()
+
+
+def planifier(source, jours):
+    """
+    Programme le recalcul de ``jours`` après le commit de la transaction
+    courante. Les demandes d'une même transaction sont regroupées : le
+    premier rappel exécuté traite tout ce qui est en attente, les suivants
+    n'ont plus rien à faire.
+    """
+    jours = {jour for jour in jours if jour is not None}
+    if not jours:
+        return
+    en_attente = getattr(_pending, 'jours', None)
+    if en_attente is None:
+        en_attente = _pending.jours = {}
+    en_attente.setdefault(source, set()).update(jours)
+    transaction.on_commit(_executer)
+
+
+def _executer():
+    en_attente = getattr(_pending, 'jours', None)
+    if not en_attente:
+        return
+    _pending.jours = None
+    for source, jours in en_attente.items():
+        refresh_days(source, jours)
+
+
+def memoriser_jour(instance):
+    """Retient, par source, le jour de rattachement chargé (appelé depuis ``post_init``)."""
+    instance._rollup_jours = {
+        # Ne pas déclencher de requête sur un champ différé
+        source: jour_local(instance.__dict__.get(instance._meta.get_field(champ_date(source)).attname))
+        for source in sources_du_modele(type(instance))
+    }
+
+
+def jours_touches(instance):
+    """``{source: jours}`` à recalculer pour ``instance`` (ancien et nouveau jour)."""
+    anciens = getattr(instance, '_rollup_jours', {})
+    return {
+        source: {anciens.get(source), jour_local(getattr(instance, champ_date(source), None))}
+        for source in sources_du_modele(type(instance))
+    }
+
@@ -0,0 +1,214 @@
+"""
+Service de découpage temporel des statistiques.
+
+``serie_temporelle`` agrège un queryset par période (jour, semaine, mois,
+trimestre, année) en une seule requête GROUP BY, complète les périodes
+sans données par des zéros et retourne toujours la même structure :
+
+    {
+        "granularite": "month",
+        "date_debut": "2025-01-01",
+        "date_fin": "2025-12-31",
+        "mesures": ["count", "montant"],
+        "dimension": None,
+        "series": [
+            {"cle": None, "points": [{"periode": "2025-01-01", "count": 3, "montant": 1200.0}, ...]},
+        ],
+    }
+
+Avec une dimension (ex. ``statut``), une série est produite par valeur.
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db.models import DateField, DateTimeField, F
+from django.db.models.functions import TruncDay, TruncMonth, TruncQuarter, TruncWeek, TruncYear
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+GRANULARITES = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+    'quarter': TruncQuarter,
+    'year': TruncYear,
+}
+
+# Garde-fou contre les séries démesurées (ex. 30 ans au jour le jour)
+MAX_PERIODES = 1500
+
+
+def debut_periode(jour, granularite):
+    """Premier jour de la période contenant ``jour``."""
+    if granularite == 'day':
+        return jour
+    if granularite == 'week':
+        return jour - timedelta(days=jour.weekday())
+    if granularite == 'month':
+        return jour.replace(day=1)
+    if granularite == 'quarter':
+        return jour.replace(month=(jour.month - 1) // 3 * 3 + 1, day=1)
+    return jour.replace(month=1, day=1)
+
+
+def periode_suivante(jour, granularite):
+    """Premier jour de la période suivante (``jour`` doit être un début de période)."""
+    if granularite == 'day':
+        return jour + timedelta(days=1)
+    if granularite == 'week':
+        return jour + timedelta(days=7)
+    if granularite == 'year':
+        return jour.replace(year=jour.year + 1)
+    mois = 1 if granularite == 'month' else 3
+    annee, index = divmod(jour.month - 1 + mois, 12)
+    return jour.replace(year=jour.year + annee, month=index + 1)
+
+
+def periodes(date_debut, date_fin, granularite):
+    """Liste des débuts de période couvrant [date_debut, date_fin]."""
+    courant = debut_periode(date_debut, granularite)
+    resultat = []
+    while courant <= date_fin:
+        resultat.append(courant)
+        courant = periode_suivante(courant, granularite)
+    return resultat
+
+
+def _champ(model, chemin):
+    """Résout un chemin ``a__b__c`` vers le champ final."""
+    champ = None
+    for nom in chemin.split('__'):
+        champ = model._meta.get_field(nom)
+        model = champ.related_model or model
+    return champ
+
+
+def filtre_periode(model, champ_date, date_debut, date_fin):
+    """Filtre de plage adapté au type du champ (date ou date/heure)."""
+    if isinstance(_champ(model, champ_date), DateTimeField):
+        tz = timezone.get_current_timezone()
+        return {
+            f'{champ_date}__gte': timezone.make_aware(datetime.combine(date_debut, time.min), tz),
+            f'{champ_date}__lt': timezone.make_aware(datetime.combine(date_fin + timedelta(days=1), time.min), tz),
+        }
+    return {f'{champ_date}__gte': date_debut, f'{champ_date}__lte': date_fin}
+
+
+def _valeur(valeur):
+    if valeur is None:
+        return 0
+    if isinstance(valeur, Decimal):
+        return float(valeur)
+    return valeur
+
+
+def serie_temporelle(queryset, champ_date, mesures, granularite='month',
+                     date_debut=None, date_fin=None, dimension=None, champ_dimension=None):
+    """
+    Agrège ``queryset`` par période de ``champ_date``.
+
+    Args:
+        queryset: QuerySet de départ (déjà filtré).
+        champ_date (str): champ date ou date/heure servant au découpage.
+        mesures (dict): nom de mesure → expression d'agrégat (``Count('id')``, ``Sum('montant')``…).
+        granularite (str): day, week, month, quarter ou year.
+        date_debut, date_fin (date): bornes incluses ; l'année en cours par défaut.
+        dimension (str): nom de la dimension optionnelle produisant une série par valeur.
+        champ_dimension (str): chemin de champ de la dimension (``dimension`` par défaut).
+
+    Returns:
+        dict: structure décrite en tête de module.
+    """
+    if granularite not in GRANULARITES:
+        raise ValueError(f"Granularité inconnue : {granularite}")
+
+    aujourd_hui = timezone.localdate()
+    if date_debut is None and date_fin is None:
+        # Par défaut : l'année civile en cours complète
+        date_debut = aujourd_hui.replace(month=1, day=1)
+        date_fin = aujourd_hui.replace(month=12, day=31)
+    date_fin = date_fin or aujourd_hui
+    date_debut = date_debut or date_fin.replace(month=1, day=1)
+    if date_debut > date_fin:
+        raise ValueError("date_debut doit précéder date_fin.")
+
+    calendrier = periodes(date_debut, date_fin, granularite)
+    if len(calendrier) > MAX_PERIODES:
+        raise ValueError(
+            f"La période demandée contient plus de {MAX_PERIODES} intervalles ; choisissez une granularité plus large."
+        )
+
+    annotations = {'periode': GRANULARITES[granularite](champ_date, output_field=DateField())}
+    if dimension:
+        annotations['cle'] = F(champ_dimension or dimension)
+    lignes = (
+        queryset.filter(**filtre_periode(queryset.model, champ_date, date_debut, date_fin))
+        .annotate(**annotations)
+        .values(*annotations)
+        .annotate(**mesures)
+        .order_by()
+    )
+
+    valeurs = {}
+    cles = []
+    for ligne in lignes:
+        cle = ligne['cle'] if dimension else None
+        if cle not in valeurs:
+            valeurs[cle] = {}
+            cles.append(cle)
+        valeurs[cle][ligne['periode']] = ligne
+    if not dimension:
+        cles = [None]
+
+    series = []
+    for cle in sorted(cles, key=lambda c: (c is None, str(c))):
+        par_periode = valeurs.get(cle, {})
+        points = []
+        for periode in calendrier:
+            ligne = par_periode.get(periode, {})
+            point = {'periode': periode.isoformat()}
+            for nom in mesures:
+                point[nom] = _valeur(ligne.get(nom))
+            points.append(point)
+        series.append({'cle': cle, 'points': points})
+
+    return {
+        'granularite': granularite,
+        'date_debut': date_debut.isoformat(),
+        'date_fin': date_fin.isoformat(),
+        'mesures': list(mesures),
+        'dimension': dimension,
+        'series': series,
+    }
+
+
+def parametres_serie(query_params, dimensions=None):
+    """
+    Lit ``granularite``, ``date_debut``, ``date_fin`` et ``dimension`` depuis
+    les paramètres de requête. ``dimensions`` associe les noms publics
+    autorisés aux chemins de champ. Lève ValueError si un paramètre est invalide.
+    """
+    parametres = {'granularite': query_params.get('granularite', 'month')}
+    if parametres['granularite'] not in GRANULARITES:
+        raise ValueError(
+            f"granularite doit valoir {', '.join(GRANULARITES)}."
+        )
+
+    for nom in ('date_debut', 'date_fin'):
+        brut = query_params.get(nom)
+        if brut:
+            valeur = parse_date(brut)
+            if valeur is None:
+                raise ValueError(f"{nom} doit être une date au format AAAA-MM-JJ.")
+            parametres[nom] = valeur
+
+    dimension = query_params.get('dimension')
+    if dimension:
+        if not dimensions or dimension not in dimensions:
+            raise ValueError(
+                f"dimension doit valoir {', '.join(dimensions or [])}."
+            )
+        parametres['dimension'] = dimension
+        parametres['champ_dimension'] = dimensions[dimension]
+
+    return parametres
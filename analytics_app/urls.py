@@ -0,0 +1,13 @@
+from django.urls import path
+
+from .views import ClassementView, EntonnoirView, PivotView, RollupView
+
+app_name = 'analytics_api'
+
+urlpatterns = [
+    path('analytics/rollups/', RollupView.as_view(), name='rollups'),
+    path('analytics/classement/', ClassementView.as_view(), name='classement'),
+    path('analytics/entonnoir/', EntonnoirView.as_view(), name='entonnoir'),
+    path('analytics/pivot/', PivotView.as_view(), name='pivot-sources'),
+    path('analytics/pivot/<str:source>/', PivotView.as_view(), name='pivot'),
+]
@@ -0,0 +1,136 @@
+from django.db.models import Sum
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from document.cache import stale_while_revalidate
+from .funnel import entonnoir
+from .leaderboard import classement
+from .models import DailyRollup
+from .pivot import parametres_pivot, pivot, registre
+from .timeseries import parametres_serie, serie_temporelle
+
+MESURES_ROLLUP = ('nombre', 'montant_ht', 'montant_ttc', 'montant_paye', 'valeur_pipeline')
+
+
+class RollupView(APIView):
+    """
+    Séries temporelles lues depuis les agrégats journaliers.
+
+    Paramètres : ``source`` (obligatoire), ``granularite``, ``date_debut``,
+    ``date_fin``, ``dimension`` et les filtres ``entity``, ``departement``,
+    ``produit``, ``responsable``, ``statut``.
+    """
+    permission_classes = [IsAuthenticated]
+    dimensions = {
+        'entity': 'entity_id',
+        'departement': 'departement_id',
+        'produit': 'produit_id',
+        'responsable': 'responsable_id',
+        'statut': 'statut',
+    }
+
+    @stale_while_revalidate()
+    def get(self, request):
+        source = request.query_params.get('source')
+        sources = dict(DailyRollup.SOURCE_CHOICES)
+        if source not in sources:
+            return Response(
+                {"detail": f"source doit valoir {', '.join(sources)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            parametres = parametres_serie(request.query_params, self.dimensions)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = DailyRollup.objects.filter(source=source)
+        try:
+            # Un identifiant non numérique (?entity=abc) lève ValueError
+            for nom, champ in self.dimensions.items():
+                valeur = request.query_params.get(nom)
+                if valeur:
+                    queryset = queryset.filter(**{champ: valeur})
+            data = serie_temporelle(
+                queryset, 'jour', {mesure: Sum(mesure) for mesure in MESURES_ROLLUP}, **parametres
+            )
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        data['source'] = source
+        return Response(data)
+
+
+class PivotView(APIView):
+    """
+    Tableau croisé sur une source déclarée dans un module ``analytics.py``.
+
+    ``GET analytics/pivot/`` liste les sources ; ``GET analytics/pivot/<source>/
+    ?rows=entity&cols=statut&measure=sum:montant_ttc`` exécute le croisement.
+    Les autres paramètres filtrent sur des dimensions (``?statut=PAYEE``).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, source=None):
+        if source is None:
+            return Response([registre[nom].decrire() for nom in sorted(registre)])
+        if source not in registre:
+            return Response({"detail": f"Source inconnue : {source}"}, status=status.HTTP_404_NOT_FOUND)
+        return self._pivot(request, source)
+
+    @stale_while_revalidate()
+    def _pivot(self, request, source):
+        try:
+            return Response(pivot(source, **parametres_pivot(source, request.query_params)))
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class EntonnoirView(APIView):
+    """
+    Entonnoir de conversion et temps passé par statut des offres ou affaires.
+
+    Paramètres : ``source`` (offre, affaire), ``date_debut``, ``date_fin``
+    (cohortes par mois de création ; l'année en cours par défaut) et
+    ``par=entity``.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        params = request.query_params
+        aujourd_hui = timezone.localdate()
+        try:
+            bornes = parametres_serie(params)
+            date_debut = bornes.get('date_debut') or aujourd_hui.replace(month=1, day=1)
+            date_fin = bornes.get('date_fin') or aujourd_hui
+            data = entonnoir(
+                params.get('source', 'offre'), date_debut, date_fin,
+                par_entity=params.get('par') == 'entity',
+            )
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(data)
+
+
+class ClassementView(APIView):
+    """
+    Classement des responsables (montant gagné, affaires ouvertes / en
+    retard, facturé, encaissé).
+
+    Paramètres : ``tri``, ``limite`` et, pour une période, ``date_debut`` /
+    ``date_fin`` (servis par les agrégats journaliers).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            bornes = parametres_serie(request.query_params)
+            limite = min(max(int(request.query_params.get('limite', 20)), 1), 500)
+            data = classement(
+                tri=request.query_params.get('tri', 'montant_gagne'), limite=limite,
+                date_debut=bornes.get('date_debut'), date_fin=bornes.get('date_fin'),
+            )
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(data)
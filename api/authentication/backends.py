@@ -1,10 +1,12 @@
 import jwt
 
 from rest_framework import authentication, exceptions
+from rest_framework_simplejwt.authentication import JWTAuthentication
 from django.conf import settings
 
 from api.user.models import User
 from api.authentication.models import ActiveSession
+from api.authentication.token_cache import is_revoked, token_cache, user_from_entry
 
 
 class ActiveSessionAuthentication(authentication.BaseAuthentication):
@@ -27,12 +29,19 @@ class ActiveSessionAuthentication(authentication.BaseAuthentication):
     def _authenticate_credentials(self, token):
 
         try:
-            jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
         except:
             raise exceptions.AuthenticationFailed(self.auth_error_message)
 
+        entry = token_cache.get(token)
+        if entry is not None:
+            if not entry.is_active:
+                msg = {"success": False, "msg": "This user has been deactivated."}
+                raise exceptions.AuthenticationFailed(msg)
+            return (user_from_entry(entry), token)
+
         try:
-            active_session = ActiveSession.objects.get(token=token)
+            active_session = ActiveSession.objects.select_related("user").get(token=token)
         except:
             raise exceptions.AuthenticationFailed(self.auth_error_message)
 
@@ -46,4 +55,36 @@ class ActiveSessionAuthentication(authentication.BaseAuthentication):
             msg = {"success": False, "msg": "This user has been deactivated."}
             raise exceptions.AuthenticationFailed(msg)
 
+        token_cache.set(token, user, token, payload.get("exp"))
         return (user, token)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    SimpleJWT authentication backed by the token cache: a token seen
+    recently is served from memory, without validating it again or
+    loading the user from the database.
+    """
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        entry = token_cache.get(raw_token)
+        if entry is not None:
+            if not entry.is_active:
+                raise exceptions.AuthenticationFailed("User is inactive", code="user_inactive")
+            return user_from_entry(entry), entry.auth
+
+        validated_token = self.get_validated_token(raw_token)
+        if is_revoked(raw_token):
+            raise exceptions.AuthenticationFailed("Token has been revoked", code="token_not_valid")
+
+        user = self.get_user(validated_token)
+        token_cache.set(raw_token, user, validated_token, validated_token.get("exp"))
+        return user, validated_token
@@ -1,7 +1,17 @@
 from django.db import models
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from api.authentication.token_cache import revoke_token
 
 
 class ActiveSession(models.Model):
     user = models.ForeignKey("api_user.User", on_delete=models.CASCADE)
     token = models.CharField(max_length=255)
     date = models.DateTimeField(auto_now_add=True)
+
+
+@receiver(post_delete, sender=ActiveSession)
+def revoke_session_token(sender, instance, **kwargs):
+    """Logging out deletes the session: its token must stop authenticating."""
+    revoke_token(instance.token)
@@ -0,0 +1,162 @@
+"""
+Bounded LRU/TTL cache of validated tokens.
+
+Each entry maps a raw token to the authenticated identity (user id, active
+flag, department and a detached user instance) so that steady-state
+requests authenticate without touching the database.
+
+Entries are local to the process; invalidation goes through the Django
+cache named by ``TOKEN_CACHE['CACHE_ALIAS']``:
+- a revoked token (logout) is flagged under ``auth:revoked:<digest>``;
+- a per-user generation counter is bumped whenever the user is saved or
+  deleted (deactivation, department change, ...), which makes every cached
+  entry of that user stale.
+
+Invalidation only reaches other processes when that cache is shared (the
+``auth`` alias uses Redis when ``REDIS_URL`` is set). With the local-memory
+fallback it is per-process: other workers keep serving a revoked token or a
+deactivated user until their entry expires (``TTL``, 300 s by default).
+
+``QuerySet.update()`` (e.g. ``User.objects.filter(...).update(is_active=False)``)
+sends no signal: call ``invalidate_user`` for each affected user afterwards.
+"""
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.core.cache import caches
+
+DEFAULT_MAX_SIZE = 10000
+DEFAULT_TTL = 300
+
+_PERMISSION_CACHES = ('_perm_cache', '_user_perm_cache', '_group_perm_cache')
+
+CachedIdentity = namedtuple(
+    'CachedIdentity',
+    ['user_id', 'is_active', 'departement', 'user', 'auth', 'expires_at', 'generation'],
+)
+
+
+def _digest(token):
+    if isinstance(token, bytes):
+        token = token.decode('utf-8')
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def _revoked_key(digest):
+    return f'auth:revoked:{digest}'
+
+
+def _generation_key(user_id):
+    return f'auth:user:{user_id}:generation'
+
+
+class TokenCache:
+    """Thread-safe LRU cache with a per-entry expiry."""
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE, ttl=DEFAULT_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token):
+        """Return the cached identity for ``token`` if it is still valid, or None."""
+        digest = _digest(token)
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+            if entry.expires_at <= time.time():
+                del self._entries[digest]
+                return None
+            self._entries.move_to_end(digest)
+
+        shared = cache.get_many([_revoked_key(digest), _generation_key(entry.user_id)])
+        if shared.get(_revoked_key(digest)) or shared.get(_generation_key(entry.user_id), 0) != entry.generation:
+            self.invalidate_token(token)
+            return None
+        return entry
+
+    def set(self, token, user, auth, token_expires_at=None):
+        """Cache the identity behind ``token`` until the TTL or the token expiry."""
+        expires_at = time.time() + self.ttl
+        if token_expires_at is not None:
+            expires_at = min(expires_at, token_expires_at)
+
+        detached = copy.copy(user)
+        for attribute in _PERMISSION_CACHES:
+            detached.__dict__.pop(attribute, None)
+
+        entry = CachedIdentity(
+            user_id=user.pk,
+            is_active=user.is_active,
+            departement=getattr(user, 'departement', None),
+            user=detached,
+            auth=auth,
+            expires_at=expires_at,
+            generation=cache.get(_generation_key(user.pk), 0),
+        )
+        with self._lock:
+            self._entries[_digest(token)] = entry
+            self._entries.move_to_end(_digest(token))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate_token(self, token):
+        with self._lock:
+            self._entries.pop(_digest(token), None)
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for digest in [d for d, e in self._entries.items() if e.user_id == user_id]:
+                del self._entries[digest]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def user_from_entry(entry):
+    """Per-request copy of the cached user, so request-level caches never leak."""
+    return copy.copy(entry.user)
+
+
+def revoke_token(token, timeout=None):
+    """Flag ``token`` as revoked (in every process when the cache is shared)."""
+    if timeout is None:
+        timeout = settings.SIMPLE_JWT['ACCESS_TOKEN_LIFETIME'].total_seconds()
+    cache.set(_revoked_key(_digest(token)), True, timeout)
+    token_cache.invalidate_token(token)
+
+
+def is_revoked(token):
+    return bool(cache.get(_revoked_key(_digest(token))))
+
+
+def invalidate_user(user_id):
+    """
+    Drop every cached token of ``user_id`` (in every process when the cache
+    is shared). Called on User save/delete; call it explicitly after a
+    ``QuerySet.update()`` on users.
+    """
+    key = _generation_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+    token_cache.invalidate_user(user_id)
+
+
+_config = getattr(settings, 'TOKEN_CACHE', {})
+cache = caches[_config.get('CACHE_ALIAS', 'default')]
+token_cache = TokenCache(
+    max_size=_config.get('MAX_SIZE', DEFAULT_MAX_SIZE),
+    ttl=_config.get('TTL', DEFAULT_TTL),
+)
@@ -1,9 +1,10 @@
-from rest_framework import viewsets, mixins
+from rest_framework import authentication, viewsets, mixins
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 
 from api.authentication.models import ActiveSession
+from api.authentication.token_cache import revoke_token
 
 
 class LogoutViewSet(viewsets.GenericViewSet, mixins.CreateModelMixin):
@@ -12,8 +13,12 @@ class LogoutViewSet(viewsets.GenericViewSet, mixins.CreateModelMixin):
     def create(self, request, *args, **kwargs):
         user = request.user
 
-        session = ActiveSession.objects.get(user=user)
-        session.delete()
+        auth_header = authentication.get_authorization_header(request).split()
+        if auth_header:
+            revoke_token(auth_header[-1])
+
+        for session in ActiveSession.objects.filter(user=user):
+            session.delete()
 
         return Response(
             {"success": True, "msg": "Token revoked"}, status=status.HTTP_200_OK
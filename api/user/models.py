@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 
 from django.contrib.auth.models import (
     AbstractBaseUser,
@@ -6,6 +8,8 @@ from django.contrib.auth.models import (
     PermissionsMixin,
 )
 
+from api.authentication.token_cache import invalidate_user
+
 
 class UserManager(BaseUserManager):
     def create_user(self, username, email, password=None, **kwargs):
@@ -62,3 +66,10 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     def __str__(self):
         return f"{self.email}"
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_cached_tokens(sender, instance, created=False, **kwargs):
+    """Any change to the user (deactivation, department, ...) drops their cached tokens."""
+    if not created:
+        invalidate_user(instance.pk)
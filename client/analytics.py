@@ -0,0 +1,19 @@
+from analytics_app.pivot import annee, mois, register
+
+from .models import Client
+
+register(
+    'clients', Client,
+    champ_date='created_at',
+    dimensions={
+        'est_client': 'est_client',
+        'agree': 'agree',
+        'secteur': 'secteur_activite',
+        'categorie': 'categorie__nom',
+        'ville': 'ville__nom',
+        'region': 'ville__region__nom',
+        'mois': mois('created_at'),
+        'mois_conversion': mois('date_conversion_client'),
+        'annee_conversion': annee('date_conversion_client'),
+    },
+)
@@ -0,0 +1,154 @@
+"""
+Cohortes prospect → client.
+
+Les prospects sont regroupés par mois de création, les conversions par
+mois de ``date_conversion_client`` (index dédié). Toutes les agrégations
+utilisent les fonctions ``Trunc`` de Django, portables entre SQLite et
+PostgreSQL, et conservent l'année.
+"""
+import math
+from collections import defaultdict
+
+from django.db.models import Count, DateField, F, Q
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from analytics_app.timeseries import filtre_periode, periodes
+
+from .models import Client
+
+DIMENSIONS = {
+    'categorie': 'categorie__nom',
+    'ville': 'ville__nom',
+    'region': 'ville__region__nom',
+}
+
+# Tranches de délai de conversion (en jours) : (libellé, borne haute incluse)
+TRANCHES_DELAI = [
+    ('0_7', 7),
+    ('8_30', 30),
+    ('31_90', 90),
+    ('91_180', 180),
+    ('181_365', 365),
+    ('365_plus', None),
+]
+
+CONVERTI = Q(est_client=True, date_conversion_client__isnull=False)
+
+
+def _mois(champ):
+    return TruncMonth(champ, output_field=DateField())
+
+
+def _ecart_mois(debut, fin):
+    return (fin.year - debut.year) * 12 + fin.month - debut.month
+
+
+def _percentile(valeurs_triees, p):
+    if not valeurs_triees:
+        return None
+    return valeurs_triees[min(len(valeurs_triees), max(1, math.ceil(p / 100 * len(valeurs_triees)))) - 1]
+
+
+def cohortes(date_debut, date_fin, par=None, queryset=None):
+    """
+    Analyse de cohortes sur les fiches créées entre ``date_debut`` et ``date_fin``.
+
+    Returns:
+        dict:
+        - ``cohortes`` : par mois de création, nombre de fiches, de conversions
+          et conversions cumulées par mois écoulé (M0, M1, …) ;
+        - ``conversions`` : conversions par mois de ``date_conversion_client``
+          sur la même période, toutes cohortes confondues ;
+        - ``delais`` : distribution du délai de conversion (jours) ;
+        - ``repartition`` : si ``par`` (categorie, ville, region), fiches,
+          conversions et taux par valeur de la dimension.
+    """
+    if par is not None and par not in DIMENSIONS:
+        raise ValueError(f"par doit valoir {', '.join(DIMENSIONS)}.")
+    if date_debut > date_fin:
+        raise ValueError("date_debut doit précéder date_fin.")
+
+    base = queryset if queryset is not None else Client.objects.all()
+    cohorte_qs = base.filter(**filtre_periode(Client, 'created_at', date_debut, date_fin))
+    calendrier = periodes(date_debut, date_fin, 'month')
+
+    # 1. Matrice cohorte × mois de conversion, en une requête
+    matrice = defaultdict(lambda: {'fiches': 0, 'convertis': defaultdict(int)})
+    lignes = (
+        cohorte_qs
+        .annotate(cohorte=_mois('created_at'), conversion=_mois('date_conversion_client'))
+        .values('cohorte', 'conversion', 'est_client')
+        .annotate(n=Count('pk'))
+        .order_by()
+    )
+    for ligne in lignes:
+        cellule = matrice[ligne['cohorte']]
+        cellule['fiches'] += ligne['n']
+        if ligne['est_client'] and ligne['conversion'] is not None:
+            cellule['convertis'][max(_ecart_mois(ligne['cohorte'], ligne['conversion']), 0)] += ligne['n']
+
+    resultat_cohortes = []
+    for mois in calendrier:
+        cellule = matrice.get(mois, {'fiches': 0, 'convertis': {}})
+        horizon = _ecart_mois(mois, calendrier[-1])
+        cumul, courbe = 0, []
+        for ecart in range(horizon + 1):
+            cumul += cellule['convertis'].get(ecart, 0)
+            courbe.append(cumul)
+        # Conversions enregistrées après la fin de la période
+        cumul += sum(n for ecart, n in cellule['convertis'].items() if ecart > horizon)
+        resultat_cohortes.append({
+            'cohorte': mois.isoformat(),
+            'fiches': cellule['fiches'],
+            'convertis': cumul,
+            'taux': round(cumul / cellule['fiches'], 4) if cellule['fiches'] else None,
+            'cumul_par_mois': courbe,
+        })
+
+    # 2. Conversions par mois de conversion (index sur date_conversion_client)
+    conversions = {
+        ligne['mois']: ligne['n']
+        for ligne in base.filter(CONVERTI, date_conversion_client__gte=date_debut, date_conversion_client__lte=date_fin)
+        .annotate(mois=_mois('date_conversion_client'))
+        .values('mois').annotate(n=Count('pk')).order_by()
+    }
+
+    # 3. Distribution du délai de conversion
+    delais = sorted(
+        max((conversion - timezone.localtime(cree).date()).days, 0)
+        for cree, conversion in cohorte_qs.filter(CONVERTI).values_list('created_at', 'date_conversion_client')
+    )
+    distribution = {libelle: 0 for libelle, _borne in TRANCHES_DELAI}
+    for delai in delais:
+        for libelle, borne in TRANCHES_DELAI:
+            if borne is None or delai <= borne:
+                distribution[libelle] += 1
+                break
+
+    data = {
+        'date_debut': date_debut.isoformat(),
+        'date_fin': date_fin.isoformat(),
+        'cohortes': resultat_cohortes,
+        'conversions': [{'mois': mois.isoformat(), 'count': conversions.get(mois, 0)} for mois in calendrier],
+        'delais': {
+            'nombre': len(delais),
+            'mediane_jours': _percentile(delais, 50),
+            'p90_jours': _percentile(delais, 90),
+            'distribution': distribution,
+        },
+        'par': par,
+        'repartition': [],
+    }
+
+    # 4. Répartition par catégorie, ville ou région
+    if par:
+        for ligne in (
+            cohorte_qs.values(valeur=F(DIMENSIONS[par]))
+            .annotate(fiches=Count('pk'), convertis=Count('pk', filter=CONVERTI))
+            .order_by('valeur')
+        ):
+            ligne['taux'] = round(ligne['convertis'] / ligne['fiches'], 4) if ligne['fiches'] else None
+            data['repartition'].append(ligne)
+    return data
+
@@ -0,0 +1,404 @@
+"""
+Détection des doublons de clients et de contacts.
+
+Comparer toutes les paires est quadratique. Chaque enregistrement reçoit
+donc des clés de blocage (``CleDoublon``) :
+
+- clients : chaque mot significatif du nom normalisé, le début du nom
+  compacté, le domaine de l'email (hors messageries grand public) et le
+  téléphone normalisé ;
+- contacts : l'email, chaque téléphone (fixe, mobile) et le nom complet
+  normalisé.
+
+Seules les paires partageant au moins une clé sont comparées (``difflib``
+sur les noms, bonus pour un téléphone, un email ou un domaine communs,
+pénalité quand les noms portent des numéros différents) ; les blocs de
+plus de ``MAX_BLOC`` enregistrements (clé trop commune) sont ignorés.
+Les paires dont le score atteint ``SEUIL_STOCKAGE`` sont
+enregistrées dans ``DoublonPotentiel`` puis regroupées en grappes
+(composantes connexes) classées par score.
+
+La détection est incrémentale : chaque enregistrement créé ou modifié est
+analysé après le commit contre les seuls enregistrements de ses blocs
+(signaux de ``client.models``). La commande ``detecter_doublons`` reconstruit
+l'ensemble ou traite les enregistrements modifiés depuis une date.
+"""
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+from difflib import SequenceMatcher
+from itertools import combinations
+
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .models import CleDoublon, Client, Contact, DoublonPotentiel
+
+SEUIL = 0.85
+SEUIL_STOCKAGE = 0.75
+MAX_BLOC = 200
+PENALITE_NUMEROS = 0.7
+TAILLE_LOT = 2000
+
+MOTS_VIDES = {
+    'sa', 'sarl', 'sas', 'sasu', 'eurl', 'sci', 'gie', 'ets', 'etablissement', 'etablissements',
+    'societe', 'ste', 'cie', 'compagnie', 'group', 'groupe', 'international', 'the', 'and',
+    'de', 'des', 'du', 'la', 'le', 'les', 'et', 'en', 'au', 'aux', 'of',
+}
+DOMAINES_GENERIQUES = {
+    'gmail.com', 'yahoo.com', 'yahoo.fr', 'hotmail.com', 'hotmail.fr', 'outlook.com', 'outlook.fr',
+    'live.com', 'live.fr', 'icloud.com', 'aol.com', 'msn.com', 'ymail.com', 'protonmail.com',
+}
+
+
+def jetons(texte):
+    """Mots normalisés (sans accents, minuscules) hors mots vides."""
+    texte = unicodedata.normalize('NFKD', texte or '').encode('ascii', 'ignore').decode().lower()
+    return [mot for mot in re.split(r'[^a-z0-9]+', texte) if mot and mot not in MOTS_VIDES]
+
+
+def telephone(valeur):
+    """Neuf derniers chiffres du numéro (indicatif pays ignoré), ou None."""
+    chiffres = re.sub(r'\D', '', valeur or '')
+    return chiffres[-9:] if len(chiffres) >= 8 else None
+
+
+def email(valeur):
+    valeur = (valeur or '').strip().lower()
+    return valeur if '@' in valeur else None
+
+
+def domaine(adresse):
+    adresse = email(adresse)
+    if not adresse:
+        return None
+    domaine_email = adresse.rsplit('@', 1)[1]
+    return None if domaine_email in DOMAINES_GENERIQUES else domaine_email
+
+
+def similarite(a, b, minimum=0.0):
+    """
+    Similarité de deux noms normalisés (0 à 1), indépendante de l'ordre des
+    mots. Sous ``minimum``, la valeur retournée est seulement un minorant :
+    les comparaisons ``difflib`` dont la borne rapide est insuffisante sont
+    évitées.
+    """
+    if not a or not b:
+        return 0.0
+    if a == b:
+        return 1.0
+    mots_a, mots_b = a.split(), b.split()
+    communs = set(mots_a) & set(mots_b)
+    meilleur = len(communs) / len(set(mots_a) | set(mots_b))
+    candidats = [(a, b)]
+    tries = (' '.join(sorted(mots_a)), ' '.join(sorted(mots_b)))
+    if tries != (a, b):
+        candidats.append(tries)
+    for x, y in candidats:
+        comparateur = SequenceMatcher(None, x, y, autojunk=False)
+        borne = max(meilleur, minimum)
+        if comparateur.real_quick_ratio() > borne and comparateur.quick_ratio() > borne:
+            meilleur = max(meilleur, comparateur.ratio())
+    return meilleur
+
+
+def _numeros_differents(a, b):
+    """« Agence 1 » et « Agence 2 » : les nombres des deux noms diffèrent."""
+    nombres_a = {mot for mot in a.split() if mot.isdigit()}
+    nombres_b = {mot for mot in b.split() if mot.isdigit()}
+    return bool(nombres_a and nombres_b and nombres_a != nombres_b)
+
+
+# ---------------------------------------------------------------------------
+# Définition des types
+# ---------------------------------------------------------------------------
+
+def _preparer_client(ligne):
+    mots = jetons(ligne['nom'])
+    ligne['_nom'] = ' '.join(mots)
+    ligne['_telephones'] = {telephone(ligne['telephone'])} - {None}
+    ligne['_domaine'] = domaine(ligne['email'])
+    return ligne
+
+
+def _cles_client(ligne):
+    cles = {f"n:{mot}" for mot in ligne['_nom'].split() if len(mot) >= 3}
+    compact = ligne['_nom'].replace(' ', '')
+    if len(compact) >= 4:
+        cles.add(f"p:{compact[:6]}")
+    if ligne['_domaine']:
+        cles.add(f"d:{ligne['_domaine']}")
+    cles.update(f"t:{numero}" for numero in ligne['_telephones'])
+    return cles
+
+
+def _score_client(a, b):
+    bonus, motifs = 0.0, []
+    if a['_telephones'] & b['_telephones']:
+        bonus += 0.15
+        motifs.append('telephone')
+    if a['_domaine'] and a['_domaine'] == b['_domaine']:
+        bonus += 0.1
+        motifs.append('domaine')
+    facteur = PENALITE_NUMEROS if _numeros_differents(a['_nom'], b['_nom']) else 1.0
+    if facteur + bonus < SEUIL_STOCKAGE:
+        return 0.0, []
+    nom = similarite(a['_nom'], b['_nom'], minimum=(SEUIL_STOCKAGE - bonus) / facteur)
+    if nom >= SEUIL_STOCKAGE:
+        motifs.insert(0, 'nom')
+    return min(nom * facteur + bonus, 1.0), motifs
+
+
+def _preparer_contact(ligne):
+    ligne['_nom'] = ' '.join(jetons(f"{ligne['prenom'] or ''} {ligne['nom'] or ''}"))
+    ligne['_telephones'] = {telephone(ligne['telephone']), telephone(ligne['mobile'])} - {None}
+    ligne['_email'] = email(ligne['email'])
+    return ligne
+
+
+def _cles_contact(ligne):
+    cles = {f"t:{numero}" for numero in ligne['_telephones']}
+    if ligne['_email']:
+        cles.add(f"e:{ligne['_email']}")
+    if ligne['_nom']:
+        cles.add(f"n:{' '.join(sorted(ligne['_nom'].split()))}")
+    return cles
+
+
+def _score_contact(a, b):
+    if a['_email'] and a['_email'] == b['_email']:
+        base, poids, motifs = 0.9, 0.1, ['email']
+    elif a['_telephones'] & b['_telephones']:
+        base, poids, motifs = 0.75, 0.25, ['telephone']
+    else:
+        base, poids, motifs = 0.0, 0.95, []
+    nom = similarite(a['_nom'], b['_nom'], minimum=(SEUIL_STOCKAGE - base) / poids)
+    if nom >= SEUIL_STOCKAGE or not motifs:
+        motifs.append('nom')
+    return base + poids * nom, motifs
+
+
+TYPES = {
+    'client': {
+        'modele': Client,
+        'champs': ['id', 'nom', 'email', 'telephone', 'c_num', 'ville__nom'],
+        'preparer': _preparer_client,
+        'cles': _cles_client,
+        'score': _score_client,
+    },
+    'contact': {
+        'modele': Contact,
+        'champs': ['id', 'nom', 'prenom', 'email', 'telephone', 'mobile', 'client_id', 'client__nom'],
+        'preparer': _preparer_contact,
+        'cles': _cles_contact,
+        'score': _score_contact,
+    },
+}
+
+
+def _type(type_):
+    if type_ not in TYPES:
+        raise ValueError(f"type doit valoir {', '.join(TYPES)}.")
+    return TYPES[type_]
+
+
+def _enregistrements(type_, filtre=None):
+    definition = _type(type_)
+    queryset = definition['modele'].objects.all()
+    if filtre is not None:
+        queryset = queryset.filter(filtre)
+    return {
+        ligne['id']: definition['preparer'](ligne)
+        for ligne in queryset.values(*definition['champs']).iterator(chunk_size=TAILLE_LOT)
+    }
+
+
+def _comparer(type_, paires, enregistrements):
+    """{(a, b): (score, motifs)} pour les paires au-dessus de SEUIL_STOCKAGE."""
+    score = TYPES[type_]['score']
+    retenues = {}
+    for a, b in paires:
+        resultat = score(enregistrements[a], enregistrements[b])
+        if resultat[0] >= SEUIL_STOCKAGE:
+            retenues[(a, b)] = resultat
+    return retenues
+
+
+def _enregistrer_paires(type_, retenues):
+    DoublonPotentiel.objects.bulk_create(
+        [
+            DoublonPotentiel(type=type_, objet_a=a, objet_b=b, score=round(score, 4), motifs=motifs)
+            for (a, b), (score, motifs) in retenues.items()
+        ],
+        batch_size=TAILLE_LOT,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Analyse
+# ---------------------------------------------------------------------------
+
+def analyser(type_):
+    """
+    Reconstruit les clés et les doublons de tout un type.
+
+    Returns:
+        int: nombre de paires enregistrées.
+    """
+    enregistrements = _enregistrements(type_)
+    cles = TYPES[type_]['cles']
+    blocs = defaultdict(list)
+    lignes_cles = []
+    for pk, ligne in enregistrements.items():
+        for cle in cles(ligne):
+            blocs[cle].append(pk)
+            lignes_cles.append(CleDoublon(type=type_, objet_id=pk, cle=cle[:150]))
+
+    paires = set()
+    for membres in blocs.values():
+        if 1 < len(membres) <= MAX_BLOC:
+            paires.update(combinations(sorted(membres), 2))
+    retenues = _comparer(type_, paires, enregistrements)
+
+    with transaction.atomic():
+        CleDoublon.objects.filter(type=type_).delete()
+        CleDoublon.objects.bulk_create(lignes_cles, batch_size=TAILLE_LOT)
+        DoublonPotentiel.objects.filter(type=type_).delete()
+        _enregistrer_paires(type_, retenues)
+    return len(retenues)
+
+
+def analyser_objets(type_, ids):
+    """
+    Met à jour les clés et les doublons des enregistrements ``ids`` en les
+    comparant aux seuls enregistrements de leurs blocs.
+
+    Returns:
+        int: nombre de paires enregistrées.
+    """
+    ids = set(ids)
+    nouveaux = _enregistrements(type_, Q(pk__in=ids))
+    cles_par_objet = {pk: {cle[:150] for cle in TYPES[type_]['cles'](ligne)} for pk, ligne in nouveaux.items()}
+    toutes_cles = set().union(*cles_par_objet.values()) if cles_par_objet else set()
+
+    with transaction.atomic():
+        oublier(type_, ids)
+        CleDoublon.objects.bulk_create(
+            [CleDoublon(type=type_, objet_id=pk, cle=cle) for pk, cles in cles_par_objet.items() for cle in cles],
+            batch_size=TAILLE_LOT,
+        )
+        cles_utiles = list(
+            CleDoublon.objects.filter(type=type_, cle__in=toutes_cles)
+            .values('cle').annotate(n=Count('id')).filter(n__gt=1, n__lte=MAX_BLOC)
+            .values_list('cle', flat=True)
+        )
+        membres = defaultdict(set)
+        for objet_id, cle in CleDoublon.objects.filter(type=type_, cle__in=cles_utiles).values_list('objet_id', 'cle'):
+            membres[cle].add(objet_id)
+
+        paires = set()
+        for pk, cles in cles_par_objet.items():
+            for cle in cles:
+                for autre in membres.get(cle, ()):
+                    if autre != pk:
+                        paires.add((min(pk, autre), max(pk, autre)))
+        autres = {pk for paire in paires for pk in paire} - set(nouveaux)
+        enregistrements = {**nouveaux, **_enregistrements(type_, Q(pk__in=autres))} if autres else nouveaux
+        paires = {paire for paire in paires if paire[0] in enregistrements and paire[1] in enregistrements}
+        retenues = _comparer(type_, paires, enregistrements)
+        _enregistrer_paires(type_, retenues)
+    return len(retenues)
+
+
+def oublier(type_, ids):
+    """Supprime les clés et les paires des enregistrements ``ids``."""
+    ids = list(ids)
+    CleDoublon.objects.filter(type=type_, objet_id__in=ids).delete()
+    DoublonPotentiel.objects.filter(Q(objet_a__in=ids) | Q(objet_b__in=ids), type=type_).delete()
+
+
+_pending = threading.local()
+
+
+def planifier(type_, ids):
+    """Programme l'analyse après le commit ; regroupe les demandes d'une transaction."""
+    en_attente = getattr(_pending, 'ids', None)
+    if en_attente is None:
+        en_attente = _pending.ids = defaultdict(set)
+    en_attente[type_].update(pk for pk in ids if pk is not None)
+    transaction.on_commit(_executer)
+
+
+def _executer():
+    en_attente = getattr(_pending, 'ids', None)
+    if not en_attente:
+        return
+    _pending.ids = None
+    for type_, ids in en_attente.items():
+        if ids:
+            analyser_objets(type_, ids)
+
+
+# ---------------------------------------------------------------------------
+# Grappes
+# ---------------------------------------------------------------------------
+
+def _racine(parents, pk):
+    while parents[pk] != pk:
+        parents[pk] = parents[parents[pk]]
+        pk = parents[pk]
+    return pk
+
+
+def grappes(type_, seuil=SEUIL, limite=50, objet_id=None):
+    """
+    Grappes de doublons probables, de la plus sûre à la moins sûre.
+
+    Args:
+        seuil: score minimal des paires prises en compte.
+        objet_id: ne retourne que la grappe contenant cet enregistrement.
+
+    Returns:
+        list: [{score, taille, enregistrements, paires}]
+    """
+    _type(type_)
+    paires = list(
+        DoublonPotentiel.objects.filter(type=type_, score__gte=seuil)
+        .values_list('objet_a', 'objet_b', 'score', 'motifs')
+    )
+    parents = {}
+    for a, b, _score, _motifs in paires:
+        parents.setdefault(a, a)
+        parents.setdefault(b, b)
+        parents[_racine(parents, a)] = _racine(parents, b)
+
+    groupes = defaultdict(lambda: {'ids': set(), 'paires': []})
+    for a, b, score, motifs in paires:
+        groupe = groupes[_racine(parents, a)]
+        groupe['ids'].update((a, b))
+        groupe['paires'].append({'a': a, 'b': b, 'score': score, 'motifs': motifs})
+
+    resultats = list(groupes.values())
+    if objet_id is not None:
+        resultats = [groupe for groupe in resultats if objet_id in groupe['ids']]
+    resultats.sort(key=lambda groupe: (
+        -max(paire['score'] for paire in groupe['paires']), -len(groupe['ids'])
+    ))
+    resultats = resultats[:limite]
+
+    ids = set().union(*(groupe['ids'] for groupe in resultats)) if resultats else set()
+    champs = TYPES[type_]['champs']
+    details = {
+        ligne['id']: ligne
+        for ligne in TYPES[type_]['modele'].objects.filter(pk__in=ids).values(*champs)
+    }
+    return [
+        {
+            'score': max(paire['score'] for paire in groupe['paires']),
+            'taille': len(groupe['ids']),
+            'enregistrements': [details[pk] for pk in sorted(groupe['ids']) if pk in details],
+            'paires': sorted(groupe['paires'], key=lambda paire: -paire['score']),
+        }
+        for groupe in resultats
+    ]
@@ -0,0 +1,120 @@
+"""
+Arbre géographique Région → Ville → Client → Contact.
+
+L'arbre complet est construit en quatre requêtes plates puis conservé en
+mémoire du processus. Une version stockée dans le cache Django permet
+d'invalider l'arbre de tous les processus lorsqu'une région, une ville,
+un client ou un contact est modifié (voir les signaux de ``client.models``).
+Les filtres par région ou par ville extraient simplement un sous-arbre.
+"""
+import threading
+
+from django.core.cache import cache
+
+from .models import Client, Contact, Region, Ville
+
+VERSION_CACHE_KEY = 'client:hierarchie:version'
+
+CLIENT_FIELDS = [
+    'id', 'nom', 'email', 'telephone', 'adresse',
+    'c_num', 'secteur_activite', 'bp', 'quartier',
+    'matricule', 'agree', 'entite',
+]
+CONTACT_FIELDS = [
+    'id', 'nom', 'prenom', 'email', 'telephone',
+    'mobile', 'poste', 'service',
+    'quartier', 'bp', 'notes',
+]
+
+_arbre = {'version': None, 'regions': [], 'index_regions': {}, 'index_villes': {}}
+_lock = threading.Lock()
+
+
+def invalider_hierarchie():
+    """Invalide l'arbre pour tous les processus partageant le cache."""
+    try:
+        cache.incr(VERSION_CACHE_KEY)
+    except ValueError:
+        cache.set(VERSION_CACHE_KEY, 1, None)
+
+
+def _version_courante():
+    version = cache.get(VERSION_CACHE_KEY)
+    if version is None:
+        cache.add(VERSION_CACHE_KEY, 1, None)
+        version = cache.get(VERSION_CACHE_KEY, 1)
+    return version
+
+
+def _construire():
+    """Construit l'arbre complet à partir de quatre requêtes ``values()``."""
+    contacts_par_client = {}
+    for contact in Contact.objects.filter(client__isnull=False).order_by('nom').values('client_id', *CONTACT_FIELDS):
+        contacts_par_client.setdefault(contact.pop('client_id'), []).append(contact)
+
+    clients_par_ville = {}
+    for client in Client.objects.filter(ville__isnull=False).order_by('nom').values('ville_id', *CLIENT_FIELDS):
+        client['contacts'] = contacts_par_client.get(client['id'], [])
+        clients_par_ville.setdefault(client.pop('ville_id'), []).append(client)
+
+    villes_par_region = {}
+    index_villes = {}
+    for ville in Ville.objects.order_by('nom').values('id', 'nom', 'region_id'):
+        region_id = ville.pop('region_id')
+        ville['clients'] = clients_par_ville.get(ville['id'], [])
+        villes_par_region.setdefault(region_id, []).append(ville)
+        index_villes[ville['id']] = (region_id, ville)
+
+    regions = []
+    index_regions = {}
+    for region in Region.objects.order_by('nom').values('id', 'nom', 'pays__nom'):
+        noeud = {
+            'id': region['id'],
+            'nom': region['nom'],
+            'pays_nom': region['pays__nom'],
+            'villes': villes_par_region.get(region['id'], []),
+        }
+        regions.append(noeud)
+        index_regions[noeud['id']] = noeud
+
+    return regions, index_regions, index_villes
+
+
+def _arbre_courant():
+    version = _version_courante()
+    if _arbre['version'] != version:
+        with _lock:
+            if _arbre['version'] != version:
+                regions, index_regions, index_villes = _construire()
+                _arbre.update(
+                    version=version,
+                    regions=regions,
+                    index_regions=index_regions,
+                    index_villes=index_villes,
+                )
+    return _arbre
+
+
+def get_hierarchie(region_id=None, ville_id=None):
+    """
+    Retourne la liste des régions avec leurs villes, clients et contacts.
+
+    ``region_id`` restreint à une région, ``ville_id`` à une seule ville
+    (dans sa région). Les identifiants inconnus retournent une liste vide.
+    """
+    arbre = _arbre_courant()
+
+    if ville_id is not None:
+        region_de_la_ville, ville = arbre['index_villes'].get(ville_id, (None, None))
+        if ville is None or (region_id is not None and region_id != region_de_la_ville):
+            return []
+        region = arbre['index_regions'].get(region_de_la_ville)
+        if region is None:
+            return []
+        return [dict(region, villes=[ville])]
+
+    if region_id is not None:
+        region = arbre['index_regions'].get(region_id)
+        return [region] if region else []
+
+    return arbre['regions']
@@ -0,0 +1,438 @@
+"""
+Import en masse de clients, sites et contacts depuis un fichier CSV ou XLSX.
+
+Le fichier est lu en flux (``csv`` ou ``exports_app.xlsx.iter_xlsx_rows``)
+et traité par lots de ``taille_lot`` lignes :
+
+1. conversion des cellules selon le type du champ cible et résolution des
+   références (ville / région, catégorie depuis des référentiels chargés une
+   fois ; client et site du lot en une requête) ;
+2. validation de chaque ligne par ``full_clean`` (sans les requêtes
+   d'unicité ni de clés étrangères, déjà résolues) ;
+3. hors simulation, attribution des numéros (``c_num`` / ``s_num``) pour
+   tout le lot puis ``bulk_create``.
+
+Les lignes invalides sont écartées et décrites dans le rapport (numéro de
+ligne et erreurs par champ) ; les autres sont importées. ``bulk_create``
+ne déclenchant pas les signaux, l'arbre géographique est invalidé une fois
+à la fin et la recherche de doublons est programmée pour chaque lot.
+"""
+import csv
+import io
+import re
+import unicodedata
+from collections import defaultdict
+from datetime import datetime
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import Count, Q
+from django.utils.dateparse import parse_date
+from django.utils.timezone import now
+
+from exports_app.xlsx import date_depuis_serie, iter_xlsx_rows
+
+from .dedupe import planifier as planifier_dedoublonnage
+from .geography import invalider_hierarchie
+from .models import Categorie, Client, Contact, Site, Ville
+
+TAILLE_LOT = 500
+MAX_ERREURS = 1000
+
+# Colonnes acceptées (en-têtes normalisés) -> champ du modèle
+COLONNES = {
+    'clients': {
+        'nom': 'nom', 'email': 'email', 'telephone': 'telephone', 'adresse': 'adresse',
+        'secteur_activite': 'secteur_activite', 'secteur': 'secteur_activite',
+        'bp': 'bp', 'boite_postale': 'bp', 'quartier': 'quartier', 'matricule': 'matricule',
+        'est_client': 'est_client', 'date_conversion_client': 'date_conversion_client',
+        'date_conversion': 'date_conversion_client', 'agree': 'agree', 'entite': 'entite',
+    },
+    'sites': {
+        'nom': 'nom', 'localisation': 'localisation', 'description': 'description',
+    },
+    'contacts': {
+        'nom': 'nom', 'prenom': 'prenom', 'email': 'email', 'telephone': 'telephone', 'mobile': 'mobile',
+        'poste': 'poste', 'service': 'service', 'role_achat': 'role_achat', 'date_envoi': 'date_envoi',
+        'relance': 'relance', 'source': 'source', 'valide': 'valide', 'adresse': 'adresse',
+        'quartier': 'quartier', 'bp': 'bp', 'boite_postale': 'bp', 'notes': 'notes',
+    },
+}
+
+# Colonnes de référence (résolues, pas des champs directs)
+REFERENCES = {
+    'clients': {'ville', 'region', 'categorie'},
+    'sites': {'client', 'ville', 'region'},
+    'contacts': {'client', 'site', 'ville', 'region'},
+}
+
+MODELES = {'clients': Client, 'sites': Site, 'contacts': Contact}
+
+# Clés étrangères résolues par l'import : exclues de full_clean
+CLES_RESOLUES = {
+    'clients': ['ville', 'categorie', 'created_by', 'updated_by'],
+    'sites': ['client', 'ville', 'created_by', 'updated_by'],
+    'contacts': ['client', 'site', 'ville', 'created_by', 'updated_by'],
+}
+
+VRAI = {'1', 'oui', 'o', 'true', 'vrai', 'yes', 'y', 'x'}
+FAUX = {'0', 'non', 'n', 'false', 'faux', 'no', ''}
+
+
+def normaliser(texte):
+    """« Secteur d'activité » -> « secteur_activite »"""
+    texte = unicodedata.normalize('NFKD', str(texte or '')).encode('ascii', 'ignore').decode()
+    return re.sub(r'[^a-z0-9]+', '_', texte.lower()).strip('_')
+
+
+# ---------------------------------------------------------------------------
+# Lecture
+# ---------------------------------------------------------------------------
+
+def _lignes_csv(fichier):
+    texte = io.TextIOWrapper(fichier, encoding='utf-8-sig', newline='')
+    debut = texte.readline()
+    delimiteur = ';' if debut.count(';') > debut.count(',') else ','
+    yield from csv.reader([debut], delimiter=delimiteur)
+    yield from csv.reader(texte, delimiter=delimiteur)
+
+
+def lire(fichier, nom_fichier=''):
+    """
+    En-têtes normalisés puis lignes ``(numéro, {en-tête: valeur})`` de
+    ``fichier`` (binaire) ; le format est déduit de l'extension.
+    """
+    if str(nom_fichier).lower().endswith('.xlsx'):
+        # Numéros réels des lignes de la feuille (Excel omet les lignes vides)
+        lignes = iter_xlsx_rows(fichier, numeros=True)
+    else:
+        lignes = enumerate(_lignes_csv(fichier), start=1)
+    entetes = [normaliser(entete) for entete in next(lignes, (None, []))[1]]
+    yield entetes
+    for numero, ligne in lignes:
+        if not any(valeur not in (None, '') for valeur in ligne):
+            continue
+        yield numero, dict(zip(entetes, ligne))
+
+
+# ---------------------------------------------------------------------------
+# Conversion et référentiels
+# ---------------------------------------------------------------------------
+
+def _texte(valeur):
+    if valeur is None:
+        return None
+    if isinstance(valeur, float) and valeur.is_integer():
+        valeur = int(valeur)
+    valeur = str(valeur).strip()
+    return valeur or None
+
+
+def convertir(champ, valeur):
+    """Valeur de cellule -> valeur Python du champ ; lève ValueError."""
+    if isinstance(champ, models.BooleanField):
+        texte = normaliser(valeur) if not isinstance(valeur, bool) else ('1' if valeur else '0')
+        if texte in VRAI:
+            return True
+        if texte in FAUX:
+            return False
+        raise ValueError(f"Valeur booléenne invalide : {valeur}")
+    if isinstance(champ, models.DateField):
+        if valeur in (None, ''):
+            return None
+        if isinstance(valeur, (int, float)):
+            valeur = date_depuis_serie(valeur)
+            return valeur.date() if isinstance(valeur, datetime) else valeur
+        texte = str(valeur).strip()[:10]
+        try:
+            resultat = parse_date(texte) or datetime.strptime(texte, '%d/%m/%Y').date()
+        except ValueError:
+            raise ValueError(f"Date invalide : {valeur} (JJ/MM/AAAA ou AAAA-MM-JJ)")
+        return resultat
+    texte = _texte(valeur)
+    if texte is None and not champ.null:
+        return ''
+    return texte
+
+
+class Referentiels:
+    """Villes et catégories chargées une fois pour tout l'import."""
+
+    def __init__(self):
+        self.villes = {}
+        self.villes_par_nom = defaultdict(list)
+        for pk, nom, region in Ville.objects.values_list('pk', 'nom', 'region__nom'):
+            self.villes[(normaliser(nom), normaliser(region))] = pk
+            self.villes_par_nom[normaliser(nom)].append(pk)
+        self.categories = {}
+        for pk, code in Categorie.objects.values_list('pk', 'nom'):
+            libelle = dict(Categorie.CATEGORIE_CHOICES).get(code, code)
+            self.categories.setdefault(normaliser(code), pk)
+            self.categories.setdefault(normaliser(libelle), pk)
+
+    def ville(self, nom, region=None):
+        nom = normaliser(nom)
+        if not nom:
+            return None
+        if region:
+            pk = self.villes.get((nom, normaliser(region)))
+            if pk is None:
+                raise ValueError(f"Ville inconnue dans cette région : {nom}")
+            return pk
+        candidats = self.villes_par_nom.get(nom, [])
+        if not candidats:
+            raise ValueError(f"Ville inconnue : {nom}")
+        if len(candidats) > 1:
+            raise ValueError(f"Ville ambiguë : {nom} (précisez la région)")
+        return candidats[0]
+
+    def categorie(self, valeur):
+        cle = normaliser(valeur)
+        if not cle:
+            return None
+        if cle not in self.categories:
+            raise ValueError(f"Catégorie inconnue : {valeur}")
+        return self.categories[cle]
+
+
+def _resoudre_clients(references):
+    """{référence: (pk, c_num) | None si ambiguë} par c_num ou nom exact."""
+    references = {ref for ref in references if ref}
+    if not references:
+        return {}
+    trouves = {}
+    par_nom = defaultdict(list)
+    for pk, c_num, nom in Client.objects.filter(
+        Q(c_num__in=references) | Q(nom__in=references)
+    ).values_list('pk', 'c_num', 'nom'):
+        if c_num in references:
+            trouves[c_num] = (pk, c_num)
+        par_nom[nom].append((pk, c_num))
+    for nom, clients in par_nom.items():
+        if nom in references and nom not in trouves:
+            trouves[nom] = clients[0] if len(clients) == 1 else None
+    return trouves
+
+
+def _resoudre_sites(references):
+    """{s_num: (pk, client_id, c_num)}"""
+    references = {ref for ref in references if ref}
+    if not references:
+        return {}
+    return {
+        s_num: (pk, client_id, c_num)
+        for pk, s_num, client_id, c_num in Site.objects.filter(s_num__in=references)
+        .values_list('pk', 's_num', 'client_id', 'client__c_num')
+    }
+
+
+# ---------------------------------------------------------------------------
+# Numérotation
+# ---------------------------------------------------------------------------
+
+def _numeros_libres(candidats, existants_qs, champ):
+    existants = set(existants_qs.filter(**{f'{champ}__in': candidats}).values_list(champ, flat=True))
+    return [numero for numero in candidats if numero not in existants]
+
+
+def allouer_c_num(clients):
+    """
+    Numéros ``cAAMMJJXXXX`` pour ``clients``, dans la continuité de
+    ``Client.save`` (compteur des clients de l'année), en une requête de
+    comptage et une de vérification des collisions.
+    """
+    aujourdhui = now()
+    prefixe = f"c{str(aujourdhui.year)[-2:]}{aujourdhui.month:02d}{aujourdhui.day:02d}"
+    suivant = Client.objects.filter(created_at__year=aujourdhui.year).count() + 1
+    libres = []
+    while len(libres) < len(clients):
+        manquants = len(clients) - len(libres)
+        candidats = [f"{prefixe}{n:04d}" for n in range(suivant, suivant + manquants)]
+        suivant += manquants
+        libres += _numeros_libres(candidats, Client.objects, 'c_num')
+    for client, numero in zip(clients, libres):
+        client.c_num = numero
+
+
+def allouer_s_num(sites, c_nums):
+    """Numéros ``<c_num>XXXX`` par client, dans la continuité de ``Site.save``."""
+    par_client = defaultdict(list)
+    for site in sites:
+        par_client[site.client_id].append(site)
+    compteurs = dict(
+        Site.objects.filter(client_id__in=par_client, created_at__year=now().year)
+        .values('client_id').annotate(n=Count('pk')).values_list('client_id', 'n')
+    )
+    for client_id, sites_client in par_client.items():
+        suivant = compteurs.get(client_id, 0) + 1
+        libres = []
+        while len(libres) < len(sites_client):
+            manquants = len(sites_client) - len(libres)
+            candidats = [f"{c_nums.get(client_id)}{n:04d}" for n in range(suivant, suivant + manquants)]
+            suivant += manquants
+            libres += _numeros_libres(candidats, Site.objects, 's_num')
+        for site, numero in zip(sites_client, libres):
+            site.s_num = numero
+
+
+# ---------------------------------------------------------------------------
+# Import
+# ---------------------------------------------------------------------------
+
+class Rapport:
+    def __init__(self, type_, simulation):
+        self.type = type_
+        self.simulation = simulation
+        self.lignes = 0
+        self.valides = 0
+        self.crees = 0
+        self.nombre_erreurs = 0
+        self.erreurs = []
+        self.colonnes_ignorees = []
+
+    def erreur(self, numero, erreurs):
+        self.nombre_erreurs += 1
+        if len(self.erreurs) < MAX_ERREURS:
+            self.erreurs.append({'ligne': numero, 'erreurs': erreurs})
+
+    def as_dict(self):
+        return {
+            'type': self.type,
+            'simulation': self.simulation,
+            'lignes': self.lignes,
+            'valides': self.valides,
+            'crees': self.crees,
+            'nombre_erreurs': self.nombre_erreurs,
+            'erreurs': self.erreurs,
+            'erreurs_tronquees': self.nombre_erreurs > len(self.erreurs),
+            'colonnes_ignorees': self.colonnes_ignorees,
+        }
+
+
+def _construire(type_, ligne, referentiels, clients, sites, user):
+    """Instance non enregistrée et erreurs par champ pour une ligne."""
+    modele = MODELES[type_]
+    valeurs, erreurs = {}, {}
+    for colonne, champ in COLONNES[type_].items():
+        if colonne not in ligne or champ in valeurs:
+            continue
+        try:
+            valeurs[champ] = convertir(modele._meta.get_field(champ), ligne[colonne])
+        except ValueError as e:
+            erreurs[champ] = [str(e)]
+
+    references = REFERENCES[type_]
+    if 'ville' in references:
+        try:
+            valeurs['ville_id'] = referentiels.ville(ligne.get('ville'), _texte(ligne.get('region')))
+        except ValueError as e:
+            erreurs['ville'] = [str(e)]
+    if 'categorie' in references:
+        try:
+            valeurs['categorie_id'] = referentiels.categorie(ligne.get('categorie'))
+        except ValueError as e:
+            erreurs['categorie'] = [str(e)]
+    if 'site' in references and _texte(ligne.get('site')):
+        site = sites.get(_texte(ligne.get('site')))
+        if site is None:
+            erreurs['site'] = [f"Site inconnu : {ligne.get('site')}"]
+        else:
+            valeurs['site_id'], valeurs['client_id'] = site[0], site[1]
+    if 'client' in references and _texte(ligne.get('client')):
+        reference = _texte(ligne.get('client'))
+        if reference not in clients:
+            erreurs['client'] = [f"Client inconnu : {reference}"]
+        elif clients[reference] is None:
+            erreurs['client'] = [f"Plusieurs clients portent le nom {reference} : utilisez le numéro client"]
+        elif valeurs.get('client_id') not in (None, clients[reference][0]):
+            erreurs['client'] = ["Le site n'appartient pas à ce client"]
+        else:
+            valeurs['client_id'] = clients[reference][0]
+    if type_ == 'sites' and not valeurs.get('client_id') and 'client' not in erreurs:
+        erreurs['client'] = ["Client requis."]
+
+    instance = modele(created_by=user, updated_by=user, **valeurs)
+    try:
+        instance.full_clean(exclude=CLES_RESOLUES[type_] + ['c_num', 's_num'], validate_unique=False, validate_constraints=False)
+    except ValidationError as e:
+        for champ, messages in e.message_dict.items():
+            erreurs.setdefault(champ, []).extend(messages)
+    return instance, erreurs
+
+
+def _traiter_lot(type_, lot, referentiels, user, simulation, rapport, batch_size):
+    clients = _resoudre_clients(_texte(ligne.get('client')) for _numero, ligne in lot)
+    sites = _resoudre_sites(_texte(ligne.get('site')) for _numero, ligne in lot)
+
+    instances = []
+    for numero, ligne in lot:
+        instance, erreurs = _construire(type_, ligne, referentiels, clients, sites, user)
+        if erreurs:
+            rapport.erreur(numero, erreurs)
+        else:
+            instances.append(instance)
+    rapport.valides += len(instances)
+    if simulation or not instances:
+        return
+
+    modele = MODELES[type_]
+    with transaction.atomic():
+        if type_ == 'clients':
+            allouer_c_num(instances)
+        elif type_ == 'sites':
+            c_nums = {pk: c_num for pk, c_num in (clients.get(ref) or (None, None) for ref in clients)}
+            c_nums.update({client_id: c_num for _pk, client_id, c_num in sites.values()})
+            allouer_s_num(instances, c_nums)
+        modele.objects.bulk_create(instances, batch_size=batch_size)
+        if type_ != 'sites':
+            planifier_dedoublonnage(modele._meta.model_name, [instance.pk for instance in instances])
+    rapport.crees += len(instances)
+
+
+def importer(fichier, type_='clients', user=None, simulation=False, nom_fichier='', taille_lot=TAILLE_LOT):
+    """
+    Importe ``fichier`` (CSV ou XLSX) dans ``type_`` (clients, sites, contacts).
+
+    Args:
+        simulation: valide tout le fichier sans rien enregistrer.
+
+    Returns:
+        dict: rapport (lignes lues, valides, créées, erreurs par ligne).
+
+    Raises:
+        ValueError: type inconnu ou colonne obligatoire absente.
+    """
+    if type_ not in MODELES:
+        raise ValueError(f"type doit valoir {', '.join(MODELES)}.")
+    lignes = lire(fichier, nom_fichier)
+    entetes = next(lignes)
+    connues = set(COLONNES[type_]) | REFERENCES[type_]
+    if 'nom' not in entetes and type_ != 'contacts':
+        raise ValueError("Colonne obligatoire absente : nom.")
+    if type_ == 'sites' and 'client' not in entetes:
+        raise ValueError("Colonne obligatoire absente : client.")
+
+    rapport = Rapport(type_, simulation)
+    rapport.colonnes_ignorees = [entete for entete in entetes if entete and entete not in connues]
+    referentiels = Referentiels()
+    while True:
+        lot = list(islice(lignes, taille_lot))
+        if not lot:
+            break
+        rapport.lignes += len(lot)
+        _traiter_lot(type_, lot, referentiels, user, simulation, rapport, batch_size=taille_lot)
+
+    if rapport.crees:
+        invalider_hierarchie()
+    return rapport.as_dict()
+
+
+def ecrire_rapport_csv(rapport, sortie):
+    """Écrit les erreurs du rapport (ligne, champ, message) en CSV dans ``sortie`` (texte)."""
+    writer = csv.writer(sortie)
+    writer.writerow(['ligne', 'champ', 'erreur'])
+    for erreur in rapport['erreurs']:
+        for champ, messages in erreur['erreurs'].items():
+            for message in messages:
+                writer.writerow([erreur['ligne'], champ, message])
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from client.dedupe import SEUIL, TYPES, analyser, analyser_objets, grappes
+
+
+class Command(BaseCommand):
+    help = "Recherche les clients et contacts en double (clés de blocage + similarité des noms)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--type', choices=[*TYPES, 'tous'], default='tous', help="Type d'enregistrements")
+        parser.add_argument('--depuis', help="AAAA-MM-JJ : n'analyse que les enregistrements modifiés depuis cette date")
+        parser.add_argument('--seuil', type=float, default=SEUIL, help="Score minimal des grappes affichées")
+        parser.add_argument('--afficher', type=int, default=10, help="Nombre de grappes affichées par type")
+
+    def handle(self, *args, **options):
+        depuis = None
+        if options['depuis']:
+            depuis = parse_date(options['depuis'])
+            if depuis is None:
+                raise CommandError("--depuis doit être au format AAAA-MM-JJ")
+
+        types = list(TYPES) if options['type'] == 'tous' else [options['type']]
+        for type_ in types:
+            debut = time.perf_counter()
+            if depuis:
+                ids = TYPES[type_]['modele'].objects.filter(updated_at__date__gte=depuis).values_list('pk', flat=True)
+                paires = analyser_objets(type_, list(ids))
+            else:
+                paires = analyser(type_)
+            self.stdout.write(self.style.SUCCESS(
+                f"{type_} : {paires} paire(s) candidate(s) en {time.perf_counter() - debut:.2f} s"
+            ))
+            for grappe in grappes(type_, seuil=options['seuil'], limite=options['afficher']):
+                noms = ', '.join(f"{ligne['id']}:{ligne['nom']}" for ligne in grappe['enregistrements'])
+                self.stdout.write(f"  {grappe['score']:.2f}  {noms}")
@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.user.models import User
+from client.importers import MODELES, TAILLE_LOT, ecrire_rapport_csv, importer
+
+
+class Command(BaseCommand):
+    help = "Importe en masse des clients, sites ou contacts depuis un fichier CSV ou XLSX"
+
+    def add_arguments(self, parser):
+        parser.add_argument('fichier', help="Chemin du fichier CSV ou XLSX")
+        parser.add_argument('--type', default='clients', choices=list(MODELES), help="Type d'enregistrements")
+        parser.add_argument('--simulation', action='store_true', help="Valide le fichier sans rien enregistrer")
+        parser.add_argument('--taille-lot', type=int, default=TAILLE_LOT, help="Nombre de lignes par lot")
+        parser.add_argument('--utilisateur', help="Nom d'utilisateur enregistré comme créateur")
+        parser.add_argument('--rapport', help="Fichier CSV où écrire les erreurs ligne par ligne")
+
+    def handle(self, *args, **options):
+        user = None
+        if options['utilisateur']:
+            user = User.objects.filter(username=options['utilisateur']).first()
+            if user is None:
+                raise CommandError(f"Utilisateur inconnu : {options['utilisateur']}")
+
+        debut = time.perf_counter()
+        try:
+            with open(options['fichier'], 'rb') as fichier:
+                rapport = importer(
+                    fichier,
+                    type_=options['type'],
+                    user=user,
+                    simulation=options['simulation'],
+                    nom_fichier=options['fichier'],
+                    taille_lot=options['taille_lot'],
+                )
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        if options['rapport']:
+            with open(options['rapport'], 'w', encoding='utf-8', newline='') as sortie:
+                ecrire_rapport_csv(rapport, sortie)
+
+        for erreur in rapport['erreurs'][:20]:
+            details = '; '.join(f"{champ} : {', '.join(messages)}" for champ, messages in erreur['erreurs'].items())
+            self.stdout.write(self.style.WARNING(f"Ligne {erreur['ligne']} — {details}"))
+        if rapport['colonnes_ignorees']:
+            self.stdout.write(f"Colonnes ignorées : {', '.join(rapport['colonnes_ignorees'])}")
+        bilan = "valide(s)" if rapport['simulation'] else "créé(s)"
+        nombre = rapport['valides'] if rapport['simulation'] else rapport['crees']
+        self.stdout.write(self.style.SUCCESS(
+            f"{rapport['lignes']} ligne(s) lue(s), {nombre} {bilan}, {rapport['nombre_erreurs']} erreur(s) "
+            f"en {time.perf_counter() - debut:.2f} s"
+        ))
@@ -0,0 +1,196 @@
+"""
+Fusion de clients en double.
+
+Toutes les lignes qui référencent les doublons (sites, contacts, offres,
+opportunités, interactions, accords, courriers, rapports, formations,
+attestations, relances…) sont rattachées au client conservé par un seul
+``UPDATE`` par table ; les relations sont découvertes depuis
+``Client._meta`` et suivent donc l'ajout de nouveaux modèles. Les relations
+plusieurs-à-plusieurs sont réunies (lignes manquantes insérées en une
+requête). Les champs vides du client conservé sont complétés par ceux des
+doublons, puis les doublons sont supprimés et un unique événement
+``AuditLog`` (action ``MERGE``) décrit l'opération.
+"""
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.utils import timezone
+
+from affaires_app.models import Affaire
+from document.models import AuditLog
+from factures_app.models import Facture
+from offres_app.models import Offre
+
+from .geography import invalider_hierarchie
+from .models import Agreement, Client
+
+# Champs du client conservé complétés par le premier doublon renseigné
+CHAMPS_COMPLETES = [
+    'email', 'telephone', 'adresse', 'ville', 'secteur_activite', 'categorie',
+    'bp', 'quartier', 'matricule', 'entite',
+]
+
+
+def _vide(valeur):
+    return valeur is None or valeur == ''
+
+
+def _completer(survivant, doublons):
+    """Complète les champs vides du client conservé ; retourne les champs modifiés."""
+    modifies = []
+    for nom in CHAMPS_COMPLETES:
+        attribut = Client._meta.get_field(nom).attname
+        if not _vide(getattr(survivant, attribut)):
+            continue
+        for doublon in doublons:
+            if not _vide(getattr(doublon, attribut)):
+                setattr(survivant, attribut, getattr(doublon, attribut))
+                modifies.append(nom)
+                break
+    if not survivant.est_client and any(doublon.est_client for doublon in doublons):
+        survivant.est_client = True
+        modifies.append('est_client')
+    dates = [c.date_conversion_client for c in [survivant, *doublons] if c.date_conversion_client]
+    if dates and min(dates) != survivant.date_conversion_client:
+        survivant.date_conversion_client = min(dates)
+        modifies.append('date_conversion_client')
+    if not survivant.agree and any(doublon.agree for doublon in doublons):
+        survivant.agree = True
+        modifies.append('agree')
+    return modifies
+
+
+def _accords_en_conflit(survivant_id, doublons_ids):
+    """Accords des doublons identiques (entité, date de début) à un accord déjà rattaché."""
+    existants = set(
+        Agreement.objects.filter(client_id=survivant_id).values_list('entite_id', 'date_debut')
+    )
+    retenus, conflits = set(existants), []
+    for pk, entite_id, date_debut in (
+        Agreement.objects.filter(client_id__in=doublons_ids)
+        .order_by('pk').values_list('pk', 'entite_id', 'date_debut')
+    ):
+        if (entite_id, date_debut) in retenus:
+            conflits.append(pk)
+        else:
+            retenus.add((entite_id, date_debut))
+    return conflits
+
+
+def _deplacer(survivant_id, doublons_ids):
+    """
+    Un UPDATE par table référençant Client ; retourne {modèle: lignes
+    déplacées}. Les dates ``auto_now`` (``date_modification``…) sont mises
+    à jour comme le ferait ``save()``, pour les extractions incrémentales.
+    """
+    deplaces = {}
+    maintenant = timezone.now()
+    for relation in Client._meta.related_objects:
+        if relation.many_to_many:
+            continue
+        champ = relation.field
+        modele = relation.related_model
+        valeurs = {champ.name: survivant_id}
+        for autre in modele._meta.concrete_fields:
+            if getattr(autre, 'auto_now', False):
+                valeurs[autre.name] = maintenant
+        nombre = modele._base_manager.filter(**{f'{champ.name}__in': doublons_ids}).update(**valeurs)
+        if nombre:
+            deplaces[modele._meta.label] = deplaces.get(modele._meta.label, 0) + nombre
+    return deplaces
+
+
+def _marquer_descendants(offres_ids):
+    """Affaires et factures des offres déplacées : leur client (via l'offre) a changé."""
+    maintenant = timezone.now()
+    Affaire.objects.filter(offre_id__in=offres_ids).update(date_modification=maintenant)
+    Facture.objects.filter(affaire__offre_id__in=offres_ids).update(updated_at=maintenant)
+
+
+def _reunir_m2m(survivant_id, doublons_ids):
+    """
+    Ajoute au client conservé les liens plusieurs-à-plusieurs des doublons.
+    Les tables intermédiaires explicites (``Agreement``) ont une clé vers
+    Client et sont déjà traitées par ``_deplacer``.
+    """
+    liaisons = [
+        (champ.remote_field.through, champ.m2m_field_name(), champ.m2m_reverse_field_name())
+        for champ in Client._meta.many_to_many
+    ] + [
+        (relation.field.remote_field.through, relation.field.m2m_reverse_field_name(), relation.field.m2m_field_name())
+        for relation in Client._meta.related_objects if relation.many_to_many
+    ]
+    ajoutes = {}
+    for through, colonne_client, colonne_autre in liaisons:
+        if not through._meta.auto_created:
+            continue
+        client_id, autre_id = f'{colonne_client}_id', f'{colonne_autre}_id'
+        existants = set(through.objects.filter(**{client_id: survivant_id}).values_list(autre_id, flat=True))
+        nouveaux = set(
+            through.objects.filter(**{f'{client_id}__in': doublons_ids}).values_list(autre_id, flat=True)
+        ) - existants
+        through.objects.bulk_create([through(**{client_id: survivant_id, autre_id: pk}) for pk in nouveaux])
+        if nouveaux:
+            ajoutes[through._meta.label] = len(nouveaux)
+    return ajoutes
+
+
+def fusionner(survivant_id, doublons_ids, user=None):
+    """
+    Fusionne les clients ``doublons_ids`` dans ``survivant_id``.
+
+    Raises:
+        ValueError: identifiant invalide, aucun doublon ou client introuvable.
+
+    Returns:
+        dict: client conservé, clients fusionnés, lignes déplacées par
+        modèle, champs complétés et accords en double supprimés.
+    """
+    try:
+        survivant_id = int(survivant_id)
+        doublons_ids = sorted({int(pk) for pk in doublons_ids} - {survivant_id})
+    except (TypeError, ValueError):
+        raise ValueError("Identifiants de clients invalides.")
+    if not doublons_ids:
+        raise ValueError("Indiquez au moins un client à fusionner, différent du client conservé.")
+
+    with transaction.atomic():
+        clients = Client.objects.select_for_update().in_bulk([survivant_id, *doublons_ids])
+        manquants = [pk for pk in [survivant_id, *doublons_ids] if pk not in clients]
+        if manquants:
+            raise ValueError(f"Client(s) introuvable(s) : {', '.join(map(str, manquants))}")
+        survivant = clients[survivant_id]
+        doublons = sorted((clients[pk] for pk in doublons_ids), key=lambda c: (c.created_at, c.pk))
+
+        accords_supprimes = _accords_en_conflit(survivant_id, doublons_ids)
+        Agreement.objects.filter(pk__in=accords_supprimes).delete()
+        offres_ids = list(Offre.objects.filter(client_id__in=doublons_ids).values_list('pk', flat=True))
+        deplaces = _deplacer(survivant_id, doublons_ids)
+        _marquer_descendants(offres_ids)
+        liens = _reunir_m2m(survivant_id, doublons_ids)
+
+        champs = _completer(survivant, doublons)
+        survivant.updated_by = user if user and user.is_authenticated else survivant.updated_by
+        survivant.save()
+
+        fusionnes = [{'id': c.pk, 'nom': c.nom, 'c_num': c.c_num} for c in doublons]
+        Client.objects.filter(pk__in=doublons_ids).delete()
+
+        resultat = {
+            'survivant': survivant.pk,
+            'fusionnes': fusionnes,
+            'deplaces': deplaces,
+            'liens_ajoutes': liens,
+            'champs_completes': champs,
+            'accords_supprimes': accords_supprimes,
+        }
+        AuditLog.objects.create(
+            user=user if user and user.is_authenticated else None,
+            action='MERGE',
+            content_type=ContentType.objects.get_for_model(Client),
+            object_id=str(survivant.pk),
+            object_repr=str(survivant)[:200],
+            changes=resultat,
+        )
+    # Les UPDATE en masse ne déclenchent pas les signaux (contacts déplacés)
+    invalider_hierarchie()
+    return resultat
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.4 on 2026-10-18 22:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0014_alter_categorie_nom'),
+        ('document', '0029_rename_category_departement_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['date_conversion_client'], name='client_clie_date_co_38ac45_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.1.4 on 2026-10-18 23:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0015_client_client_clie_date_co_38ac45_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CleDoublon',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(choices=[('client', 'Client'), ('contact', 'Contact')], max_length=10)),
+                ('objet_id', models.PositiveIntegerField()),
+                ('cle', models.CharField(max_length=150)),
+            ],
+            options={
+                'verbose_name': 'Clé de dédoublonnage',
+                'verbose_name_plural': 'Clés de dédoublonnage',
+                'indexes': [models.Index(fields=['type', 'cle'], name='client_cled_type_8a9882_idx'), models.Index(fields=['type', 'objet_id'], name='client_cled_type_2d2e87_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DoublonPotentiel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(choices=[('client', 'Client'), ('contact', 'Contact')], max_length=10)),
+                ('objet_a', models.PositiveIntegerField()),
+                ('objet_b', models.PositiveIntegerField()),
+                ('score', models.FloatField()),
+                ('motifs', models.JSONField(blank=True, default=list)),
+                ('detecte_le', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Doublon potentiel',
+                'verbose_name_plural': 'Doublons potentiels',
+                'ordering': ['-score'],
+                'indexes': [models.Index(fields=['type', 'score'], name='client_doub_type_70716d_idx'), models.Index(fields=['type', 'objet_b'], name='client_doub_type_ccf588_idx')],
+                'constraints': [models.UniqueConstraint(fields=('type', 'objet_a', 'objet_b'), name='doublon_paire_unique')],
+            },
+        ),
+    ]
@@ -3,6 +3,8 @@ from django.core.validators import RegexValidator
 from django.utils.timezone import now
 from django.utils import timezone
 from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 
 
 class AuditableMixin(models.Model):
@@ -232,6 +234,7 @@ class Client(AuditableMixin):
             models.Index(fields=['nom']),
             models.Index(fields=['c_num']),
             models.Index(fields=['est_client']),
+            models.Index(fields=['date_conversion_client']),
         ]
 
 
@@ -518,4 +521,78 @@ class Interaction(AuditableMixin):
             models.Index(fields=['client']),
             models.Index(fields=['type_interaction']),
             models.Index(fields=['date_relance']),
-        ]
\ No newline at end of file
+        ]
+
+
+
+class CleDoublon(models.Model):
+    """
+    Clé de blocage d'un client ou d'un contact (voir ``client.dedupe``) :
+    seuls les enregistrements partageant une clé sont comparés.
+    """
+    TYPE_CHOICES = [
+        ('client', 'Client'),
+        ('contact', 'Contact'),
+    ]
+
+    type = models.CharField(max_length=10, choices=TYPE_CHOICES)
+    objet_id = models.PositiveIntegerField()
+    cle = models.CharField(max_length=150)
+
+    class Meta:
+        verbose_name = "Clé de dédoublonnage"
+        verbose_name_plural = "Clés de dédoublonnage"
+        indexes = [
+            models.Index(fields=['type', 'cle']),
+            models.Index(fields=['type', 'objet_id']),
+        ]
+
+
+class DoublonPotentiel(models.Model):
+    """Paire de clients ou de contacts probablement identiques (``objet_a`` < ``objet_b``)."""
+    type = models.CharField(max_length=10, choices=CleDoublon.TYPE_CHOICES)
+    objet_a = models.PositiveIntegerField()
+    objet_b = models.PositiveIntegerField()
+    score = models.FloatField()
+    motifs = models.JSONField(default=list, blank=True)
+    detecte_le = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Doublon potentiel"
+        verbose_name_plural = "Doublons potentiels"
+        ordering = ['-score']
+        constraints = [
+            models.UniqueConstraint(fields=['type', 'objet_a', 'objet_b'], name='doublon_paire_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['type', 'score']),
+            models.Index(fields=['type', 'objet_b']),
+        ]
+
+    def __str__(self):
+        return f"{self.type} {self.objet_a} ~ {self.objet_b} ({self.score:.2f})"
+
+@receiver([post_save, post_delete], sender=Pays)
+@receiver([post_save, post_delete], sender=Region)
+@receiver([post_save, post_delete], sender=Ville)
+@receiver([post_save, post_delete], sender=Client)
+@receiver([post_save, post_delete], sender=Contact)
+def invalider_hierarchie_geographique(sender, **kwargs):
+    """Invalide l'arbre Région → Ville → Client → Contact mis en cache."""
+    from .geography import invalider_hierarchie
+    invalider_hierarchie()
+
+
+@receiver(post_save, sender=Client, dispatch_uid='dedoublonnage_save_client')
+@receiver(post_save, sender=Contact, dispatch_uid='dedoublonnage_save_contact')
+def planifier_dedoublonnage(sender, instance, **kwargs):
+    """Recherche, après le commit, les doublons du client ou du contact enregistré."""
+    from .dedupe import planifier
+    planifier(sender._meta.model_name, [instance.pk])
+
+
+@receiver(post_delete, sender=Client, dispatch_uid='dedoublonnage_delete_client')
+@receiver(post_delete, sender=Contact, dispatch_uid='dedoublonnage_delete_contact')
+def oublier_dedoublonnage(sender, instance, **kwargs):
+    from .dedupe import oublier
+    oublier(sender._meta.model_name, [instance.pk])
\ No newline at end of file
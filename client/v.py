@@ -1,71 +1,31 @@
-from rest_framework import serializers
+from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from django.db.models import Prefetch
-from .models import Region, Ville, Client, Contact
 
-class ContactDetailSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Contact
-        fields = [
-            'id', 'nom', 'prenom', 'email', 'telephone', 
-            'mobile', 'poste', 'service',
-            'quartier', 'bp', 'notes'
-        ]
+from .geography import get_hierarchie
 
-class ClientDetailSerializer(serializers.ModelSerializer):
-    contacts = ContactDetailSerializer(many=True, read_only=True)
-    
-    class Meta:
-        model = Client
-        fields = [
-            'id', 'nom', 'email', 'telephone', 'adresse',
-            'c_num', 'secteur_activite', 'bp', 'quartier',
-            'matricule', 'agreer', 'agreement_fournisseur',
-            'entite', 'contacts'
-        ]
 
-class VilleDetailSerializer(serializers.ModelSerializer):
-    clients = serializers.SerializerMethodField()
-    
-    class Meta:
-        model = Ville
-        fields = ['id', 'nom', 'clients']
-    
-    def get_clients(self, obj):
-        clients = obj.client_set.all()
-        return ClientDetailSerializer(clients, many=True).data
+class RegionHierarchyView(APIView):
+    """
+    Hiérarchie Région → Ville → Client → Contact.
 
-class RegionDetailSerializer(serializers.ModelSerializer):
-    villes = VilleDetailSerializer(many=True, read_only=True)
-    pays_nom = serializers.CharField(source='pays.nom', read_only=True)
-    
-    class Meta:
-        model = Region
-        fields = ['id', 'nom', 'pays_nom', 'villes']
+    L'arbre est servi depuis le cache construit par ``client.geography`` ;
+    les paramètres ``region_id`` et ``ville_id`` en extraient un sous-arbre.
+    """
 
-class RegionHierarchyView(APIView):
     def get(self, request):
         # Récupérer les paramètres de filtrage
-        region_id = request.query_params.get('region_id')
-        ville_id = request.query_params.get('ville_id')
-        
-        # Construire la requête de base avec les préchargements
-        queryset = Region.objects.select_related('pays').prefetch_related(
-            'villes',
-            Prefetch(
-                'villes__client_set',
-                queryset=Client.objects.prefetch_related('contacts')
+        try:
+            region_id = self._parse_id(request.query_params.get('region_id'))
+            ville_id = self._parse_id(request.query_params.get('ville_id'))
+        except ValueError:
+            return Response(
+                {"detail": "region_id et ville_id doivent être des entiers."},
+                status=status.HTTP_400_BAD_REQUEST
             )
-        )
-        
-        # Appliquer les filtres si nécessaire
-        if region_id:
-            queryset = queryset.filter(id=region_id)
-            
-        if ville_id:
-            queryset = queryset.filter(villes__id=ville_id)
-        
-        # Sérialiser et retourner les données
-        serializer = RegionDetailSerializer(queryset, many=True)
-        return Response(serializer.data)
\ No newline at end of file
+
+        return Response(get_hierarchie(region_id=region_id, ville_id=ville_id))
+
+    @staticmethod
+    def _parse_id(value):
+        return int(value) if value not in (None, '') else None
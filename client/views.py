@@ -1,14 +1,18 @@
-from rest_framework import filters, status
+from rest_framework import filters, parsers, status
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
-from django.db.models import Count, Sum, Q
+from django.db.models import Count, DateField, Sum, Q
+from django.db.models.functions import TruncMonth
 from django.utils.timezone import now
 from datetime import timedelta
 from affaires_app.serializers import AffaireSerializer, FactureSerializer, FormationSerializer, RapportSerializer
 from client.filters import AgreementFilter, InteractionFilter, TypeInteractionFilter
 from client.permissions import IsOwnerOrReadOnly, IsSuperUserOrReadOnly
+from analytics_app.timeseries import parametres_serie
+from document.cache import stale_while_revalidate
+from exports_app.mixins import ExportMixin
 from factures_app.models import Facture
 from django.utils import timezone
 
@@ -17,6 +21,10 @@ from proformas_app.admin import ProformaAdmin
 from proformas_app.models import Proforma
 from proformas_app.serializers import ProformaSerializer
 
+from .cohorts import cohortes as calculer_cohortes
+from .dedupe import SEUIL as SEUIL_DOUBLONS, grappes as grappes_doublons
+from .importers import importer as importer_fichier
+from .merge import fusionner as fusionner_clients
 from .models import Agreement, Categorie, Interaction, Pays, Region, TypeInteraction, Ville, Client, Site, Contact
 from document.models import (
     Rapport, 
@@ -101,13 +109,44 @@ class CategoryViewSet(viewsets.ModelViewSet):
             return CategoryEditSerializer
         return CategoryDetailSerializer
 
-class ClientViewSet(viewsets.ModelViewSet):
+
+def _reponse_doublons(type_, params):
+    """Grappes de doublons selon ``seuil``, ``limite`` et ``id`` (grappe d'un enregistrement)."""
+    try:
+        seuil = float(params.get('seuil') or SEUIL_DOUBLONS)
+        limite = int(params.get('limite') or 50)
+        objet_id = int(params['id']) if params.get('id') else None
+    except ValueError:
+        return Response(
+            {"detail": "seuil doit être un nombre, limite et id des entiers."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    return Response(grappes_doublons(type_, seuil=seuil, limite=max(1, min(limite, 500)), objet_id=objet_id))
+
+
+class ClientViewSet(ExportMixin, viewsets.ModelViewSet):
     queryset = Client.objects.filter().order_by('nom')
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['ville', 'agree', 'secteur_activite']
     search_fields = ['nom', 'c_num', 'email', 'telephone', 'matricule']
     ordering_fields = ['nom']
-    
+
+    export_filename = 'clients'
+    export_columns = [
+        ('Numéro', 'c_num'),
+        ('Nom', 'nom'),
+        ('Email', 'email'),
+        ('Téléphone', 'telephone'),
+        ('Ville', 'ville__nom'),
+        ('Région', 'ville__region__nom'),
+        ('Catégorie', 'categorie__nom'),
+        ("Secteur d'activité", 'secteur_activite'),
+        ('Matricule', 'matricule'),
+        ('Client', 'est_client'),
+        ('Date de conversion', 'date_conversion_client'),
+        ('Agréé', 'agree'),
+        ('Créé le', 'created_at'),
+    ]
 
     def get_serializer_class(self):
         if self.action == 'list':
@@ -391,31 +430,111 @@ class ClientViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'])
+    @stale_while_revalidate()
     def stats(self, request):
         """
         Retourner des statistiques sur les clients.
         """
-        total_clients = Client.objects.filter(est_client=True).count()
-        total_prospects = Client.objects.filter(est_client=False).count()
-        clients_par_categorie = Client.objects.filter(est_client=True).values('categorie__nom').annotate(
-            count=Count('id')).order_by('categorie__nom')
-        prospects_par_categorie = Client.objects.filter(est_client=False).values('categorie__nom').annotate(
+        totaux = Client.objects.aggregate(
+            total_clients=Count('id', filter=Q(est_client=True)),
+            total_prospects=Count('id', filter=Q(est_client=False)),
+        )
+        par_categorie = Client.objects.values('categorie__nom', 'est_client').annotate(
             count=Count('id')).order_by('categorie__nom')
+        # Mois tronqué avec l'année (portable SQLite / PostgreSQL) ; la clé
+        # historique ``month`` (numéro du mois) est conservée à côté de ``mois``
         clients_par_mois = Client.objects.filter(
             est_client=True, 
             date_conversion_client__isnull=False
-        ).extra(
-            select={'month': "EXTRACT(month FROM date_conversion_client)"}
-        ).values('month').annotate(count=Count('id')).order_by('month')
+        ).annotate(
+            mois=TruncMonth('date_conversion_client', output_field=DateField())
+        ).values('mois').annotate(count=Count('id')).order_by('mois')
 
         return Response({
-            'total_clients': total_clients,
-            'total_prospects': total_prospects,
-            'clients_par_categorie': clients_par_categorie,
-            'prospects_par_categorie': prospects_par_categorie,
-            'clients_par_mois': clients_par_mois,
+            'total_clients': totaux['total_clients'],
+            'total_prospects': totaux['total_prospects'],
+            'clients_par_categorie': [
+                {'categorie__nom': ligne['categorie__nom'], 'count': ligne['count']}
+                for ligne in par_categorie if ligne['est_client']
+            ],
+            'prospects_par_categorie': [
+                {'categorie__nom': ligne['categorie__nom'], 'count': ligne['count']}
+                for ligne in par_categorie if not ligne['est_client']
+            ],
+            'clients_par_mois': [
+                {'month': ligne['mois'].month, 'mois': ligne['mois'], 'count': ligne['count']}
+                for ligne in clients_par_mois
+            ],
         })
 
+    @action(detail=False, methods=['get'])
+    @stale_while_revalidate()
+    def cohortes(self, request):
+        """
+        Cohortes prospect → client : fiches par mois de création, conversions
+        par mois de conversion, délais de conversion et répartition
+        (``par`` = categorie, ville ou region). Période : ``date_debut`` /
+        ``date_fin`` (12 derniers mois par défaut).
+        """
+        aujourd_hui = timezone.localdate()
+        try:
+            bornes = parametres_serie(request.query_params)
+            date_fin = bornes.get('date_fin') or aujourd_hui
+            date_debut = bornes.get('date_debut') or date_fin.replace(day=1, year=date_fin.year - 1)
+            data = calculer_cohortes(date_debut, date_fin, par=request.query_params.get('par') or None)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(data)
+
+    @action(detail=False, methods=['get'])
+    def doublons(self, request):
+        """
+        Grappes de clients probablement en double, de la plus sûre à la moins
+        sûre : ``seuil`` (score minimal, 0.85 par défaut), ``limite`` (50),
+        ``id`` pour la seule grappe d'un client.
+        """
+        return _reponse_doublons('client', request.query_params)
+
+    @action(detail=False, methods=['post'], parser_classes=[parsers.MultiPartParser, parsers.FormParser])
+    def importer(self, request):
+        """
+        Import en masse depuis un fichier CSV ou XLSX (``fichier``) :
+        ``type`` = clients (défaut), sites ou contacts ; ``simulation`` = true
+        pour valider le fichier sans rien enregistrer. Retourne le rapport
+        d'import (lignes créées, erreurs par ligne).
+        """
+        fichier = request.FILES.get('fichier')
+        if fichier is None:
+            return Response({"detail": "Le fichier est requis."}, status=status.HTTP_400_BAD_REQUEST)
+        simulation = str(request.data.get('simulation', '')).lower() in ('1', 'true', 'oui')
+        try:
+            rapport = importer_fichier(
+                fichier,
+                type_=request.data.get('type') or 'clients',
+                user=request.user if request.user.is_authenticated else None,
+                simulation=simulation,
+                nom_fichier=fichier.name,
+            )
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(rapport)
+
+    @action(detail=True, methods=['post'])
+    def fusionner(self, request, pk=None):
+        """
+        Fusionne dans ce client les clients ``doublons`` (liste d'ids) : toutes
+        leurs données sont rattachées à ce client puis ils sont supprimés.
+        """
+        client = self.get_object()
+        doublons = request.data.get('doublons')
+        if not isinstance(doublons, list) or not doublons:
+            return Response({"detail": "doublons doit être une liste d'identifiants."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            resultat = fusionner_clients(client.pk, doublons, user=request.user)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(resultat)
+
     @action(detail=True, methods=['post'])
     def convertir_en_client(self, request, pk=None):
         """
@@ -567,7 +686,7 @@ class TypeInteractionViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class InteractionViewSet(viewsets.ModelViewSet):
+class InteractionViewSet(ExportMixin, viewsets.ModelViewSet):
     """
     API endpoint pour gérer les interactions.
     """
@@ -579,6 +698,20 @@ class InteractionViewSet(viewsets.ModelViewSet):
     ordering_fields = ['date', 'type_interaction__nom']
     ordering = ['-date']
 
+    export_filename = 'interactions'
+    export_columns = [
+        ('Date', 'date'),
+        ('Type', 'type_interaction__nom'),
+        ('Titre', 'titre'),
+        ('Client', 'client__nom'),
+        ('Contact', 'contact__nom'),
+        ('Entité', 'entite__code'),
+        ('Rendez-vous', 'est_rendez_vous'),
+        ('Durée (min)', 'duree_minutes'),
+        ('Date de relance', 'date_relance'),
+        ('Relance effectuée', 'relance_effectuee'),
+    ]
+
     def get_serializer_class(self):
         if self.action in ['retrieve', 'create', 'update', 'partial_update']:
             return InteractionDetailSerializer
@@ -753,13 +886,27 @@ class SiteViewSet(viewsets.ModelViewSet):
         serializer = ContactListSerializer(contacts, many=True)
         return Response(serializer.data)
 
-class ContactViewSet(viewsets.ModelViewSet):
+class ContactViewSet(ExportMixin, viewsets.ModelViewSet):
     queryset = Contact.objects.all()
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['client', 'service', 'relance', 'ville']
     search_fields = ['nom', 'prenom', 'email', 'telephone', 'mobile', 'client__nom']
     ordering_fields = ['nom', 'created_at']
 
+    export_filename = 'contacts'
+    export_columns = [
+        ('Nom', 'nom'),
+        ('Prénom', 'prenom'),
+        ('Client', 'client__nom'),
+        ('Poste', 'poste'),
+        ('Service', 'service'),
+        ('Email', 'email'),
+        ('Téléphone', 'telephone'),
+        ('Mobile', 'mobile'),
+        ('Ville', 'ville__nom'),
+        ('Créé le', 'created_at'),
+    ]
+
     def get_serializer_class(self):
         if self.action == 'list':
             return ContactListSerializer
@@ -788,6 +935,14 @@ class ContactViewSet(viewsets.ModelViewSet):
         serializer = ContactDetailedSerializer(queryset, many=True)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get'])
+    def doublons(self, request):
+        """
+        Grappes de contacts probablement en double (même email, même
+        téléphone ou noms proches) : ``seuil``, ``limite``, ``id``.
+        """
+        return _reponse_doublons('contact', request.query_params)
+
     @action(detail=True, methods=['get'])
     def opportunites(self, request, pk=None):
         """Retourne les opportunités associées à un contact."""
@@ -0,0 +1,18 @@
+from analytics_app.pivot import annee, mois, register
+
+from .models import Courrier
+
+register(
+    'courriers', Courrier,
+    champ_date='date_creation',
+    dimensions={
+        'statut': 'statut',
+        'doc_type': 'doc_type',
+        'direction': 'direction',
+        'entity': 'entite__code',
+        'client': 'client__nom',
+        'urgent': 'est_urgent',
+        'mois': mois('date_creation'),
+        'annee': annee('date_creation'),
+    },
+)
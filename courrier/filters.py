@@ -14,6 +14,8 @@ class CourrierFilter(django_filters.FilterSet):
     reception_min = django_filters.DateFilter(field_name='date_reception', lookup_expr='gte')
     reception_max = django_filters.DateFilter(field_name='date_reception', lookup_expr='lte')
     
+    mois = django_filters.CharFilter(method='filter_mois')
+
     est_urgent = django_filters.BooleanFilter(field_name='est_urgent')
     en_retard = django_filters.BooleanFilter(method='filter_en_retard')
     
@@ -22,9 +24,17 @@ class CourrierFilter(django_filters.FilterSet):
         fields = [
             'entite', 'client', 'doc_type', 'direction', 'statut', 'created_by', 'handled_by',
             'date_min', 'date_max', 'envoi_min', 'envoi_max', 'reception_min', 'reception_max',
-            'est_urgent', 'en_retard'
+            'mois', 'est_urgent', 'en_retard'
         ]
     
+    def filter_mois(self, queryset, name, value):
+        # Mois de création au format AAAA-MM
+        try:
+            annee, mois = (int(partie) for partie in value.split('-'))
+        except ValueError:
+            return queryset.none()
+        return queryset.filter(date_creation__year=annee, date_creation__month=mois)
+
     def filter_en_retard(self, queryset, name, value):
         # Si value est True, on filtre les courriers en retard
         if value:
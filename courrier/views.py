@@ -5,12 +5,15 @@ from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from django.utils import timezone
 
+from analytics_app.pivot import pivot
+from document.cache import stale_while_revalidate
+from exports_app.mixins import ArchiveMixin, ExportMixin
 from .models import Courrier, CourrierHistory
 from .serializers import CourrierSerializer, CourrierListSerializer, CourrierHistorySerializer
 from .filters import CourrierFilter
 
 
-class CourrierViewSet(viewsets.ModelViewSet):
+class CourrierViewSet(ArchiveMixin, ExportMixin, viewsets.ModelViewSet):
     """
     ViewSet pour les opérations CRUD sur les courriers.
     """
@@ -21,6 +24,22 @@ class CourrierViewSet(viewsets.ModelViewSet):
     ordering_fields = ['date_creation', 'date_envoi', 'date_reception', 'reference', 'statut']
     ordering = ['-date_creation']
 
+    export_filename = 'courriers'
+    export_columns = [
+        ('Référence', 'reference'),
+        ('Entité', 'entite__code'),
+        ('Type', 'doc_type'),
+        ('Direction', 'direction'),
+        ('Statut', 'statut'),
+        ('Client', 'client__nom'),
+        ('Objet', 'objet'),
+        ('Date de création', 'date_creation'),
+        ("Date d'envoi", 'date_envoi'),
+        ('Date de réception', 'date_reception'),
+        ('Urgent', 'est_urgent'),
+        ('Traité par', 'handled_by__username'),
+    ]
+
     def get_serializer_class(self):
         if self.action == 'list':
             return CourrierListSerializer
@@ -88,21 +107,24 @@ class CourrierViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'])
+    @stale_while_revalidate()
     def stats(self, request):
         """Obtenir des statistiques sur les courriers"""
-        total = Courrier.objects.count()
-        entrants = Courrier.objects.filter(direction='IN').count()
-        sortants = Courrier.objects.filter(direction='OUT').count()
-        
+        # Un seul GROUP BY (direction × statut × type), ventilé ensuite
+        cellules = pivot('courriers', rows=['direction', 'statut', 'doc_type'])['cellules']
+        total = sum(c['count'] for c in cellules)
+        entrants = sum(c['count'] for c in cellules if c['direction'] == 'IN')
+        sortants = sum(c['count'] for c in cellules if c['direction'] == 'OUT')
+
         # Statistiques par statut
         status_stats = {}
         for status_code, status_name in Courrier.STATUS_CHOICES:
-            status_stats[status_name] = Courrier.objects.filter(statut=status_code).count()
+            status_stats[status_name] = sum(c['count'] for c in cellules if c['statut'] == status_code)
             
         # Statistiques par type de document
         type_stats = {}
         for type_code, type_name in Courrier.DOC_TYPES:
-            type_stats[type_name] = Courrier.objects.filter(doc_type=type_code).count()
+            type_stats[type_name] = sum(c['count'] for c in cellules if c['doc_type'] == type_code)
             
         # Courriers en retard
         overdue = Courrier.objects.filter(
@@ -0,0 +1,139 @@
+"""
+Cache "stale-while-revalidate" pour les endpoints de statistiques.
+
+Chaque réponse est conservée avec sa date de calcul :
+- avant le TTL souple, elle est servie telle quelle (HIT) ;
+- entre le TTL souple et le TTL dur, elle est servie immédiatement (STALE)
+  pendant qu'un thread la recalcule en arrière-plan ;
+- au-delà du TTL dur (ou en l'absence d'entrée), elle est recalculée (MISS).
+
+L'en-tête ``Age`` indique l'ancienneté de la réponse en secondes et
+``X-Cache`` le résultat de la recherche.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOFT_TTL = 60
+DEFAULT_HARD_TTL = 600
+
+_compteurs = Counter()
+_compteurs_lock = threading.Lock()
+
+
+def _incrementer(nom):
+    with _compteurs_lock:
+        _compteurs[nom] += 1
+
+
+def get_cache_stats():
+    """Retourne les compteurs du cache des statistiques depuis le démarrage du processus."""
+    with _compteurs_lock:
+        compteurs = dict(_compteurs)
+    hits = compteurs.get('hit', 0) + compteurs.get('stale', 0)
+    total = hits + compteurs.get('miss', 0)
+    return {
+        'hit': compteurs.get('hit', 0),
+        'stale': compteurs.get('stale', 0),
+        'miss': compteurs.get('miss', 0),
+        'rafraichissements': compteurs.get('refresh', 0),
+        'erreurs_rafraichissement': compteurs.get('refresh_error', 0),
+        'taux_hit': hits / total if total else 0,
+    }
+
+
+def _ttls(soft_ttl, hard_ttl):
+    config = getattr(settings, 'STATS_CACHE', {})
+    soft = soft_ttl if soft_ttl is not None else config.get('SOFT_TTL', DEFAULT_SOFT_TTL)
+    hard = hard_ttl if hard_ttl is not None else config.get('HARD_TTL', DEFAULT_HARD_TTL)
+    return soft, max(hard, soft)
+
+
+def _cle(view, func, request):
+    """Clé de cache : vue, action et paramètres de requête triés."""
+    params = sorted(request.query_params.lists())
+    empreinte = hashlib.md5(
+        json.dumps([request.path, params]).encode('utf-8')
+    ).hexdigest()
+    return f"stats:{type(view).__module__}.{type(view).__name__}.{func.__name__}:{empreinte}"
+
+
+def _normaliser(data):
+    """Convertit les QuerySets, Decimal et dates en types JSON afin que l'entrée soit sérialisable."""
+    return json.loads(json.dumps(data, cls=JSONEncoder))
+
+
+def _calculer(func, view, request, args, kwargs, cle, hard_ttl):
+    response = func(view, request, *args, **kwargs)
+    if response.status_code == 200:
+        response.data = _normaliser(response.data)
+        cache.set(cle, {'data': response.data, 'cree_le': time.time()}, hard_ttl)
+    return response
+
+
+def _rafraichir(func, view, request, args, kwargs, cle, hard_ttl):
+    try:
+        _calculer(func, view, request, args, kwargs, cle, hard_ttl)
+        _incrementer('refresh')
+    except Exception:
+        _incrementer('refresh_error')
+        logger.exception("Échec du rafraîchissement en arrière-plan de %s", cle)
+    finally:
+        cache.delete(f"{cle}:verrou")
+        connections.close_all()
+
+
+def stale_while_revalidate(soft_ttl=None, hard_ttl=None):
+    """
+    Décorateur pour les actions de statistiques d'un ViewSet.
+
+    Les TTL par défaut proviennent de ``settings.STATS_CACHE``
+    (``SOFT_TTL`` et ``HARD_TTL``, en secondes).
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(self, request, *args, **kwargs):
+            soft, hard = _ttls(soft_ttl, hard_ttl)
+            cle = _cle(self, func, request)
+            entree = cache.get(cle)
+            age = time.time() - entree['cree_le'] if entree else None
+
+            if entree is None or age >= hard:
+                _incrementer('miss')
+                response = _calculer(func, self, request, args, kwargs, cle, hard)
+                response['X-Cache'] = 'MISS'
+                response['Age'] = '0'
+                return response
+
+            if age < soft:
+                _incrementer('hit')
+                etat = 'HIT'
+            else:
+                _incrementer('stale')
+                etat = 'STALE'
+                # Un seul rafraîchissement à la fois par clé
+                if cache.add(f"{cle}:verrou", True, hard):
+                    threading.Thread(
+                        target=_rafraichir,
+                        args=(func, self, request, args, kwargs, cle, hard),
+                        daemon=True,
+                    ).start()
+
+            response = Response(entree['data'])
+            response['X-Cache'] = etat
+            response['Age'] = str(int(age))
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,226 @@
+"""
+Identity map optionnelle, limitée à la durée d'une requête.
+
+Lorsqu'elle est active, chaque ligne chargée depuis la base est
+enregistrée par (modèle, pk). Les recherches par clé primaire
+(``Model.objects.get(pk=...)``) et les parcours de clés étrangères
+(``facture.affaire.offre.client``) sont alors servis depuis la mémoire
+si la ligne a déjà été chargée pendant la requête.
+
+Activation :
+- pour une vue : attribut ``identity_map = True`` sur la classe (voir
+  ``document.middleware.IdentityMapMiddleware``) ;
+- pour tout le site : ``settings.IDENTITY_MAP_ENABLED = True`` ;
+- ponctuellement : ``with identity_map(): ...``.
+
+À la fermeture, le signal ``identity_map_closed`` est émis avec le nombre
+de requêtes évitées.
+
+Les points d'accroche (``Model.from_db``, ``save_base``, ``delete``,
+``QuerySet.get``, ``update``, ``delete``, parcours de clés étrangères) ne
+font rien hors d'une identity map active. Aucun récepteur de signal n'est
+connecté : un récepteur ``post_delete`` sans émetteur désactiverait la
+suppression rapide (``Collector.can_fast_delete``) pour tous les modèles.
+"""
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.core.exceptions import ValidationError
+from django.db.models import Model
+from django.db.models.fields.related_descriptors import ForwardManyToOneDescriptor
+from django.db.models.query import ModelIterable, QuerySet
+from django.dispatch import Signal
+
+logger = logging.getLogger(__name__)
+
+# Émis à la fermeture d'une identity map : identity_map, requetes_evitees, lignes
+identity_map_closed = Signal()
+
+_current = ContextVar('identity_map', default=None)
+_installed = False
+
+
+def _snapshot(instance):
+    values = []
+    for field in instance._meta.concrete_fields:
+        value = getattr(instance, field.attname)
+        values.append(value.copy() if isinstance(value, (dict, list)) else value)
+    return tuple(values)
+
+
+class IdentityMap:
+    """Registre (modèle concret, pk) → (instance, valeurs chargées) pour une unité de travail."""
+
+    def __init__(self):
+        self._rows = {}
+        self.hits = 0
+
+    @staticmethod
+    def _key(model, pk):
+        return model._meta.concrete_model._meta.label_lower, pk
+
+    def get(self, model, pk):
+        try:
+            pk = model._meta.pk.to_python(pk)
+        except (TypeError, ValueError, ValidationError):
+            return None
+        row = self._rows.get(self._key(model, pk))
+        if row is None:
+            return None
+        instance, snapshot = row
+        # Une instance modifiée en mémoire ne représente plus la ligne en base :
+        # les comparaisons « ancien état » (Offre.save, pre_save d'Affaire)
+        # doivent continuer à interroger la base.
+        if not isinstance(instance, model) or _snapshot(instance) != snapshot:
+            return None
+        self.hits += 1
+        return instance
+
+    def add(self, instance):
+        # Seules les instances complètes peuvent remplacer une requête
+        if instance.pk is not None and not instance.get_deferred_fields():
+            self._rows[self._key(type(instance), instance.pk)] = (instance, _snapshot(instance))
+
+    def discard_model(self, model):
+        label = model._meta.concrete_model._meta.label_lower
+        for key in [k for k in self._rows if k[0] == label]:
+            del self._rows[key]
+
+    def clear(self):
+        self._rows.clear()
+
+    def __len__(self):
+        return len(self._rows)
+
+
+def get_identity_map():
+    """Retourne l'identity map active, ou None."""
+    return _current.get()
+
+
+def activate():
+    """Active une nouvelle identity map ; retourne le jeton à passer à ``deactivate``."""
+    return _current.set(IdentityMap())
+
+
+def deactivate(token):
+    """Ferme l'identity map ouverte par ``activate`` et publie son bilan."""
+    imap = _current.get()
+    _current.reset(token)
+    if imap is not None:
+        identity_map_closed.send(
+            sender=IdentityMap, identity_map=imap,
+            requetes_evitees=imap.hits, lignes=len(imap),
+        )
+    return imap
+
+
+@contextmanager
+def identity_map():
+    token = activate()
+    try:
+        yield _current.get()
+    finally:
+        deactivate(token)
+
+
+def _is_plain_pk_lookup(queryset, args, kwargs):
+    if args or len(kwargs) != 1:
+        return False
+    name = next(iter(kwargs))
+    pk = queryset.model._meta.pk
+    query = queryset.query
+    return (
+        name in ('pk', pk.name, pk.attname)
+        and queryset._iterable_class is ModelIterable
+        and not query.where
+        and not query.annotations
+        and not query.extra
+        and not query.select_for_update
+        and not query.deferred_loading[0]
+        and query.select_related is False
+    )
+
+
+def install():
+    """Installe les points d'accroche (une seule fois, depuis ``AppConfig.ready``)."""
+    global _installed
+    if _installed:
+        return
+    _installed = True
+
+    original_from_db = Model.from_db.__func__
+    original_save_base = Model.save_base
+    original_model_delete = Model.delete
+    original_get_object = ForwardManyToOneDescriptor.get_object
+    original_get = QuerySet.get
+    original_update = QuerySet.update
+    original_delete = QuerySet.delete
+
+    def from_db(cls, db, field_names, values):
+        instance = original_from_db(cls, db, field_names, values)
+        imap = _current.get()
+        if imap is not None:
+            imap.add(instance)
+        return instance
+
+    def save_base(self, *args, **kwargs):
+        resultat = original_save_base(self, *args, **kwargs)
+        imap = _current.get()
+        if imap is not None:
+            imap.add(self)
+        return resultat
+
+    def model_delete(self, *args, **kwargs):
+        # Les suppressions en cascade touchent d'autres modèles : on vide tout
+        imap = _current.get()
+        if imap is not None:
+            imap.clear()
+        return original_model_delete(self, *args, **kwargs)
+
+    def get_object(self, instance):
+        imap = _current.get()
+        if imap is not None and self.field.target_field.primary_key:
+            cached = imap.get(self.field.remote_field.model, getattr(instance, self.field.attname))
+            if cached is not None:
+                return cached
+        return original_get_object(self, instance)
+
+    def get(self, *args, **kwargs):
+        imap = _current.get()
+        if imap is not None and _is_plain_pk_lookup(self, args, kwargs):
+            cached = imap.get(self.model, next(iter(kwargs.values())))
+            if cached is not None:
+                return cached
+        return original_get(self, *args, **kwargs)
+
+    def update(self, **kwargs):
+        imap = _current.get()
+        if imap is not None:
+            imap.discard_model(self.model)
+        return original_update(self, **kwargs)
+
+    def delete(self):
+        imap = _current.get()
+        if imap is not None:
+            imap.clear()
+        return original_delete(self)
+
+    # Attributs des méthodes remplacées conservés (gabarits, managers)
+    save_base.alters_data = model_delete.alters_data = update.alters_data = delete.alters_data = True
+    delete.queryset_only = True
+
+    Model.from_db = classmethod(from_db)
+    Model.save_base = save_base
+    Model.delete = model_delete
+    ForwardManyToOneDescriptor.get_object = get_object
+    QuerySet.get = get
+    QuerySet.update = update
+    QuerySet.delete = delete
+
+    identity_map_closed.connect(_log_report, dispatch_uid='identity_map_log')
+
+
+def _log_report(sender, identity_map, requetes_evitees, lignes, **kwargs):
+    logger.debug("Identity map : %s requête(s) évitée(s), %s ligne(s) en mémoire", requetes_evitees, lignes)
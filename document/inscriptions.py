@@ -0,0 +1,160 @@
+"""
+Inscription en masse des participants d'une formation.
+
+La liste (CSV ou XLSX, lue par ``client.importers.lire``) est validée ligne
+par ligne (``full_clean``), dédoublonnée contre les participants déjà
+inscrits et contre elle-même (même email, ou mêmes nom et prénom), puis
+insérée en un ``bulk_create``. Les attestations de toute la liste peuvent
+être générées dans la même transaction : numéros de séquence et compteurs
+sont lus une fois puis incrémentés en mémoire, au lieu d'une série de
+requêtes par attestation dans ``AttestationFormation.save``.
+"""
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Max
+from django.utils.timezone import now
+
+from client.importers import convertir, lire, normaliser
+
+from .models import AttestationFormation, Participant
+
+MAX_PARTICIPANTS = 1000
+
+COLONNES = {
+    'nom': 'nom', 'prenom': 'prenom', 'email': 'email', 'mail': 'email',
+    'telephone': 'telephone', 'tel': 'telephone', 'fonction': 'fonction', 'poste': 'fonction',
+}
+
+
+def _cles(nom, prenom, email):
+    """Clés d'identité d'un participant : email, et nom + prénom."""
+    cles = {f"n:{normaliser(nom)}:{normaliser(prenom)}"}
+    if email:
+        cles.add(f"e:{email.strip().lower()}")
+    return cles
+
+
+def inscrire(formation, fichier, nom_fichier='', user=None, simulation=False, attestations=False):
+    """
+    Inscrit à ``formation`` les participants du fichier.
+
+    Args:
+        simulation: valide et dédoublonne sans rien enregistrer.
+        attestations: génère ensuite les attestations des inscrits.
+
+    Raises:
+        ValueError: colonne obligatoire absente ou liste trop longue.
+
+    Returns:
+        dict: rapport (créés, doublons écartés, erreurs par ligne).
+    """
+    lignes = lire(fichier, nom_fichier)
+    entetes = next(lignes)
+    for obligatoire in ('nom', 'prenom'):
+        if obligatoire not in entetes:
+            raise ValueError(f"Colonne obligatoire absente : {obligatoire}.")
+
+    connues = set()
+    for nom, prenom, email in formation.participants.values_list('nom', 'prenom', 'email'):
+        connues |= _cles(nom, prenom, email)
+
+    participants, doublons, erreurs, lues = [], [], [], 0
+    for numero, ligne in lignes:
+        lues += 1
+        if lues > MAX_PARTICIPANTS:
+            raise ValueError(f"La liste dépasse {MAX_PARTICIPANTS} participants.")
+        valeurs = {}
+        for colonne, champ in COLONNES.items():
+            if colonne in ligne and champ not in valeurs:
+                valeurs[champ] = convertir(Participant._meta.get_field(champ), ligne[colonne])
+        participant = Participant(formation=formation, created_by=user, updated_by=user, **valeurs)
+        try:
+            participant.full_clean(exclude=['formation', 'photo', 'created_by', 'updated_by'], validate_unique=False)
+        except ValidationError as e:
+            erreurs.append({'ligne': numero, 'erreurs': e.message_dict})
+            continue
+        cles = _cles(participant.nom, participant.prenom, participant.email)
+        if cles & connues:
+            doublons.append({'ligne': numero, 'nom': participant.nom, 'prenom': participant.prenom})
+            continue
+        connues |= cles
+        participants.append(participant)
+
+    rapport = {
+        'formation': formation.pk,
+        'simulation': simulation,
+        'lignes': lues,
+        'valides': len(participants),
+        'crees': 0,
+        'doublons': doublons,
+        'erreurs': erreurs,
+        'attestations': 0,
+    }
+    if simulation or not participants:
+        return rapport
+
+    with transaction.atomic():
+        Participant.objects.bulk_create(participants)
+        rapport['crees'] = len(participants)
+        if attestations:
+            rapport['attestations'] = len(generer_attestations(formation, participants, user=user))
+    return rapport
+
+
+def generer_attestations(formation, participants=None, user=None):
+    """
+    Crée les attestations manquantes des ``participants`` (tous les inscrits
+    par défaut) ; références au format de ``AttestationFormation.save``.
+
+    Raises:
+        ValueError: formation sans rapport (entité émettrice inconnue).
+
+    Returns:
+        list: attestations créées.
+    """
+    rapport = formation.rapport
+    if rapport is None:
+        raise ValueError("La formation n'est rattachée à aucun rapport.")
+    entity, affaire, client = rapport.entity, formation.affaire, formation.client
+    if participants is None:
+        participants = list(formation.participants.all())
+    deja = set(
+        AttestationFormation.objects.filter(participant__in=participants).values_list('participant_id', flat=True)
+    )
+    participants = [participant for participant in participants if participant.pk not in deja]
+    if not participants:
+        return []
+
+    with transaction.atomic():
+        date = now()
+        sequence = AttestationFormation.objects.filter(
+            entity=entity,
+            client=client,
+            formation=formation,
+            doc_type='ATT',
+            date_creation__year=date.year,
+            date_creation__month=date.month,
+        ).aggregate(Max('sequence_number'))['sequence_number__max'] or 0
+        total_client = AttestationFormation.objects.filter(client=client).count()
+        jour = f"{str(date.year)[-2:]}{date.month:02d}{date.day:02d}"
+        details = formation.description or formation.titre
+
+        nouvelles = []
+        for rang, participant in enumerate(participants, start=1):
+            nouvelles.append(AttestationFormation(
+                entity=entity,
+                client=client,
+                affaire=affaire,
+                formation=formation,
+                participant=participant,
+                rapport=rapport,
+                details_formation=details,
+                doc_type='ATT',
+                created_by=user,
+                sequence_number=sequence + rang,
+                reference=(
+                    f"{entity.code}/ATT/{client.c_num}/{jour}/{affaire.reference}/{total_client + rang}"
+                    f"/{formation.pk}/{participant.pk}/{sequence + rang:04d}"
+                ),
+            ))
+        return AttestationFormation.objects.bulk_create(nouvelles)
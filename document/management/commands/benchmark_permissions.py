@@ -0,0 +1,86 @@
+import time
+from types import SimpleNamespace
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.client import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.request import Request
+
+from affaires_app.permissions import AffairePermission
+from document.permissions import DepartmentPermission
+from opportunites_app.permissions import OpportunitePermission
+
+
+class RapportViewSet:
+    """Vue factice : DepartmentPermission déduit le modèle du nom de la classe."""
+    action = 'update'
+
+
+class Command(BaseCommand):
+    help = "Mesure le coût des contrôles de permission sur une liste de N objets"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=500, help="Nombre d'objets de la liste")
+        parser.add_argument('--departement', default='Inspection', help="Département de l'utilisateur de test")
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        User = get_user_model()
+        # Utilisateur non sauvegardé : aucune donnée n'est écrite en base
+        user = User(pk=0, username='benchmark', email='benchmark@example.com',
+                    departement=options['departement'], is_superuser=False, is_staff=False)
+
+        autre = 10 ** 9
+        affaires = [SimpleNamespace(createur_id=autre, responsable_id=autre) for _ in range(rows)]
+        opportunites = [SimpleNamespace(created_by_id=autre, entity_id=None) for _ in range(rows)]
+        view = SimpleNamespace(action='partial_update')
+
+        self.stdout.write(f"Contrôles de permission sur {rows} objets (utilisateur {user.departement})")
+        cas = [
+            ('DepartmentPermission', DepartmentPermission(), RapportViewSet(),
+             [None] * rows, True),
+            ('AffairePermission', AffairePermission(), view, affaires, False),
+            ('OpportunitePermission', OpportunitePermission(), view, opportunites, False),
+        ]
+        for nom, permission, vue, objets, vue_seule in cas:
+            for memoise in (False, True):
+                duree, requetes = self._mesurer(user, permission, vue, objets, vue_seule, memoise)
+                libelle = 'mémorisé' if memoise else 'sans mémorisation'
+                self.stdout.write(
+                    f"  {nom:<22} {libelle:<18} {duree * 1000:8.2f} ms  "
+                    f"{duree * 1e6 / rows:7.2f} µs/objet  {requetes} requête(s)"
+                )
+
+    def _nouvelle_requete(self, user):
+        request = Request(RequestFactory().patch('/'))
+        request.user = user
+        return request
+
+    def _vider_cache_permissions(self, user):
+        # Cache de permissions que ModelBackend pose sur l'instance utilisateur
+        for attribut in ('_perm_cache', '_user_perm_cache', '_group_perm_cache'):
+            user.__dict__.pop(attribut, None)
+
+    def _mesurer(self, user, permission, vue, objets, vue_seule, memoise):
+        # Sans mémorisation, chaque objet est évalué avec une requête neuve,
+        # ce qui reproduit le coût d'une évaluation non mise en cache.
+        request = self._nouvelle_requete(user)
+        self._vider_cache_permissions(user)
+        with CaptureQueriesContext(connection) as queries:
+            debut = time.perf_counter()
+            for obj in objets:
+                if not memoise:
+                    request = self._nouvelle_requete(user)
+                    self._vider_cache_permissions(user)
+                try:
+                    if vue_seule:
+                        permission.has_permission(request, vue)
+                    else:
+                        permission.has_object_permission(request, vue, obj)
+                except PermissionDenied:
+                    pass
+            duree = time.perf_counter() - debut
+        return duree, len(queries)
@@ -0,0 +1,32 @@
+from django.conf import settings
+
+from .identity_map import activate, deactivate
+
+
+class IdentityMapMiddleware:
+    """
+    Ouvre une identity map pour la durée de la requête lorsque la vue
+    l'a demandé (``identity_map = True`` sur la classe de vue) ou lorsque
+    ``settings.IDENTITY_MAP_ENABLED`` est vrai.
+
+    Le nombre de requêtes évitées est renvoyé dans l'en-tête
+    ``X-Identity-Map-Saved``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        token = getattr(request, '_identity_map_token', None)
+        if token is not None:
+            imap = deactivate(token)
+            del request._identity_map_token
+            response['X-Identity-Map-Saved'] = str(imap.hits)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+        if getattr(settings, 'IDENTITY_MAP_ENABLED', False) or getattr(view_class, 'identity_map', False):
+            request._identity_map_token = activate()
+        return None
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-18 23:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('document', '0029_rename_category_departement_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='auditlog',
+            name='action',
+            field=models.CharField(choices=[('CREATE', 'Création'), ('UPDATE', 'Modification'), ('DELETE', 'Suppression'), ('VALIDATE', 'Validation'), ('REFUSE', 'Refus'), ('MERGE', 'Fusion')], max_length=50),
+        ),
+    ]
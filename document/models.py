@@ -122,6 +122,7 @@ class AuditLog(models.Model):
         ('DELETE', 'Suppression'),
         ('VALIDATE', 'Validation'),
         ('REFUSE', 'Refus'),
+        ('MERGE', 'Fusion'),
     ]
     
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True)
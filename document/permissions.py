@@ -85,86 +85,108 @@ class PermissionBuilder:
 
 # Generate the permissions
 department_permissions = PermissionBuilder.generate_permissions()
-class DepartmentPermission(permissions.BasePermission):
-   def get_error_response(self, user, action, model_name):
-    error_messages = {
-        'not_found': {
-            'message': _("Accès refusé - Département {dept} non autorisé"),
-            'detail': _("Votre département n'a pas les permissions nécessaires. Contactez votre administrateur."),
-            'code': 'DEPT_DENIED',
-            'status': status.HTTP_403_FORBIDDEN
-        },
-        'model_denied': {
-            'message': _("Accès refusé - Module {model}"), 
-            'detail': _("Vous n'avez pas accès à ce module. Contactez votre administrateur."),
-            'code': 'MODEL_DENIED',
-            'status': status.HTTP_403_FORBIDDEN
-        },
-        'action_denied': {
-            'message': _("Action non autorisée - {action} sur {model}"),
-            'detail': _("Vous n'avez pas les droits pour effectuer cette action. Contactez votre administrateur."),
-            'code': 'ACTION_DENIED', 
-            'status': status.HTTP_403_FORBIDDEN
-        }
-    }
 
-    
-    
-    dept_perms = department_permissions.get(user.departement)
-    
-    if not user.departement or not dept_perms:
-        error = error_messages['not_found']
+
+def compile_permissions(permissions_by_department: Dict[str, Any]):
+    """
+    Aplatit la structure imbriquée département → modèles → actions en
+    ensembles de tuples, consultables en temps constant.
+    """
+    allowed_models = frozenset(
+        (dept, model)
+        for dept, perms in permissions_by_department.items()
+        for model in perms['allowed_models']
+    )
+    allowed_actions = frozenset(
+        (dept, model, action)
+        for dept, perms in permissions_by_department.items()
+        for model, actions in perms['actions'].items()
+        if (dept, model) in allowed_models
+        for action in actions
+    )
+    return frozenset(permissions_by_department), allowed_models, allowed_actions
+
+
+# Table compilée une seule fois au chargement du module
+DEPARTMENTS, ALLOWED_MODELS, ALLOWED_ACTIONS = compile_permissions(department_permissions)
+
+ERROR_MESSAGES = {
+    'not_found': {
+        'message': _("Accès refusé - Département {dept} non autorisé"),
+        'detail': _("Votre département n'a pas les permissions nécessaires. Contactez votre administrateur."),
+        'code': 'DEPT_DENIED',
+    },
+    'model_denied': {
+        'message': _("Accès refusé - Module {model}"),
+        'detail': _("Vous n'avez pas accès à ce module. Contactez votre administrateur."),
+        'code': 'MODEL_DENIED',
+    },
+    'action_denied': {
+        'message': _("Action non autorisée - {action} sur {model}"),
+        'detail': _("Vous n'avez pas les droits pour effectuer cette action. Contactez votre administrateur."),
+        'code': 'ACTION_DENIED',
+    },
+}
+
+
+def memoize_for_request(request, key, compute):
+    """
+    Mémorise le résultat de ``compute()`` sur la requête courante.
+
+    Les décisions de permission ne dépendent que de l'utilisateur et de la
+    requête : une liste de N objets ne paie donc le calcul qu'une fois.
+    """
+    decisions = getattr(request, '_permission_decisions', None)
+    if decisions is None:
+        decisions = {}
+        request._permission_decisions = decisions
+    if key not in decisions:
+        decisions[key] = compute()
+    return decisions[key]
+
+
+def check_department_rule(departement, model_name, action):
+    """Retourne None si l'action est autorisée, sinon la clé du message d'erreur."""
+    if not departement or departement not in DEPARTMENTS:
+        return 'not_found'
+    if (departement, model_name) not in ALLOWED_MODELS:
+        return 'model_denied'
+    if (departement, model_name, action) not in ALLOWED_ACTIONS:
+        return 'action_denied'
+    return None
+
+
+class DepartmentPermission(permissions.BasePermission):
+    def get_error_response(self, user, action, model_name, error_key='action_denied'):
+        error = ERROR_MESSAGES[error_key]
         raise PermissionDenied(detail={
-            'message': error['message'].format(dept=user.departement),
+            'message': error['message'].format(dept=user.departement, model=model_name, action=action),
             'detail': error['detail'],
             'code': error['code']
         })
-    
-    allowed_models = dept_perms['allowed_models']
-    if model_name not in allowed_models:
-        error = error_messages['model_denied']
-        raise PermissionDenied(detail={
-            'message': error['message'].format(model=model_name),
-            'detail': error['detail'], 
-            'code': error['code']
-        })
-    
-    error = error_messages['action_denied']
-    raise PermissionDenied(detail={
-        'message': error['message'].format(action=action, model=model_name),
-        'detail': error['detail'],
-        'code': error['code']
-    })
 
-   def has_permission(self, request, view):
-       user = request.user
-       action = view.action
-       model_name = view.__class__.__name__.replace('ViewSet', '')
-
-       if user.is_superuser:
-           return True
-
-       
+    def has_permission(self, request, view):
+        user = request.user
+        action = view.action
+        model_name = view.__class__.__name__.replace('ViewSet', '')
 
-       dept_perms = department_permissions.get(user.departement)
+        if user.is_superuser:
+            return True
 
-       if not dept_perms:
-           self.get_error_response(user, action, model_name)
+        error_key = memoize_for_request(
+            request,
+            ('department', user.pk, model_name, action),
+            lambda: check_department_rule(user.departement, model_name, action)
+        )
+        if error_key:
+            self.get_error_response(user, action, model_name, error_key)
 
-       allowed_models = dept_perms['allowed_models']
-       if model_name not in allowed_models:
-           self.get_error_response(user, action, model_name)
+        return True
 
-       allowed_actions = dept_perms['actions'].get(model_name, [])
-       if action not in allowed_actions:
-           self.get_error_response(user, action, model_name)
+    def has_object_permission(self, request, view, obj):
+        return self.has_permission(request, view)
 
-       return True
 
-   def has_object_permission(self, request, view, obj):
-       return self.has_permission(request, view)
-   
-   
 from rest_framework import permissions
 
 
@@ -1,3 +1,104 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models.deletion import Collector
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from affaires_app.models import Affaire
+from client.models import Client
+from offres_app.models import Offre
+
+from .identity_map import get_identity_map, identity_map
+from .models import AuditLog, Departement, Entity, Product
+
+
+class IdentityMapTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.entity = Entity.objects.create(code='KIP', name='KES INSPECTIONS')
+        departement = Departement.objects.create(code='INS', name='INSPECTION', entity=cls.entity)
+        cls.produit = Product.objects.create(code='VTE1', name='Vérification', departement=departement)
+        cls.client_obj = Client.objects.create(nom='Client A')
+        cls.user = get_user_model().objects.create_user(username='commercial', email='c@kes.test', password='x')
+
+    def creer_offre(self):
+        return Offre.objects.create(
+            client=self.client_obj, entity=self.entity, produit_principal=self.produit,
+            montant=Decimal('1000'), user=self.user,
+        )
+
+    def test_inactive_par_defaut(self):
+        self.assertIsNone(get_identity_map())
+        Client.objects.get(pk=self.client_obj.pk)
+        with self.assertNumQueries(1):
+            Client.objects.get(pk=self.client_obj.pk)
+
+    def test_recherche_par_pk_servie_depuis_la_map(self):
+        with identity_map() as imap:
+            client = Client.objects.get(pk=self.client_obj.pk)
+            with self.assertNumQueries(0):
+                self.assertIs(Client.objects.get(pk=self.client_obj.pk), client)
+            self.assertEqual(imap.hits, 1)
+
+    def test_cle_etrangere_servie_depuis_la_map(self):
+        offre = self.creer_offre()
+        with identity_map():
+            Client.objects.get(pk=self.client_obj.pk)
+            offre = Offre.objects.get(pk=offre.pk)
+            with self.assertNumQueries(0):
+                self.assertEqual(offre.client.pk, self.client_obj.pk)
+
+    def test_instance_modifiee_en_memoire_relue_en_base(self):
+        with identity_map():
+            client = Client.objects.get(pk=self.client_obj.pk)
+            client.nom = 'Modifié'
+            with self.assertNumQueries(1):
+                self.assertEqual(Client.objects.get(pk=client.pk).nom, 'Client A')
+
+    def test_save_rafraichit_la_map(self):
+        with identity_map():
+            client = Client.objects.get(pk=self.client_obj.pk)
+            client.nom = 'Renommé'
+            client.save()
+            with self.assertNumQueries(0):
+                self.assertEqual(Client.objects.get(pk=client.pk).nom, 'Renommé')
+
+    def test_update_invalide_le_modele(self):
+        with identity_map():
+            Client.objects.get(pk=self.client_obj.pk)
+            Client.objects.filter(pk=self.client_obj.pk).update(nom='Mis à jour')
+            with self.assertNumQueries(1):
+                self.assertEqual(Client.objects.get(pk=self.client_obj.pk).nom, 'Mis à jour')
+
+    def test_suppression_vide_la_map(self):
+        autre = Client.objects.create(nom='Client B')
+        with identity_map():
+            Client.objects.get(pk=autre.pk)
+            Client.objects.filter(pk=autre.pk).delete()
+            with self.assertRaises(Client.DoesNotExist):
+                Client.objects.get(pk=autre.pk)
+
+            offre = self.creer_offre()
+            Offre.objects.get(pk=offre.pk)
+            self.client_obj.delete()
+            with self.assertRaises(Offre.DoesNotExist):
+                Offre.objects.get(pk=offre.pk)
+
+    def test_suppression_rapide_preservee(self):
+        # Aucun récepteur post_delete global : les purges restent en une requête
+        self.assertTrue(Collector(using='default').can_fast_delete(AuditLog.objects.all()))
 
-# Create your tests here.
+    def test_offre_save_compare_a_l_etat_en_base(self):
+        offre = self.creer_offre()
+        self.assertFalse(Affaire.objects.filter(offre=offre).exists())
+        with identity_map():
+            offre = Offre.objects.get(pk=offre.pk)
+            offre.statut = 'GAGNE'
+            with CaptureQueriesContext(connection) as requetes:
+                offre.save()
+            # L'ancien statut est relu en base (BROUILLON), pas pris dans la map
+            self.assertTrue(any('FROM "offres_app_offre"' in q['sql'] for q in requetes.captured_queries))
+        self.assertTrue(Affaire.objects.filter(offre=offre).exists())
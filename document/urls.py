@@ -13,6 +13,7 @@ from .views import (
     FormationViewSet,
     ParticipantViewSet,
     AttestationFormationViewSet,
+    StatsCacheView,
 )
 
 # Création du router
@@ -37,6 +38,7 @@ app_name = 'api'
 urlpatterns = [
     # Inclusion des URLs générées par le router
     path('', include(router.urls)),
+    path('stats-cache/', StatsCacheView.as_view(), name='stats-cache'),
     
     
     # URLs d'authentification de DRF
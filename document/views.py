@@ -1,4 +1,4 @@
-from rest_framework import viewsets, status, filters
+from rest_framework import viewsets, status, filters, parsers
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -6,11 +6,17 @@ from django.shortcuts import get_object_or_404
 from django.db.models import Count, Sum, Q
 from django.utils.timezone import now
 from datetime import timedelta
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
 
 from factures_app.models import Facture
 from offres_app.models import Offre
 from proformas_app.models import Proforma
 
+from analytics_app.pivot import pivot
+from exports_app.mixins import ArchiveMixin
+from .cache import get_cache_stats, stale_while_revalidate
+from .inscriptions import generer_attestations as generer_attestations_formation, inscrire as inscrire_participants
 from .models import (
     Departement, Entity, Product, 
     Rapport, Formation, 
@@ -133,6 +139,7 @@ class OffreViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'])
+    @stale_while_revalidate()
     def statistiques(self, request):
         """Retourne des statistiques sur les offres."""
         period = request.query_params.get('period', 'month')
@@ -146,45 +153,39 @@ class OffreViewSet(viewsets.ModelViewSet):
         else:  # month
             date_debut = now().replace(day=1)
         
-        # Statistiques par statut
-        statut_stats = Offre.objects.filter(
-            date_creation__gte=date_debut
-        ).values('statut').annotate(
-            count=Count('id'),
-            montant_total=Sum('montant')
+        # Un seul GROUP BY statut × entité, ventilé ensuite
+        resultat = pivot(
+            'offres', rows=['statut', 'entity_nom'],
+            mesures=['count', 'sum:montant'], date_debut=date_debut.date(),
         )
-        
-        # Statistiques par produit
-        produit_stats = Offre.objects.filter(
-            date_creation__gte=date_debut
-        ).values('produit__name').annotate(
-            count=Count('id'),
-            montant_total=Sum('montant')
-        )
-        
-        # Statistiques par entité
-        entity_stats = Offre.objects.filter(
-            date_creation__gte=date_debut
-        ).values('entity__name').annotate(
-            count=Count('id'),
-            montant_total=Sum('montant')
-        )
-        
+        cellules = resultat['cellules']
+
+        def ventiler(dimension, cle):
+            groupes = {}
+            for cellule in cellules:
+                groupe = groupes.setdefault(cellule[dimension], {cle: cellule[dimension], 'count': 0, 'montant_total': 0})
+                groupe['count'] += cellule['count']
+                groupe['montant_total'] += cellule['sum_montant']
+            return list(groupes.values())
+
+        # Produits de l'offre (plusieurs-à-plusieurs) : requête à part pour ne
+        # pas compter une offre plusieurs fois dans les autres ventilations
+        par_produit = [
+            {'produit__name': ligne['produits__name'], 'count': ligne['count'], 'montant_total': ligne['montant_total']}
+            for ligne in Offre.objects.filter(date_creation__gte=date_debut)
+            .values('produits__name').annotate(count=Count('id'), montant_total=Sum('montant')).order_by()
+        ]
+
+        par_statut = {groupe['statut']: groupe['count'] for groupe in ventiler('statut', 'statut')}
         return Response({
-            'par_statut': statut_stats,
-            'par_produit': produit_stats,
-            'par_entity': entity_stats,
-            'montant_total': Offre.objects.filter(
-                date_creation__gte=date_debut
-            ).aggregate(Sum('montant'))['montant__sum'] or 0,
+            'par_statut': ventiler('statut', 'statut'),
+            'par_produit': par_produit,
+            'par_entity': ventiler('entity_nom', 'entity__name'),
+            'montant_total': resultat['totaux']['sum_montant'],
             'taux_conversion': {
-                'total': Offre.objects.filter(date_creation__gte=date_debut).count(),
-                'gagnees': Offre.objects.filter(
-                    date_creation__gte=date_debut, statut='GAGNE'
-                ).count(),
-                'perdues': Offre.objects.filter(
-                    date_creation__gte=date_debut, statut='PERDU'
-                ).count(),
+                'total': resultat['totaux']['count'],
+                'gagnees': par_statut.get('GAGNE', 0),
+                'perdues': par_statut.get('PERDU', 0),
             }
         })
 
@@ -384,6 +385,48 @@ class FormationViewSet(viewsets.ModelViewSet):
         serializer = AttestationFormationListSerializer(attestations, many=True)
         return Response(serializer.data)
 
+    @action(detail=True, methods=['post'], parser_classes=[parsers.MultiPartParser, parsers.FormParser])
+    def inscrire(self, request, pk=None):
+        """
+        Inscrit en masse les participants d'un fichier CSV ou XLSX
+        (``fichier`` ; colonnes nom, prenom, email, telephone, fonction).
+        Les personnes déjà inscrites sont écartées. ``simulation`` = true
+        valide sans enregistrer ; ``attestations`` = true génère ensuite les
+        attestations des inscrits.
+        """
+        formation = self.get_object()
+        fichier = request.FILES.get('fichier')
+        if fichier is None:
+            return Response({"detail": "Le fichier est requis."}, status=status.HTTP_400_BAD_REQUEST)
+        options = {
+            nom: str(request.data.get(nom, '')).lower() in ('1', 'true', 'oui')
+            for nom in ('simulation', 'attestations')
+        }
+        try:
+            rapport = inscrire_participants(
+                formation,
+                fichier,
+                nom_fichier=fichier.name,
+                user=request.user if request.user.is_authenticated else None,
+                **options,
+            )
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(rapport, status=status.HTTP_201_CREATED if rapport['crees'] else status.HTTP_200_OK)
+
+    @action(detail=True, methods=['post'])
+    def generer_attestations(self, request, pk=None):
+        """Génère les attestations manquantes de tous les participants de la formation."""
+        formation = self.get_object()
+        try:
+            attestations = generer_attestations_formation(
+                formation, user=request.user if request.user.is_authenticated else None
+            )
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = AttestationFormationListSerializer(attestations, many=True)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
 class ParticipantViewSet(viewsets.ModelViewSet):
     queryset = Participant.objects.all()
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -412,16 +455,25 @@ class ParticipantViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
 
-class AttestationFormationViewSet(viewsets.ModelViewSet):
+class AttestationFormationViewSet(ArchiveMixin, viewsets.ModelViewSet):
     queryset = AttestationFormation.objects.all()
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['client', 'statut', 'entity', 'affaire', 'formation', 'participant', 'rapport']
     search_fields = ['reference', 'client__nom', 'participant__nom', 'participant__prenom']
     ordering_fields = ['reference', 'date_creation']
+    archive_filename = 'attestations'
 
     def get_serializer_class(self):
         if self.action == 'list':
             return AttestationFormationListSerializer
         elif self.action in ['create', 'update', 'partial_update']:
             return AttestationFormationEditSerializer
-        return AttestationFormationDetailSerializer
\ No newline at end of file
+        return AttestationFormationDetailSerializer
+
+
+class StatsCacheView(APIView):
+    """Compteurs du cache des endpoints de statistiques (processus courant)."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response(get_cache_stats())
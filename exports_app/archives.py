@@ -0,0 +1,79 @@
+"""
+Archives zip des fichiers joints, écrites en flux.
+
+Chaque fichier est lu depuis le stockage par morceaux de taille fixe et
+recopié dans l'archive sans compression (PDF et images le sont déjà) ;
+l'archive est écrite dans un tampon non positionnable (descripteurs de
+données après chaque entrée) dont les octets sont rendus au fur et à
+mesure. Ni fichier temporaire, ni fichier chargé entièrement en mémoire.
+
+Les fichiers absents du stockage sont listés dans ``MANQUANTS.txt``, en
+fin d'archive.
+"""
+import os
+import re
+import zipfile
+
+from django.utils import timezone
+
+from .xlsx import _Tampon
+
+TAILLE_MORCEAU = 64 * 1024
+
+CARACTERES_INTERDITS = re.compile(r'[\\/:*?"<>|\x00-\x1f]+')
+
+
+def nom_entree(nom, chemin, pris):
+    """
+    Nom de l'entrée dans l'archive : ``nom`` nettoyé suivi de l'extension
+    du fichier stocké, rendu unique (suffixe `` (2)``, `` (3)``…).
+    """
+    base = CARACTERES_INTERDITS.sub('_', str(nom or '')).strip(' ._') or os.path.splitext(os.path.basename(chemin))[0]
+    extension = os.path.splitext(chemin)[1]
+    candidat, rang = f"{base}{extension}", 1
+    while candidat.lower() in pris:
+        rang += 1
+        candidat = f"{base} ({rang}){extension}"
+    pris.add(candidat.lower())
+    return candidat
+
+
+def iter_zip(fichiers, stockage, taille_morceau=TAILLE_MORCEAU):
+    """
+    Génère les octets d'une archive zip.
+
+    Args:
+        fichiers (iterable): couples (nom, chemin dans ``stockage``).
+        stockage: stockage Django des fichiers (``FileField.storage``).
+    """
+    tampon = _Tampon()
+    pris, manquants = set(), []
+    horodatage = timezone.localtime().timetuple()[:6]
+
+    with zipfile.ZipFile(tampon, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for nom, chemin in fichiers:
+            try:
+                source = stockage.open(chemin, 'rb')
+            except OSError:
+                manquants.append(chemin)
+                continue
+            with source:
+                info = zipfile.ZipInfo(nom_entree(nom, chemin, pris), date_time=horodatage)
+                info.compress_type = zipfile.ZIP_STORED
+                try:
+                    info.file_size = source.size
+                except OSError:
+                    pass
+                with archive.open(info, 'w', force_zip64=not info.file_size) as entree:
+                    for morceau in source.chunks(taille_morceau):
+                        entree.write(morceau)
+                        if tampon.taille >= taille_morceau:
+                            yield tampon.vider()
+            yield tampon.vider()
+
+        if manquants:
+            archive.writestr(
+                zipfile.ZipInfo('MANQUANTS.txt', date_time=horodatage),
+                'Fichiers introuvables dans le stockage :\n' + '\n'.join(manquants) + '\n',
+            )
+    yield tampon.vider()
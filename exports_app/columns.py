@@ -0,0 +1,136 @@
+"""
+Colonnes d'export déclarées par les viewsets.
+
+Une colonne est un tuple ``(libellé, chemin)`` ou ``(libellé, chemin,
+formateur)`` ; ``chemin`` suit la syntaxe des lookups Django
+(``offre__client__nom``) et ne traverse que des relations à valeur unique
+(clé étrangère, un-à-un). Les lignes sont lues par ``values_list`` sur les
+chemins déclarés : les jointures sont faites en SQL, aucune instance n'est
+construite et ``iterator(chunk_size=…)`` garde une mémoire constante.
+
+Sans formateur, la valeur est mise en forme selon le champ final : libellé
+des choix, dates au format JJ/MM/AAAA (heure locale pour les DateTime),
+Oui/Non pour les booléens, chaîne vide pour NULL. Les formats typés (XLSX)
+conservent dates, nombres et booléens (``iter_lignes(..., typees=True)``).
+"""
+from datetime import datetime
+
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.db import models
+from django.utils import timezone
+
+TAILLE_LOT = 2000
+
+
+def format_date(valeur):
+    if isinstance(valeur, datetime) and timezone.is_aware(valeur):
+        valeur = timezone.localtime(valeur)
+    return valeur.strftime('%d/%m/%Y')
+
+
+def format_datetime(valeur):
+    if timezone.is_aware(valeur):
+        valeur = timezone.localtime(valeur)
+    return valeur.strftime('%d/%m/%Y %H:%M')
+
+
+def format_booleen(valeur):
+    return 'Oui' if valeur else 'Non'
+
+
+def _date_locale(valeur):
+    if isinstance(valeur, datetime):
+        return timezone.localtime(valeur).date() if timezone.is_aware(valeur) else valeur.date()
+    return valeur
+
+
+def _datetime_locale(valeur):
+    return timezone.make_naive(valeur) if timezone.is_aware(valeur) else valeur
+
+
+# Formateurs texte -> conversion pour les cellules typées (None : valeur brute)
+FORMATEURS_TYPES = {
+    format_date: _date_locale,
+    format_datetime: _datetime_locale,
+    format_booleen: None,
+}
+
+
+def _champ_final(model, chemin):
+    """Champ désigné par ``chemin`` ; refuse les relations multi-valuées."""
+    champ = None
+    for nom in chemin.split('__'):
+        try:
+            champ = model._meta.get_field(nom)
+        except FieldDoesNotExist:
+            raise ImproperlyConfigured(f"{model.__name__} : champ d'export inconnu « {chemin} ».")
+        if champ.many_to_many or champ.one_to_many:
+            raise ImproperlyConfigured(
+                f"{model.__name__} : « {chemin} » traverse une relation multiple, non exportable."
+            )
+        if champ.is_relation:
+            model = champ.related_model
+    return champ
+
+
+def _formateur(champ):
+    if champ.choices:
+        libelles = {cle: str(libelle) for cle, libelle in champ.flatchoices}
+        return lambda valeur: libelles.get(valeur, valeur)
+    if isinstance(champ, models.DateTimeField):
+        return format_datetime
+    if isinstance(champ, models.DateField):
+        return format_date
+    if isinstance(champ, models.BooleanField):
+        return format_booleen
+    return None
+
+
+def resoudre_colonnes(model, colonnes):
+    """Liste de (libellé, chemin, formateur) pour ``model``."""
+    resolues = []
+    for colonne in colonnes:
+        libelle, chemin, *reste = colonne
+        champ = _champ_final(model, chemin)
+        resolues.append((libelle, chemin, reste[0] if reste else _formateur(champ)))
+    return resolues
+
+
+def formater(valeur, formateur=None):
+    if valeur is None:
+        return ''
+    if formateur is not None:
+        return formateur(valeur)
+    if isinstance(valeur, datetime):
+        return format_datetime(valeur)
+    return valeur
+
+
+def formater_type(valeur, formateur=None):
+    if valeur is None:
+        return None
+    if formateur is not None:
+        return formateur(valeur)
+    if isinstance(valeur, datetime):
+        return _datetime_locale(valeur)
+    return valeur
+
+
+def iter_lignes(queryset, colonnes, taille_lot=TAILLE_LOT, typees=False):
+    """
+    Lignes mises en forme (listes de valeurs) de ``queryset`` pour les
+    colonnes résolues ``colonnes``, lues par lots de ``taille_lot``.
+
+    Avec ``typees``, dates, nombres et booléens sont conservés tels quels
+    (dates-heures en heure locale) ; seuls les libellés de choix et les
+    formateurs propres aux colonnes sont appliqués.
+    """
+    chemins = [chemin for _libelle, chemin, _formateur in colonnes]
+    formateurs = [formateur for _libelle, _chemin, formateur in colonnes]
+    mise_en_forme = formater
+    if typees:
+        formateurs = [FORMATEURS_TYPES.get(formateur, formateur) for formateur in formateurs]
+        mise_en_forme = formater_type
+    lignes = queryset.prefetch_related(None).values_list(*chemins).iterator(chunk_size=taille_lot)
+    for ligne in lignes:
+        yield [mise_en_forme(valeur, formateur) for valeur, formateur in zip(ligne, formateurs)]
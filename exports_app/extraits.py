@@ -0,0 +1,342 @@
+"""
+Extraits décisionnels (BI).
+
+Tables de faits dénormalisées (offres et leurs lignes, affaires, factures
+avec leur état de paiement, opportunités, changements de statut) écrites en
+flux, en CSV compressé gzip ou en msgpack, lues par ``values_list`` et
+``iterator(chunk_size=…)`` : mémoire constante quel que soit le volume.
+
+Les valeurs sont brutes (codes et non libellés, dates-heures ISO 8601 en
+UTC, montants en texte pour ne rien perdre de leur précision). En msgpack,
+le premier objet est la liste des colonnes, puis un tableau par ligne.
+
+Extraction incrémentale : chaque table a un filigrane
+(``FiligraneExtrait``), date de modification jusqu'à laquelle elle a déjà
+été extraite. Un extrait couvre les lignes modifiées dans ]filigrane,
+borne], la borne restant ``MARGE`` en deçà de l'heure courante pour ne pas
+manquer une transaction en cours de validation. Les lignes sont
+partitionnées par mois de création ; le filigrane n'avance qu'une fois
+toutes les partitions écrites (``avancer``).
+"""
+import csv
+import io
+import os
+import zlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+import msgpack
+from django.db.models import Case, Count, DecimalField, ExpressionWrapper, F, Value, When
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from affaires_app.models import Affaire
+from factures_app.models import Facture
+from offres_app.models import Offre
+from opportunites_app.models import Opportunite
+from status_traking.models import StatusChange
+
+from .columns import TAILLE_LOT
+from .models import FiligraneExtrait
+
+MARGE = timedelta(minutes=5)
+LIGNES_PAR_ECRITURE = 500
+NIVEAU_GZIP = 6
+
+
+def _factures():
+    # État indépendant de la date d'extraction (une ligne n'est réextraite
+    # que si elle est modifiée) : le retard se déduit de date_echeance
+    return Facture.objects.annotate(
+        reste_a_payer=ExpressionWrapper(
+            F('montant_ttc') - F('montant_paye'), output_field=DecimalField(max_digits=15, decimal_places=2)
+        ),
+        etat_paiement=Case(
+            When(statut='ANNULEE', then=Value('ANNULEE')),
+            When(montant_ttc__gt=0, montant_paye__gte=F('montant_ttc'), then=Value('SOLDEE')),
+            When(montant_paye__gt=0, then=Value('PARTIELLE')),
+            default=Value('NON_PAYEE'),
+        ),
+    )
+
+
+# Par table : requête de base, colonnes (nom, chemin), champ de
+# modification (filigrane) et champ de création (partition mensuelle)
+TABLES = {
+    'offres': {
+        'requete': lambda: Offre.objects.all(),
+        'colonnes': [
+            ('offre_id', 'pk'), ('reference', 'reference'), ('statut', 'statut'),
+            ('client_id', 'client_id'), ('client', 'client__nom'), ('entite', 'entity__code'),
+            ('produit_principal', 'produit_principal__code'), ('montant', 'montant'),
+            ('responsable_id', 'user_id'), ('date_creation', 'date_creation'),
+            ('date_envoi', 'date_envoi'), ('date_validation', 'date_validation'),
+            ('date_cloture', 'date_cloture'), ('date_modification', 'date_modification'),
+            # Une ligne par produit de l'offre (jointure externe)
+            ('ligne_id', 'offre_produits__id'), ('ligne_produit', 'offre_produits__produit__code'),
+            ('ligne_quantite', 'offre_produits__quantite'),
+            ('ligne_prix_unitaire', 'offre_produits__prix_unitaire'),
+        ],
+        'modification': 'date_modification',
+        'partition': 'date_creation',
+    },
+    'affaires': {
+        'requete': lambda: Affaire.objects.all(),
+        'colonnes': [
+            ('affaire_id', 'pk'), ('reference', 'reference'), ('statut', 'statut'),
+            ('offre_id', 'offre_id'), ('client_id', 'offre__client_id'), ('client', 'offre__client__nom'),
+            ('entite', 'offre__entity__code'), ('responsable_id', 'responsable_id'),
+            ('montant_total', 'montant_total'), ('montant_facture', 'montant_facture'),
+            ('montant_paye', 'montant_paye'), ('date_debut', 'date_debut'),
+            ('date_fin_prevue', 'date_fin_prevue'), ('date_fin_reelle', 'date_fin_reelle'),
+            ('date_creation', 'date_creation'), ('date_modification', 'date_modification'),
+        ],
+        'modification': 'date_modification',
+        'partition': 'date_creation',
+    },
+    'factures': {
+        'requete': _factures,
+        'colonnes': [
+            ('facture_id', 'pk'), ('reference', 'reference'), ('statut', 'statut'),
+            ('etat_paiement', 'etat_paiement'), ('affaire_id', 'affaire_id'),
+            ('client_id', 'affaire__offre__client_id'), ('client', 'affaire__offre__client__nom'),
+            ('entite', 'affaire__offre__entity__code'), ('montant_ht', 'montant_ht'),
+            ('taux_tva', 'taux_tva'), ('montant_tva', 'montant_tva'), ('montant_ttc', 'montant_ttc'),
+            ('montant_paye', 'montant_paye'), ('reste_a_payer', 'reste_a_payer'),
+            ('date_creation', 'date_creation'), ('date_emission', 'date_emission'),
+            ('date_echeance', 'date_echeance'), ('date_paiement', 'date_paiement'),
+            ('date_modification', 'updated_at'),
+        ],
+        'modification': 'updated_at',
+        'partition': 'date_creation',
+    },
+    'opportunites': {
+        'requete': lambda: Opportunite.objects.all(),
+        'colonnes': [
+            ('opportunite_id', 'pk'), ('reference', 'reference'), ('statut', 'statut'),
+            ('client_id', 'client_id'), ('client', 'client__nom'), ('entite', 'entity__code'),
+            ('produit_principal', 'produit_principal__code'), ('responsable_id', 'responsable_id'),
+            ('montant', 'montant'), ('montant_estime', 'montant_estime'), ('probabilite', 'probabilite'),
+            ('date_creation', 'date_creation'), ('date_cloture_prevue', 'date_cloture_prevue'),
+            ('date_cloture', 'date_cloture'), ('date_modification', 'date_modification'),
+        ],
+        'modification': 'date_modification',
+        'partition': 'date_creation',
+    },
+    'changements_statut': {
+        'requete': lambda: StatusChange.objects.all(),
+        'colonnes': [
+            ('changement_id', 'pk'), ('modele', 'content_type__model'), ('objet_id', 'object_id'),
+            ('ancien_statut', 'ancien_statut'), ('nouveau_statut', 'nouveau_statut'),
+            ('utilisateur_id', 'utilisateur_id'), ('date_changement', 'date_changement'),
+        ],
+        'modification': 'date_changement',
+        'partition': 'date_changement',
+    },
+}
+
+
+def _valeur(valeur):
+    """Valeur brute sérialisable (msgpack) ; None conservé."""
+    if isinstance(valeur, datetime):
+        if timezone.is_aware(valeur):
+            valeur = valeur.astimezone(dt_timezone.utc)
+        return valeur.isoformat()
+    if isinstance(valeur, Decimal):
+        return str(valeur)
+    if hasattr(valeur, 'isoformat'):
+        return valeur.isoformat()
+    return valeur
+
+
+def _texte(valeur):
+    if valeur is None:
+        return ''
+    if isinstance(valeur, bool):
+        return int(valeur)
+    return valeur
+
+
+def table(nom):
+    """
+    Raises:
+        ValueError: table inconnue.
+    """
+    if nom not in TABLES:
+        raise ValueError(f"table doit valoir {', '.join(TABLES)}.")
+    return TABLES[nom]
+
+
+def colonnes(nom):
+    return [colonne for colonne, _chemin in table(nom)['colonnes']]
+
+
+def borne():
+    """Borne haute d'un extrait lancé maintenant."""
+    return timezone.now() - MARGE
+
+
+def filigrane(nom):
+    """Date de modification jusqu'à laquelle ``nom`` a été extraite (None : jamais)."""
+    return FiligraneExtrait.objects.filter(table=nom).values_list('filigrane', flat=True).first()
+
+
+def avancer(nom, jusqu_a, lignes=0):
+    """Enregistre que ``nom`` est extraite jusqu'à ``jusqu_a``."""
+    FiligraneExtrait.objects.update_or_create(table=nom, defaults={'filigrane': jusqu_a, 'lignes': lignes})
+
+
+def mois(texte):
+    """
+    'AAAA-MM' -> (début, fin) du mois, en heure locale.
+
+    Raises:
+        ValueError: format invalide.
+    """
+    try:
+        annee, numero = (int(partie) for partie in texte.split('-'))
+        debut = timezone.make_aware(datetime(annee, numero, 1))
+    except (TypeError, ValueError):
+        raise ValueError("mois doit être au format AAAA-MM.")
+    fin = timezone.make_aware(datetime(annee + numero // 12, numero % 12 + 1, 1))
+    return debut, fin
+
+
+def requete(nom, depuis=None, jusqu_a=None, periode=None):
+    """
+    Lignes de ``nom`` modifiées dans ]depuis, jusqu_a], créées dans
+    ``periode`` (début, fin) si indiquée.
+    """
+    definition = table(nom)
+    queryset = definition['requete']()
+    modification, partition = definition['modification'], definition['partition']
+    if depuis is not None:
+        queryset = queryset.filter(**{f'{modification}__gt': depuis})
+    if jusqu_a is not None:
+        queryset = queryset.filter(**{f'{modification}__lte': jusqu_a})
+    if periode is not None:
+        queryset = queryset.filter(**{f'{partition}__gte': periode[0], f'{partition}__lt': periode[1]})
+    return queryset
+
+
+def partitions(nom, depuis=None, jusqu_a=None):
+    """Mois ('AAAA-MM') ayant des enregistrements à extraire, avec leur nombre."""
+    partition = table(nom)['partition']
+    queryset = (
+        requete(nom, depuis, jusqu_a)
+        .order_by()
+        .annotate(mois=TruncMonth(partition))
+        .values('mois')
+        .annotate(enregistrements=Count('pk'))
+        .order_by('mois')
+    )
+    return [
+        {'mois': f"{ligne['mois']:%Y-%m}", 'enregistrements': ligne['enregistrements']}
+        for ligne in queryset
+    ]
+
+
+def iter_lignes(nom, queryset, taille_lot=TAILLE_LOT):
+    """Lignes (listes de valeurs brutes) de ``queryset``, lues par lots."""
+    chemins = [chemin for _colonne, chemin in table(nom)['colonnes']]
+    lignes = queryset.order_by(table(nom)['partition'], 'pk').values_list(*chemins).iterator(chunk_size=taille_lot)
+    for ligne in lignes:
+        yield [_valeur(valeur) for valeur in ligne]
+
+
+def iter_csv_gz(entetes, lignes):
+    """Octets d'un CSV compressé gzip, rendus au fil de la compression."""
+    compresseur = zlib.compressobj(NIVEAU_GZIP, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    texte = io.StringIO()
+    writer = csv.writer(texte)
+    writer.writerow(entetes)
+    for numero, ligne in enumerate(lignes, start=1):
+        writer.writerow([_texte(valeur) for valeur in ligne])
+        if numero % LIGNES_PAR_ECRITURE == 0:
+            morceau = compresseur.compress(texte.getvalue().encode())
+            texte.seek(0)
+            texte.truncate()
+            if morceau:
+                yield morceau
+    yield compresseur.compress(texte.getvalue().encode()) + compresseur.flush()
+
+
+def iter_msgpack(entetes, lignes):
+    """Octets msgpack : la liste des colonnes puis un tableau par ligne."""
+    packer = msgpack.Packer()
+    lot = [packer.pack(entetes)]
+    for ligne in lignes:
+        lot.append(packer.pack(ligne))
+        if len(lot) >= LIGNES_PAR_ECRITURE:
+            yield b''.join(lot)
+            lot = []
+    yield b''.join(lot)
+
+
+# Format -> (générateur, extension, type MIME)
+FORMATS = {
+    'csv': (iter_csv_gz, 'csv.gz', 'application/gzip'),
+    'msgpack': (iter_msgpack, 'msgpack', 'application/x-msgpack'),
+}
+
+
+def iter_extrait(nom, format='csv', depuis=None, jusqu_a=None, periode=None):
+    """
+    Octets de l'extrait de ``nom``.
+
+    Raises:
+        ValueError: table ou format inconnu.
+    """
+    if format not in FORMATS:
+        raise ValueError(f"format doit valoir {', '.join(FORMATS)}.")
+    generateur = FORMATS[format][0]
+    return generateur(colonnes(nom), iter_lignes(nom, requete(nom, depuis, jusqu_a, periode)))
+
+
+class _Compteur:
+    """Itérateur de lignes qui compte les lignes produites."""
+
+    def __init__(self, lignes):
+        self.lignes = lignes
+        self.nombre = 0
+
+    def __iter__(self):
+        for ligne in self.lignes:
+            self.nombre += 1
+            yield ligne
+
+
+def extraire(nom, dossier, format='csv', complet=False):
+    """
+    Écrit l'extrait incrémental de ``nom`` sous
+    ``dossier/<table>/mois=AAAA-MM/<table>-<borne>.<extension>``, une
+    partition après l'autre, puis avance le filigrane.
+
+    Args:
+        complet: ignore le filigrane (toutes les lignes jusqu'à la borne).
+
+    Returns:
+        dict: borne, filigrane précédent et lignes écrites par partition.
+    """
+    if format not in FORMATS:
+        raise ValueError(f"format doit valoir {', '.join(FORMATS)}.")
+    generateur, extension, _mime = FORMATS[format]
+    depuis = None if complet else filigrane(nom)
+    jusqu_a = borne()
+    resultat = {'table': nom, 'depuis': depuis, 'jusqu_a': jusqu_a, 'partitions': {}, 'fichiers': []}
+
+    for partition in partitions(nom, depuis, jusqu_a):
+        periode = mois(partition['mois'])
+        repertoire = os.path.join(dossier, nom, f"mois={partition['mois']}")
+        os.makedirs(repertoire, exist_ok=True)
+        chemin = os.path.join(repertoire, f"{nom}-{jusqu_a:%Y%m%dT%H%M%S}.{extension}")
+        lignes = iter_lignes(nom, requete(nom, depuis, jusqu_a, periode))
+        compteur = _Compteur(lignes)
+        with open(chemin, 'wb') as sortie:
+            for morceau in generateur(colonnes(nom), compteur):
+                sortie.write(morceau)
+        resultat['partitions'][partition['mois']] = compteur.nombre
+        resultat['fichiers'].append(chemin)
+
+    avancer(nom, jusqu_a, sum(resultat['partitions'].values()))
+    return resultat
@@ -0,0 +1,253 @@
+"""
+Exports en arrière-plan.
+
+Une demande (ressource, format, filtres de la liste) crée un ``ExportJob``
+exécuté, après le commit, par un pool de threads local au processus
+(``EXPORTS_WORKERS``). Le worker rejoue la vue d'export de la ressource
+avec les filtres enregistrés, écrit le fichier dans un fichier temporaire
+puis le range sous EXPORTS_ROOT (hors MEDIA_ROOT, chemin aléatoire), en
+mettant à jour l'avancement toutes les ``INTERVALLE_PROGRESSION`` lignes.
+
+Une demande identique (même empreinte : utilisateur, ressource, format et
+filtres) réutilise l'export en attente, en cours ou terminé depuis moins de
+``EXPORTS_TTL`` secondes ; un export en cours depuis plus de
+``EXPORTS_DUREE_MAX`` secondes (processus redémarré en cours d'export)
+n'est plus réutilisé. La commande ``traiter_exports`` passe ces exports en
+échec, exécute les demandes restées en attente et supprime les fichiers
+expirés.
+"""
+import csv
+import hashlib
+import io
+import json
+import logging
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import connections, transaction
+from django.http import HttpRequest, QueryDict
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from rest_framework.request import Request
+
+from .mixins import registre
+from .models import ExportJob
+from .xlsx import iter_xlsx
+
+logger = logging.getLogger(__name__)
+
+INTERVALLE_PROGRESSION = 5000
+
+STATUTS_REUTILISABLES = ['EN_ATTENTE', 'EN_COURS', 'TERMINE']
+
+_verrou = threading.Lock()
+_executeur = None
+
+
+def ttl():
+    return timedelta(seconds=settings.EXPORTS_TTL)
+
+
+def limite_en_cours():
+    """Date de démarrage en deçà de laquelle un export en cours est interrompu."""
+    return timezone.now() - timedelta(seconds=settings.EXPORTS_DUREE_MAX)
+
+
+def normaliser_filtres(filtres):
+    """Filtres sous la forme {nom: [valeurs]} triée, sans pagination."""
+    if isinstance(filtres, QueryDict):
+        filtres = filtres.lists()
+    elif isinstance(filtres, dict):
+        filtres = filtres.items()
+    resultat = {}
+    for nom, valeurs in filtres:
+        if nom in ('page', 'page_size', 'format'):
+            continue
+        valeurs = valeurs if isinstance(valeurs, (list, tuple)) else [valeurs]
+        resultat[nom] = [str(valeur) for valeur in valeurs]
+    return dict(sorted(resultat.items()))
+
+
+def empreinte(user, ressource, format, filtres):
+    cle = json.dumps([user.pk, ressource, format, filtres], sort_keys=True)
+    return hashlib.sha256(cle.encode()).hexdigest()
+
+
+def _requete(user, filtres):
+    """Requête GET synthétique portant les filtres de la liste."""
+    http = HttpRequest()
+    http.method = 'GET'
+    http.GET = QueryDict(mutable=True)
+    for nom, valeurs in filtres.items():
+        http.GET.setlist(nom, valeurs)
+    http.user = user
+    requete = Request(http)
+    requete.user = user
+    return requete
+
+
+def vue_export(vue, user, filtres):
+    """Instance du viewset ``vue`` (classe ou chemin) prête pour ``iter_export_rows``."""
+    classe = import_string(vue) if isinstance(vue, str) else vue
+    requete = _requete(user, filtres)
+    return classe(request=requete, format_kwarg=None, action='list', args=(), kwargs={})
+
+
+def demander(user, ressource, format='csv', filtres=None):
+    """
+    Crée (ou réutilise) un export de ``ressource``.
+
+    Raises:
+        ValueError: ressource ou format inconnu.
+        PermissionDenied: l'utilisateur n'a pas accès à la liste.
+
+    Returns:
+        tuple: (job, créé)
+    """
+    if ressource not in registre:
+        raise ValueError(f"ressource doit valoir {', '.join(sorted(registre))}.")
+    if format not in dict(ExportJob.FORMAT_CHOICES):
+        raise ValueError(f"format doit valoir {', '.join(dict(ExportJob.FORMAT_CHOICES))}.")
+    filtres = normaliser_filtres(filtres or {})
+    classe = registre[ressource]
+
+    vue = vue_export(classe, user, filtres)
+    vue.check_permissions(vue.request)
+
+    cle = empreinte(user, ressource, format, filtres)
+    existant = (
+        ExportJob.objects
+        .filter(empreinte=cle, statut__in=STATUTS_REUTILISABLES)
+        .exclude(statut='TERMINE', expire_le__lte=timezone.now())
+        .exclude(statut='EN_COURS', started_at__lt=limite_en_cours())
+        .order_by('-created_at')
+        .first()
+    )
+    if existant:
+        return existant, False
+
+    job = ExportJob.objects.create(
+        user=user,
+        ressource=ressource,
+        vue=f'{classe.__module__}.{classe.__qualname__}',
+        format=format,
+        filtres=filtres,
+        empreinte=cle,
+    )
+    transaction.on_commit(lambda: soumettre(job.pk))
+    return job, True
+
+
+def _pool():
+    global _executeur
+    with _verrou:
+        if _executeur is None:
+            _executeur = ThreadPoolExecutor(
+                max_workers=settings.EXPORTS_WORKERS, thread_name_prefix='export'
+            )
+        return _executeur
+
+
+def soumettre(job_id):
+    """Confie l'export ``job_id`` au pool de threads."""
+    return _pool().submit(_executer_thread, job_id)
+
+
+def _executer_thread(job_id):
+    try:
+        executer(job_id)
+    except Exception:
+        logger.exception("Export %s en échec", job_id)
+    finally:
+        connections.close_all()
+
+
+def _lignes_suivies(job, lignes):
+    """Compte les lignes produites et enregistre l'avancement périodiquement."""
+    traitees = 0
+    for ligne in lignes:
+        yield ligne
+        traitees += 1
+        if traitees % INTERVALLE_PROGRESSION == 0:
+            ExportJob.objects.filter(pk=job.pk).update(lignes_traitees=traitees)
+    job.lignes_traitees = traitees
+
+
+def _ecrire(job, vue, sortie):
+    lignes = vue.iter_export_rows(typees=job.format == 'xlsx')
+    entetes = next(lignes)
+    lignes = _lignes_suivies(job, lignes)
+    if job.format == 'xlsx':
+        for morceau in iter_xlsx(entetes, lignes, nom_feuille=job.ressource):
+            sortie.write(morceau)
+    else:
+        texte = io.TextIOWrapper(sortie, encoding='utf-8', newline='', write_through=True)
+        writer = csv.writer(texte)
+        writer.writerow(entetes)
+        writer.writerows(lignes)
+        texte.detach()
+
+
+def executer(job_id):
+    """
+    Exécute l'export ``job_id`` s'il est en attente (sinon ne fait rien).
+
+    Returns:
+        ExportJob | None
+    """
+    # Réservation atomique : un seul worker traite un job donné
+    pris = ExportJob.objects.filter(pk=job_id, statut='EN_ATTENTE').update(
+        statut='EN_COURS', started_at=timezone.now()
+    )
+    if not pris:
+        return None
+    job = ExportJob.objects.select_related('user').get(pk=job_id)
+    try:
+        vue = vue_export(job.vue, job.user, job.filtres)
+        job.total_lignes = vue.get_export_queryset().count()
+        ExportJob.objects.filter(pk=job.pk).update(total_lignes=job.total_lignes)
+
+        with tempfile.TemporaryFile() as sortie:
+            _ecrire(job, vue, sortie)
+            job.taille = sortie.tell()
+            sortie.seek(0)
+            nom = f'{vue.get_export_filename(job.format).rsplit(".", 1)[0]}_{job.pk}.{job.format}'
+            job.fichier.save(nom, File(sortie), save=False)
+
+        job.statut = 'TERMINE'
+        job.finished_at = timezone.now()
+        job.expire_le = job.finished_at + ttl()
+    except Exception as e:
+        job.statut = 'ECHEC'
+        job.erreur = str(e)
+        job.finished_at = timezone.now()
+        logger.exception("Export %s en échec", job.pk)
+    job.save(update_fields=[
+        'statut', 'total_lignes', 'lignes_traitees', 'fichier', 'taille', 'erreur', 'finished_at', 'expire_le'
+    ])
+    return job
+
+
+def liberer_interrompus():
+    """Passe en échec les exports en cours depuis trop longtemps ; retourne leur nombre."""
+    return ExportJob.objects.filter(statut='EN_COURS', started_at__lt=limite_en_cours()).update(
+        statut='ECHEC',
+        erreur="Export interrompu (durée maximale dépassée).",
+        finished_at=timezone.now(),
+    )
+
+
+def purger_expires():
+    """Supprime les fichiers et les exports expirés ; retourne leur nombre."""
+    expires = ExportJob.objects.filter(statut='TERMINE', expire_le__lte=timezone.now())
+    nombre = 0
+    for job in expires.iterator():
+        if job.fichier:
+            job.fichier.delete(save=False)
+        job.delete()
+        nombre += 1
+    return nombre
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from exports_app.extraits import FORMATS, TABLES, extraire
+
+
+class Command(BaseCommand):
+    help = "Écrit les extraits décisionnels incrémentaux (CSV gzip ou msgpack), partitionnés par mois"
+
+    def add_arguments(self, parser):
+        parser.add_argument('dossier', help="Dossier de destination des partitions")
+        parser.add_argument('--table', action='append', choices=list(TABLES), help="Table à extraire (toutes par défaut)")
+        parser.add_argument('--format', default='csv', choices=list(FORMATS), help="Format des fichiers")
+        parser.add_argument('--complet', action='store_true', help="Ignore le filigrane et extrait toutes les lignes")
+
+    def handle(self, *args, **options):
+        for nom in options['table'] or list(TABLES):
+            debut = time.perf_counter()
+            try:
+                resultat = extraire(nom, options['dossier'], format=options['format'], complet=options['complet'])
+            except OSError as e:
+                raise CommandError(str(e))
+            for mois, lignes in resultat['partitions'].items():
+                self.stdout.write(f"  {nom} {mois} : {lignes} ligne(s)")
+            depuis = f"{resultat['depuis']:%Y-%m-%d %H:%M:%S}" if resultat['depuis'] else "l'origine"
+            self.stdout.write(self.style.SUCCESS(
+                f"{nom} : {sum(resultat['partitions'].values())} ligne(s) modifiée(s) depuis {depuis}, "
+                f"{len(resultat['fichiers'])} fichier(s) en {time.perf_counter() - debut:.2f} s"
+            ))
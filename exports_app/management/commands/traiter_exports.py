@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from exports_app.jobs import executer, liberer_interrompus, purger_expires
+from exports_app.models import ExportJob
+
+
+class Command(BaseCommand):
+    help = "Passe en échec les exports interrompus, exécute les exports en attente et supprime les fichiers expirés"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sans-purge', action='store_true', help="Ne supprime pas les exports expirés")
+
+    def handle(self, *args, **options):
+        interrompus = liberer_interrompus()
+        if interrompus:
+            self.stdout.write(self.style.WARNING(f"{interrompus} export(s) interrompu(s) passé(s) en échec"))
+        for job_id in ExportJob.objects.filter(statut='EN_ATTENTE').order_by('created_at').values_list('pk', flat=True):
+            job = executer(job_id)
+            if job:
+                self.stdout.write(f"Export #{job.pk} {job.ressource} ({job.format}) : {job.get_statut_display()}")
+        if not options['sans_purge']:
+            self.stdout.write(self.style.SUCCESS(f"{purger_expires()} export(s) expiré(s) supprimé(s)"))
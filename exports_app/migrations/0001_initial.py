@@ -0,0 +1,45 @@
+# Generated by Django 5.1.4 on 2026-10-18 22:57
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ressource', models.CharField(max_length=50, verbose_name='Ressource')),
+                ('vue', models.CharField(max_length=200, verbose_name="Vue d'export")),
+                ('format', models.CharField(choices=[('csv', 'CSV'), ('xlsx', 'Excel')], default='csv', max_length=10, verbose_name='Format')),
+                ('filtres', models.JSONField(blank=True, default=dict, verbose_name='Filtres')),
+                ('empreinte', models.CharField(db_index=True, max_length=64, verbose_name='Empreinte')),
+                ('statut', models.CharField(choices=[('EN_ATTENTE', 'En attente'), ('EN_COURS', 'En cours'), ('TERMINE', 'Terminé'), ('ECHEC', 'Échec')], default='EN_ATTENTE', max_length=20, verbose_name='Statut')),
+                ('total_lignes', models.PositiveIntegerField(blank=True, null=True, verbose_name='Nombre de lignes')),
+                ('lignes_traitees', models.PositiveIntegerField(default=0, verbose_name='Lignes traitées')),
+                ('fichier', models.FileField(blank=True, null=True, upload_to='exports/%Y/%m/', verbose_name='Fichier')),
+                ('taille', models.PositiveBigIntegerField(blank=True, null=True, verbose_name='Taille (octets)')),
+                ('erreur', models.TextField(blank=True, verbose_name='Erreur')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Demandé le')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Démarré le')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Terminé le')),
+                ('expire_le', models.DateTimeField(blank=True, null=True, verbose_name='Expire le')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exports', to=settings.AUTH_USER_MODEL, verbose_name='Demandé par')),
+            ],
+            options={
+                'verbose_name': 'Export',
+                'verbose_name_plural': 'Exports',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['empreinte', 'statut'], name='exports_app_emprein_80662b_idx'), models.Index(fields=['statut', 'expire_le'], name='exports_app_statut_3d21cc_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.4 on 2026-10-18 23:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exports_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FiligraneExtrait',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table', models.CharField(max_length=50, unique=True, verbose_name='Table')),
+                ('filigrane', models.DateTimeField(verbose_name="Extrait jusqu'au")),
+                ('lignes', models.PositiveIntegerField(default=0, verbose_name='Lignes du dernier extrait')),
+                ('extrait_le', models.DateTimeField(auto_now=True, verbose_name='Dernier extrait le')),
+            ],
+            options={
+                'verbose_name': "Filigrane d'extrait",
+                'verbose_name_plural': "Filigranes d'extraits",
+                'ordering': ['table'],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.4 on 2026-10-18 23:50
+
+import exports_app.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exports_app', '0002_filigraneextrait'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='exportjob',
+            name='fichier',
+            field=models.FileField(blank=True, null=True, storage=exports_app.models.stockage_exports, upload_to=exports_app.models.chemin_export, verbose_name='Fichier'),
+        ),
+    ]
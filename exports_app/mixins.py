@@ -0,0 +1,149 @@
+"""
+Export des listes des viewsets.
+
+``ExportMixin`` ajoute les actions ``export_csv`` et ``export_xlsx`` à un
+viewset déclarant ``export_columns`` : mêmes filtres que la liste
+(``filter_queryset``), réponse en flux (``StreamingHttpResponse``) écrite
+ligne à ligne.
+
+``ArchiveMixin`` ajoute l'action ``archive_zip`` : les fichiers joints de
+la liste filtrée, en une archive zip écrite en flux.
+"""
+import csv
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from .archives import TAILLE_MORCEAU, iter_zip
+from .columns import TAILLE_LOT, iter_lignes, resoudre_colonnes
+from .xlsx import iter_xlsx
+
+
+class _Tampon:
+    """Pseudo-fichier : ``csv.writer`` y écrit, la ligne est renvoyée telle quelle."""
+
+    def write(self, valeur):
+        return valeur
+
+
+# Viewsets exportables, par nom de ressource (export_filename)
+registre = {}
+
+
+class ExportMixin:
+    """
+    Attributs :
+        export_columns: liste de (libellé, chemin[, formateur]), voir
+            ``exports_app.columns``.
+        export_filename: nom du fichier sans extension (nom du modèle par
+            défaut) ; sert aussi de nom de ressource pour les exports en
+            arrière-plan.
+        export_chunk_size: taille des lots lus en base.
+    """
+    export_columns = None
+    export_filename = None
+    export_chunk_size = TAILLE_LOT
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.export_filename and cls.export_columns:
+            registre[cls.export_filename] = cls
+
+    def get_export_columns(self):
+        return resoudre_colonnes(self.get_queryset().model, self.export_columns)
+
+    def get_export_queryset(self):
+        return self.filter_queryset(self.get_queryset())
+
+    def get_export_filename(self, extension):
+        nom = self.export_filename or self.get_queryset().model._meta.model_name
+        return f"{nom}_{timezone.localdate():%Y%m%d}.{extension}"
+
+    def iter_export_rows(self, typees=False):
+        """En-tête puis lignes mises en forme (valeurs typées si ``typees``)."""
+        colonnes = self.get_export_columns()
+        yield [libelle for libelle, _chemin, _formateur in colonnes]
+        yield from iter_lignes(self.get_export_queryset(), colonnes, self.export_chunk_size, typees=typees)
+
+    @action(detail=False, methods=['get'])
+    def export_csv(self, request):
+        """Exporte la liste filtrée en CSV (flux)."""
+        writer = csv.writer(_Tampon())
+        response = StreamingHttpResponse(
+            (writer.writerow(ligne) for ligne in self.iter_export_rows()),
+            content_type='text/csv; charset=utf-8',
+        )
+        response['Content-Disposition'] = f'attachment; filename="{self.get_export_filename("csv")}"'
+        return response
+
+    @action(detail=False, methods=['get'])
+    def export_xlsx(self, request):
+        """Exporte la liste filtrée en classeur Excel (flux)."""
+        lignes = self.iter_export_rows(typees=True)
+        entetes = next(lignes)
+        response = StreamingHttpResponse(
+            iter_xlsx(entetes, lignes, nom_feuille=self.export_filename or 'Export'),
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        )
+        response['Content-Disposition'] = f'attachment; filename="{self.get_export_filename("xlsx")}"'
+        return response
+
+
+class ArchiveMixin:
+    """
+    Attributs :
+        archive_field: champ fichier archivé.
+        archive_name_field: champ donnant le nom des fichiers dans
+            l'archive (extension du fichier stocké ajoutée).
+        archive_filename: nom de l'archive sans extension
+            (``export_filename`` ou nom du modèle par défaut).
+        archive_max_files: nombre maximal de fichiers par archive.
+    """
+    archive_field = 'fichier'
+    archive_name_field = 'reference'
+    archive_filename = None
+    archive_max_files = 5000
+    archive_chunk_size = TAILLE_MORCEAU
+
+    def get_archive_queryset(self):
+        champ = self.archive_field
+        return (
+            self.filter_queryset(self.get_queryset())
+            .exclude(**{f'{champ}__isnull': True})
+            .exclude(**{champ: ''})
+        )
+
+    def get_archive_filename(self):
+        nom = (
+            self.archive_filename
+            or getattr(self, 'export_filename', None)
+            or self.get_queryset().model._meta.model_name
+        )
+        return f"{nom}_{timezone.localdate():%Y%m%d}.zip"
+
+    @action(detail=False, methods=['get'])
+    def archive_zip(self, request):
+        """Télécharge les fichiers de la liste filtrée en une archive zip (flux)."""
+        queryset = self.get_archive_queryset()
+        nombre = queryset.count()
+        if not nombre:
+            return Response({"detail": "Aucun fichier à archiver."}, status=status.HTTP_404_NOT_FOUND)
+        if nombre > self.archive_max_files:
+            return Response(
+                {"detail": f"{nombre} fichiers : affinez les filtres (maximum {self.archive_max_files})."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        stockage = queryset.model._meta.get_field(self.archive_field).storage
+        fichiers = queryset.values_list(self.archive_name_field, self.archive_field).iterator(
+            chunk_size=getattr(self, 'export_chunk_size', TAILLE_LOT)
+        )
+        response = StreamingHttpResponse(
+            iter_zip(fichiers, stockage, self.archive_chunk_size),
+            content_type='application/zip',
+        )
+        response['Content-Disposition'] = f'attachment; filename="{self.get_archive_filename()}"'
+        return response
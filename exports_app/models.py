@@ -0,0 +1,97 @@
+import secrets
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import models
+from django.utils import timezone
+
+
+def stockage_exports():
+    """Stockage privé des exports (``EXPORTS_ROOT``), sans URL publique."""
+    return FileSystemStorage(location=settings.EXPORTS_ROOT, base_url=None)
+
+
+def chemin_export(instance, filename):
+    """AAAA/MM/<jeton aléatoire>/<nom> : chemin impossible à deviner."""
+    return f"{timezone.now():%Y/%m}/{secrets.token_urlsafe(16)}/{filename}"
+
+
+class ExportJob(models.Model):
+    """
+    Export exécuté en arrière-plan (voir ``exports_app.jobs``).
+
+    Le fichier produit est conservé sous EXPORTS_ROOT jusqu'à
+    ``expire_le`` ; une demande identique (même utilisateur, ressource,
+    format et filtres) reçue avant cette date réutilise le même fichier.
+    """
+    STATUT_CHOICES = [
+        ('EN_ATTENTE', 'En attente'),
+        ('EN_COURS', 'En cours'),
+        ('TERMINE', 'Terminé'),
+        ('ECHEC', 'Échec'),
+    ]
+    FORMAT_CHOICES = [
+        ('csv', 'CSV'),
+        ('xlsx', 'Excel'),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='exports', verbose_name="Demandé par")
+    ressource = models.CharField(max_length=50, verbose_name="Ressource")
+    vue = models.CharField(max_length=200, verbose_name="Vue d'export")
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES, default='csv', verbose_name="Format")
+    filtres = models.JSONField(default=dict, blank=True, verbose_name="Filtres")
+    empreinte = models.CharField(max_length=64, db_index=True, verbose_name="Empreinte")
+
+    statut = models.CharField(max_length=20, choices=STATUT_CHOICES, default='EN_ATTENTE', verbose_name="Statut")
+    total_lignes = models.PositiveIntegerField(null=True, blank=True, verbose_name="Nombre de lignes")
+    lignes_traitees = models.PositiveIntegerField(default=0, verbose_name="Lignes traitées")
+    fichier = models.FileField(
+        upload_to=chemin_export, storage=stockage_exports, blank=True, null=True, verbose_name="Fichier"
+    )
+    taille = models.PositiveBigIntegerField(null=True, blank=True, verbose_name="Taille (octets)")
+    erreur = models.TextField(blank=True, verbose_name="Erreur")
+
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Demandé le")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Démarré le")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Terminé le")
+    expire_le = models.DateTimeField(null=True, blank=True, verbose_name="Expire le")
+
+    class Meta:
+        verbose_name = "Export"
+        verbose_name_plural = "Exports"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['empreinte', 'statut']),
+            models.Index(fields=['statut', 'expire_le']),
+        ]
+
+    def __str__(self):
+        return f"Export {self.ressource} ({self.format}) #{self.pk} - {self.get_statut_display()}"
+
+    @property
+    def progression(self):
+        """Avancement en pourcentage (None tant que le total est inconnu)."""
+        if self.statut == 'TERMINE':
+            return 100
+        if not self.total_lignes:
+            return None
+        return min(int(self.lignes_traitees * 100 / self.total_lignes), 99)
+
+
+class FiligraneExtrait(models.Model):
+    """
+    Filigrane des extraits décisionnels (voir ``exports_app.extraits``) :
+    date de modification jusqu'à laquelle une table a déjà été extraite.
+    """
+    table = models.CharField(max_length=50, unique=True, verbose_name="Table")
+    filigrane = models.DateTimeField(verbose_name="Extrait jusqu'au")
+    lignes = models.PositiveIntegerField(default=0, verbose_name="Lignes du dernier extrait")
+    extrait_le = models.DateTimeField(auto_now=True, verbose_name="Dernier extrait le")
+
+    class Meta:
+        verbose_name = "Filigrane d'extrait"
+        verbose_name_plural = "Filigranes d'extraits"
+        ordering = ['table']
+
+    def __str__(self):
+        return f"{self.table} : {self.filigrane:%Y-%m-%d %H:%M:%S}"
@@ -0,0 +1,23 @@
+from rest_framework import serializers
+
+from .models import ExportJob
+
+
+class ExportJobSerializer(serializers.ModelSerializer):
+    statut_display = serializers.CharField(source='get_statut_display', read_only=True)
+    progression = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = ExportJob
+        fields = [
+            'id', 'ressource', 'format', 'filtres', 'statut', 'statut_display', 'progression',
+            'total_lignes', 'lignes_traitees', 'taille', 'erreur',
+            'created_at', 'started_at', 'finished_at', 'expire_le',
+        ]
+        read_only_fields = fields
+
+
+class ExportJobCreateSerializer(serializers.Serializer):
+    ressource = serializers.CharField()
+    format = serializers.ChoiceField(choices=ExportJob.FORMAT_CHOICES, default='csv')
+    filtres = serializers.DictField(required=False, default=dict)
@@ -0,0 +1,14 @@
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+
+from .views import ExportJobViewSet, ExtraitViewSet
+
+router = DefaultRouter()
+router.register(r'exports', ExportJobViewSet)
+router.register(r'extraits', ExtraitViewSet, basename='extrait')
+
+app_name = 'exports_api'
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
@@ -0,0 +1,163 @@
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+
+from . import extraits, jobs
+from .mixins import registre
+from .models import ExportJob, FiligraneExtrait
+from .serializers import ExportJobCreateSerializer, ExportJobSerializer
+
+
+class ExportJobViewSet(mixins.CreateModelMixin,
+                       mixins.ListModelMixin,
+                       mixins.RetrieveModelMixin,
+                       mixins.DestroyModelMixin,
+                       viewsets.GenericViewSet):
+    """
+    Exports en arrière-plan de l'utilisateur connecté.
+
+    POST {ressource, format, filtres} crée l'export (201) ou renvoie un
+    export identique encore valide (200) ; GET sur l'export donne
+    l'avancement ; ``telecharger`` renvoie le fichier une fois terminé.
+    """
+    queryset = ExportJob.objects.all()
+    serializer_class = ExportJobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return super().get_queryset().filter(user=self.request.user)
+
+    def get_serializer_class(self):
+        if self.action == 'create':
+            return ExportJobCreateSerializer
+        return ExportJobSerializer
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            job, cree = jobs.demander(request.user, **serializer.validated_data)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(
+            ExportJobSerializer(job).data,
+            status=status.HTTP_201_CREATED if cree else status.HTTP_200_OK,
+        )
+
+    def perform_destroy(self, instance):
+        if instance.fichier:
+            instance.fichier.delete(save=False)
+        instance.delete()
+
+    @action(detail=False, methods=['get'])
+    def ressources(self, request):
+        """Ressources exportables."""
+        return Response(sorted(registre))
+
+    @action(detail=True, methods=['get'])
+    def telecharger(self, request, pk=None):
+        """Télécharge le fichier d'un export terminé."""
+        job = self.get_object()
+        if job.statut != 'TERMINE' or not job.fichier:
+            return Response(
+                {"detail": f"Export non disponible ({job.get_statut_display()})."},
+                status=status.HTTP_409_CONFLICT,
+            )
+        return FileResponse(job.fichier.open('rb'), as_attachment=True, filename=job.fichier.name.rsplit('/', 1)[-1])
+
+
+def _date_heure(valeur, nom):
+    """
+    Raises:
+        ValueError: date-heure ISO 8601 invalide.
+    """
+    date = parse_datetime(valeur)
+    if date is None:
+        raise ValueError(f"{nom} doit être une date-heure ISO 8601.")
+    return timezone.make_aware(date) if timezone.is_naive(date) else date
+
+
+class ExtraitViewSet(viewsets.ViewSet):
+    """
+    Extraits décisionnels (voir ``exports_app.extraits``).
+
+    GET sur une table renvoie en flux les lignes modifiées depuis son
+    filigrane (``depuis`` pour une autre date, ``complet=1`` pour tout),
+    jusqu'à ``jusqu_a`` (par défaut la borne courante, renvoyée dans
+    l'en-tête ``X-Extrait-Borne``), limitées au mois ``mois`` (AAAA-MM) si
+    indiqué, en csv gzip ou msgpack (``type`` : ``format`` est réservé à la
+    négociation de contenu de DRF). ``partitions`` liste les
+    mois à extraire ; ``avancer`` enregistre le filigrane une fois toutes
+    les partitions chargées.
+    """
+    permission_classes = [IsAdminUser]
+    lookup_value_regex = '[a-z_]+'
+
+    def _bornes(self, request, nom):
+        parametres = request.query_params
+        depuis = None
+        if parametres.get('depuis'):
+            depuis = _date_heure(parametres['depuis'], 'depuis')
+        elif parametres.get('complet') not in ('1', 'true'):
+            depuis = extraits.filigrane(nom)
+        jusqu_a = _date_heure(parametres['jusqu_a'], 'jusqu_a') if parametres.get('jusqu_a') else extraits.borne()
+        return depuis, jusqu_a
+
+    def list(self, request):
+        filigranes = {f.table: f for f in FiligraneExtrait.objects.all()}
+        return Response([
+            {
+                'table': nom,
+                'colonnes': extraits.colonnes(nom),
+                'filigrane': filigranes[nom].filigrane if nom in filigranes else None,
+                'lignes': filigranes[nom].lignes if nom in filigranes else None,
+                'extrait_le': filigranes[nom].extrait_le if nom in filigranes else None,
+            }
+            for nom in extraits.TABLES
+        ])
+
+    def retrieve(self, request, pk=None):
+        format = request.query_params.get('type', 'csv')
+        try:
+            extraits.table(pk)
+            depuis, jusqu_a = self._bornes(request, pk)
+            periode = extraits.mois(request.query_params['mois']) if request.query_params.get('mois') else None
+            contenu = extraits.iter_extrait(pk, format, depuis, jusqu_a, periode)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        _generateur, extension, type_mime = extraits.FORMATS[format]
+        suffixe = f"_{request.query_params['mois']}" if periode else ''
+        response = StreamingHttpResponse(contenu, content_type=type_mime)
+        response['Content-Disposition'] = (
+            f'attachment; filename="{pk}{suffixe}_{jusqu_a:%Y%m%dT%H%M%S}.{extension}"'
+        )
+        response['X-Extrait-Borne'] = jusqu_a.isoformat()
+        return response
+
+    @action(detail=True, methods=['get'])
+    def partitions(self, request, pk=None):
+        """Mois ayant des lignes à extraire entre le filigrane et la borne."""
+        try:
+            depuis, jusqu_a = self._bornes(request, pk)
+            partitions = extraits.partitions(pk, depuis, jusqu_a)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'table': pk, 'depuis': depuis, 'jusqu_a': jusqu_a, 'partitions': partitions})
+
+    @action(detail=True, methods=['post'])
+    def avancer(self, request, pk=None):
+        """Enregistre le filigrane : POST {jusqu_a} (borne de l'extrait chargé)."""
+        try:
+            extraits.table(pk)
+            jusqu_a = _date_heure(str(request.data.get('jusqu_a') or ''), 'jusqu_a')
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if jusqu_a > timezone.now():
+            return Response({"detail": "jusqu_a ne peut pas être dans le futur."}, status=status.HTTP_400_BAD_REQUEST)
+        extraits.avancer(pk, jusqu_a)
+        return Response({'table': pk, 'filigrane': jusqu_a})
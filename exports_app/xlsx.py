@@ -0,0 +1,398 @@
+"""
+Écriture et lecture XLSX en flux.
+
+Le classeur (une feuille) est écrit directement dans une archive zip à
+mesure que les lignes arrivent : le XML de la feuille est compressé au fil
+de l'eau et les octets produits sont rendus par lots, sans table de
+chaînes partagées (cellules ``inlineStr``). La mémoire reste constante
+quel que soit le nombre de lignes.
+
+Types de cellules : nombres (int, float, Decimal), dates et dates-heures
+(numéros de série Excel, format JJ/MM/AAAA), booléens et texte. La ligne
+d'en-tête est en gras, figée, avec un filtre automatique.
+
+``iter_xlsx_rows`` lit la première feuille d'un classeur ligne par ligne
+(``iterparse``), pour les imports.
+"""
+import re
+import zipfile
+import zlib
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from xml.etree.ElementTree import ParseError, iterparse
+from xml.sax.saxutils import escape
+
+from django.utils import timezone
+
+TAILLE_TAMPON = 64 * 1024
+LIGNES_PAR_ECRITURE = 500
+
+EPOQUE = datetime(1899, 12, 30)
+
+# Index des styles déclarés dans STYLES (cellXfs)
+STYLE_DATE = 1
+STYLE_DATETIME = 2
+STYLE_ENTETE = 3
+STYLE_DECIMAL = 4
+
+CARACTERES_INTERDITS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+CARACTERES_INTERDITS_FEUILLE = re.compile(r"[\[\]:*?/\\'\"<>&]")
+
+CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+
+RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{nom}" sheetId="1" r:id="rId1"/></sheets>'
+    '{noms_definis}'
+    '</workbook>'
+)
+
+WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+
+STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<numFmts count="2">'
+    '<numFmt numFmtId="164" formatCode="dd/mm/yyyy"/>'
+    '<numFmt numFmtId="165" formatCode="dd/mm/yyyy hh:mm"/>'
+    '</numFmts>'
+    '<fonts count="2">'
+    '<font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><color rgb="FFFFFFFF"/><name val="Calibri"/></font>'
+    '</fonts>'
+    '<fills count="3">'
+    '<fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill>'
+    '<fill><patternFill patternType="solid"><fgColor rgb="FF1F4E78"/><bgColor indexed="64"/></patternFill></fill>'
+    '</fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="5">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="165" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="0" fontId="1" fillId="2" borderId="0" xfId="0" applyFont="1" applyFill="1"/>'
+    '<xf numFmtId="4" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '</cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+DEBUT_FEUILLE = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheetViews><sheetView workbookViewId="0">'
+    '<pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/>'
+    '</sheetView></sheetViews>'
+)
+
+
+class _Tampon:
+    """Flux d'écriture non positionnable dont on récupère le contenu par morceaux."""
+
+    def __init__(self):
+        self.morceaux = []
+        self.taille = 0
+
+    def write(self, donnees):
+        self.morceaux.append(bytes(donnees))
+        self.taille += len(donnees)
+        return len(donnees)
+
+    def flush(self):
+        pass
+
+    def vider(self):
+        donnees = b''.join(self.morceaux)
+        self.morceaux, self.taille = [], 0
+        return donnees
+
+
+def lettre_colonne(indice):
+    """0 -> A, 25 -> Z, 26 -> AA…"""
+    lettres = ''
+    indice += 1
+    while indice:
+        indice, reste = divmod(indice - 1, 26)
+        lettres = chr(65 + reste) + lettres
+    return lettres
+
+
+def _texte(valeur):
+    return escape(CARACTERES_INTERDITS.sub('', str(valeur)))
+
+
+def _serie(valeur):
+    """Numéro de série Excel d'une date ou date-heure (heure locale)."""
+    if isinstance(valeur, datetime):
+        if timezone.is_aware(valeur):
+            valeur = timezone.make_naive(valeur)
+        return (valeur - EPOQUE).total_seconds() / 86400
+    return float((valeur - EPOQUE.date()).days)
+
+
+def _cellule_booleen(reference, valeur):
+    return f'<c r="{reference}" t="b"><v>{int(valeur)}</v></c>'
+
+
+def _cellule_decimal(reference, valeur):
+    return f'<c r="{reference}" s="{STYLE_DECIMAL}"><v>{valeur:f}</v></c>'
+
+
+def _cellule_nombre(reference, valeur):
+    return f'<c r="{reference}"><v>{valeur!r}</v></c>'
+
+
+def _cellule_datetime(reference, valeur):
+    return f'<c r="{reference}" s="{STYLE_DATETIME}"><v>{_serie(valeur)!r}</v></c>'
+
+
+def _cellule_date(reference, valeur):
+    return f'<c r="{reference}" s="{STYLE_DATE}"><v>{_serie(valeur)!r}</v></c>'
+
+
+def _cellule_texte(reference, valeur):
+    return f'<c r="{reference}" t="inlineStr"><is><t xml:space="preserve">{_texte(valeur)}</t></is></c>'
+
+
+# Dispatch par type exact ; les sous-classes passent par _ecrivain()
+ECRIVAINS = {
+    bool: _cellule_booleen,
+    Decimal: _cellule_decimal,
+    int: _cellule_nombre,
+    float: _cellule_nombre,
+    datetime: _cellule_datetime,
+    date: _cellule_date,
+    str: _cellule_texte,
+}
+
+
+def _ecrivain(valeur):
+    for type_, ecrivain in ECRIVAINS.items():
+        if isinstance(valeur, type_):
+            return ecrivain
+    return _cellule_texte
+
+
+def cellule(reference, valeur):
+    """XML d'une cellule typée selon ``valeur``."""
+    if valeur is None or valeur == '':
+        return ''
+    ecrivain = ECRIVAINS.get(type(valeur)) or _ecrivain(valeur)
+    return ecrivain(reference, valeur)
+
+
+def iter_xlsx(entetes, lignes, nom_feuille='Export', taille_tampon=TAILLE_TAMPON):
+    """
+    Génère les octets d'un classeur XLSX d'une feuille.
+
+    Args:
+        entetes (list[str]): libellés de la ligne d'en-tête.
+        lignes (iterable): lignes de valeurs typées (Decimal, date, texte…).
+    """
+    nom_feuille = CARACTERES_INTERDITS_FEUILLE.sub('', CARACTERES_INTERDITS.sub('', nom_feuille))[:31] or 'Export'
+    lettres = [lettre_colonne(i) for i in range(len(entetes))]
+    tampon = _Tampon()
+
+    with zipfile.ZipFile(tampon, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', CONTENT_TYPES)
+        archive.writestr('_rels/.rels', RELS)
+        archive.writestr('xl/_rels/workbook.xml.rels', WORKBOOK_RELS)
+        archive.writestr('xl/styles.xml', STYLES)
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as feuille:
+            largeurs = ''.join(
+                f'<col min="{i}" max="{i}" width="{min(max(len(entete) + 4, 12), 50)}" customWidth="1"/>'
+                for i, entete in enumerate(entetes, start=1)
+            )
+            feuille.write((DEBUT_FEUILLE + f'<cols>{largeurs}</cols><sheetData>').encode())
+            feuille.write((
+                '<row r="1">'
+                + ''.join(
+                    f'<c r="{lettre}1" t="inlineStr" s="{STYLE_ENTETE}"><is><t>{_texte(entete)}</t></is></c>'
+                    for lettre, entete in zip(lettres, entetes)
+                )
+                + '</row>'
+            ).encode())
+
+            numero = 1
+            lot = []
+            for ligne in lignes:
+                numero += 1
+                lot.append(
+                    f'<row r="{numero}">'
+                    + ''.join([cellule(f'{lettre}{numero}', valeur) for lettre, valeur in zip(lettres, ligne)])
+                    + '</row>'
+                )
+                if len(lot) >= LIGNES_PAR_ECRITURE:
+                    feuille.write(''.join(lot).encode())
+                    lot = []
+                    if tampon.taille >= taille_tampon:
+                        yield tampon.vider()
+            feuille.write(''.join(lot).encode())
+
+            plage = f'A1:{lettres[-1] if lettres else "A"}{numero}'
+            feuille.write(f'</sheetData><autoFilter ref="{plage}"/></worksheet>'.encode())
+
+        noms_definis = (
+            '<definedNames><definedName name="_xlnm._FilterDatabase" localSheetId="0" hidden="1">'
+            f"'{nom_feuille}'!{_plage_absolue(plage)}"
+            '</definedName></definedNames>'
+        )
+        archive.writestr('xl/workbook.xml', WORKBOOK.format(nom=nom_feuille, noms_definis=noms_definis))
+    yield tampon.vider()
+
+
+def _plage_absolue(plage):
+    """A1:H42 -> $A$1:$H$42"""
+    return ':'.join(re.sub(r'([A-Z]+)(\d+)', r'$\1$\2', partie) for partie in plage.split(':'))
+
+
+# ---------------------------------------------------------------------------
+# Lecture
+# ---------------------------------------------------------------------------
+
+NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+NS_REL = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+REFERENCE = re.compile(r'([A-Z]+)')
+
+
+def indice_colonne(reference):
+    """A1 -> 0, AB12 -> 27"""
+    indice = 0
+    for lettre in REFERENCE.match(reference).group(1):
+        indice = indice * 26 + ord(lettre) - 64
+    return indice - 1
+
+
+def _chaines_partagees(archive):
+    if 'xl/sharedStrings.xml' not in archive.namelist():
+        return []
+    chaines = []
+    with archive.open('xl/sharedStrings.xml') as flux:
+        for _evenement, element in iterparse(flux):
+            if element.tag == f'{NS}si':
+                chaines.append(''.join(texte.text or '' for texte in element.iter(f'{NS}t')))
+                element.clear()
+    return chaines
+
+
+def _premiere_feuille(archive):
+    """Chemin de la première feuille déclarée dans le classeur."""
+    try:
+        with archive.open('xl/workbook.xml') as flux:
+            feuille = next(e for _ev, e in iterparse(flux) if e.tag == f'{NS}sheet')
+            identifiant = feuille.get(f'{NS_REL}id')
+        with archive.open('xl/_rels/workbook.xml.rels') as flux:
+            for _ev, relation in iterparse(flux):
+                if relation.get('Id') == identifiant:
+                    cible = relation.get('Target').lstrip('/')
+                    return cible if cible.startswith('xl/') else f'xl/{cible}'
+    except (KeyError, StopIteration):
+        pass
+    return 'xl/worksheets/sheet1.xml'
+
+
+def _valeur(cellule, chaines):
+    type_ = cellule.get('t')
+    if type_ == 'inlineStr':
+        return ''.join(texte.text or '' for texte in cellule.iter(f'{NS}t'))
+    brut = cellule.findtext(f'{NS}v')
+    if brut is None or type_ == 'e':
+        return None
+    if type_ == 's':
+        return chaines[int(brut)]
+    if type_ == 'b':
+        return brut == '1'
+    if type_ in ('str', 'd'):
+        return brut
+    nombre = float(brut)
+    return int(nombre) if nombre.is_integer() else nombre
+
+
+def iter_xlsx_rows(fichier, numeros=False):
+    """
+    Lignes (listes de valeurs) de la première feuille de ``fichier``.
+
+    Les textes sont rendus en ``str``, les nombres en ``int``/``float`` (les
+    dates restent des numéros de série, voir ``date_depuis_serie``), les
+    cellules vides en None. Les lignes traitées sont libérées au fil de la
+    lecture.
+
+    Avec ``numeros``, rend des couples ``(numéro, ligne)`` : numéro de la
+    ligne dans la feuille (attribut ``r``), les lignes vides n'étant pas
+    enregistrées par Excel.
+
+    Raises:
+        ValueError: fichier qui n'est pas un classeur XLSX lisible.
+    """
+    try:
+        yield from _lignes_xlsx(fichier, numeros)
+    except (zipfile.BadZipFile, zlib.error, EOFError, NotImplementedError, KeyError, IndexError, ParseError) as e:
+        raise ValueError(f"Classeur XLSX illisible ou corrompu ({e.__class__.__name__}).") from e
+
+
+def _lignes_xlsx(fichier, numeros):
+    with zipfile.ZipFile(fichier) as archive:
+        chaines = _chaines_partagees(archive)
+        with archive.open(_premiere_feuille(archive)) as flux:
+            donnees = None
+            numero = 0
+            for evenement, element in iterparse(flux, events=('start', 'end')):
+                if evenement == 'start':
+                    if element.tag == f'{NS}sheetData':
+                        donnees = element
+                    continue
+                if element.tag != f'{NS}row':
+                    continue
+                ligne = []
+                for cellule in element.iter(f'{NS}c'):
+                    reference = cellule.get('r')
+                    indice = indice_colonne(reference) if reference else len(ligne)
+                    ligne.extend([None] * (indice - len(ligne)))
+                    ligne.append(_valeur(cellule, chaines))
+                numero = int(element.get('r') or numero + 1)
+                yield (numero, ligne) if numeros else ligne
+                element.clear()
+                if donnees is not None:
+                    donnees.clear()
+
+
+def date_depuis_serie(serie):
+    """Numéro de série Excel -> date (ou datetime s'il porte une heure)."""
+    valeur = EPOQUE + timedelta(days=serie)
+    return valeur.date() if valeur.time() == datetime.min.time() else valeur
@@ -0,0 +1,23 @@
+from analytics_app.pivot import annee, mois, register, trimestre
+
+from .models import Facture
+
+register(
+    'factures', Facture,
+    champ_date='date_creation',
+    dimensions={
+        'statut': 'statut',
+        'entity': 'affaire__offre__entity__code',
+        'client': 'affaire__offre__client__nom',
+        'produit': 'affaire__offre__produit_principal__code',
+        'responsable': 'affaire__responsable__username',
+        'mois': mois('date_creation'),
+        'trimestre': trimestre('date_creation'),
+        'annee': annee('date_creation'),
+    },
+    mesures={
+        'montant_ht': 'montant_ht',
+        'montant_ttc': 'montant_ttc',
+        'montant_paye': 'montant_paye',
+    },
+)
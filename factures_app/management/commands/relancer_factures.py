@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from factures_app.relances import lancer_relances
+
+
+class Command(BaseCommand):
+    help = "Relance les factures échues, regroupées par contact client"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--jours-retard-min', type=int, default=1, help="Retard minimum (en jours) pour relancer")
+        parser.add_argument('--intervalle', type=int, default=7, help="Délai minimum (en jours) entre deux relances d'une facture")
+        parser.add_argument('--date', help="Date de référence (AAAA-MM-JJ), aujourd'hui par défaut")
+        parser.add_argument('--simulation', action='store_true', help="Affiche les relances sans les enregistrer")
+
+    def handle(self, *args, **options):
+        date_reference = None
+        if options['date']:
+            date_reference = parse_date(options['date'])
+            if date_reference is None:
+                raise CommandError(f"Date invalide : {options['date']}")
+
+        lot, destinataires = lancer_relances(
+            date_reference=date_reference,
+            jours_retard_min=options['jours_retard_min'],
+            intervalle=options['intervalle'],
+            simulation=options['simulation'],
+        )
+        for groupe in destinataires:
+            self.stdout.write(
+                f"{groupe['client_nom']:<40} contact={groupe['contact'] or '-':<6} "
+                f"niveau={groupe['niveau']} {len(groupe['factures'])} facture(s) {groupe['solde']:>14}"
+            )
+        if lot:
+            self.stdout.write(self.style.SUCCESS(
+                f"Lot #{lot.pk} : {lot.nombre_factures} facture(s), {lot.nombre_destinataires} destinataire(s), {lot.montant_total}"
+            ))
+        else:
+            self.stdout.write(f"Aucune relance enregistrée ({len(destinataires)} destinataire(s))")
@@ -0,0 +1,84 @@
+# Generated by Django 5.1.4 on 2026-10-18 22:41
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('affaires_app', '0005_alter_affaire_montant_facture_and_more'),
+        ('client', '0014_alter_categorie_nom'),
+        ('factures_app', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LotRelance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date_reference', models.DateField(verbose_name='Date de référence')),
+                ('jours_retard_min', models.PositiveIntegerField(default=1, verbose_name='Retard minimum (jours)')),
+                ('nombre_factures', models.PositiveIntegerField(default=0, verbose_name='Nombre de factures')),
+                ('nombre_destinataires', models.PositiveIntegerField(default=0, verbose_name='Nombre de destinataires')),
+                ('montant_total', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=18, verbose_name='Montant relancé')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Date de lancement')),
+            ],
+            options={
+                'verbose_name': 'Lot de relances',
+                'verbose_name_plural': 'Lots de relances',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='RelanceFacture',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('niveau', models.PositiveSmallIntegerField(default=1, verbose_name='Niveau de relance')),
+                ('jours_retard', models.PositiveIntegerField(verbose_name='Jours de retard')),
+                ('solde', models.DecimalField(decimal_places=2, max_digits=15, verbose_name='Solde relancé')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Date de relance')),
+            ],
+            options={
+                'verbose_name': 'Relance de facture',
+                'verbose_name_plural': 'Relances de factures',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='facture',
+            index=models.Index(fields=['statut', 'date_echeance'], name='factures_ap_statut_b9d3eb_idx'),
+        ),
+        migrations.AddField(
+            model_name='lotrelance',
+            name='created_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='lots_relance', to=settings.AUTH_USER_MODEL, verbose_name='Lancé par'),
+        ),
+        migrations.AddField(
+            model_name='relancefacture',
+            name='client',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='relances_factures', to='client.client', verbose_name='Client'),
+        ),
+        migrations.AddField(
+            model_name='relancefacture',
+            name='contact',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='relances_factures', to='client.contact', verbose_name='Contact'),
+        ),
+        migrations.AddField(
+            model_name='relancefacture',
+            name='facture',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='relances', to='factures_app.facture', verbose_name='Facture'),
+        ),
+        migrations.AddField(
+            model_name='relancefacture',
+            name='lot',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='relances', to='factures_app.lotrelance', verbose_name='Lot'),
+        ),
+        migrations.AddIndex(
+            model_name='relancefacture',
+            index=models.Index(fields=['facture', 'created_at'], name='factures_ap_facture_38fc36_idx'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.1.4 on 2026-10-18 23:14
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('factures_app', '0002_lotrelance_relancefacture_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReleveBancaire',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nom_fichier', models.CharField(max_length=255, verbose_name='Fichier')),
+                ('compte', models.CharField(blank=True, max_length=100, verbose_name='Compte')),
+                ('nombre_lignes', models.PositiveIntegerField(default=0, verbose_name='Lignes importées')),
+                ('nombre_rapprochees', models.PositiveIntegerField(default=0, verbose_name='Lignes rapprochées')),
+                ('nombre_a_verifier', models.PositiveIntegerField(default=0, verbose_name='Lignes à vérifier')),
+                ('montant_total', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=18, verbose_name='Montant total')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name="Date d'import")),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='releves_bancaires', to=settings.AUTH_USER_MODEL, verbose_name='Importé par')),
+            ],
+            options={
+                'verbose_name': 'Relevé bancaire',
+                'verbose_name_plural': 'Relevés bancaires',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='LigneReleve',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date_operation', models.DateField(verbose_name="Date d'opération")),
+                ('libelle', models.CharField(blank=True, max_length=255, verbose_name='Libellé')),
+                ('reference_banque', models.CharField(blank=True, max_length=100, verbose_name='Référence bancaire')),
+                ('montant', models.DecimalField(decimal_places=2, max_digits=15, verbose_name='Montant')),
+                ('empreinte', models.CharField(max_length=64, unique=True, verbose_name='Empreinte')),
+                ('statut', models.CharField(choices=[('NON_RAPPROCHEE', 'Non rapprochée'), ('A_VERIFIER', 'À vérifier'), ('RAPPROCHEE', 'Rapprochée'), ('IGNOREE', 'Ignorée')], default='NON_RAPPROCHEE', max_length=20, verbose_name='Statut')),
+                ('motif', models.CharField(blank=True, max_length=100, verbose_name='Motif du rapprochement')),
+                ('candidats', models.JSONField(blank=True, default=list, verbose_name='Factures candidates')),
+                ('traite_le', models.DateTimeField(blank=True, null=True, verbose_name='Traité le')),
+                ('facture', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='lignes_releve', to='factures_app.facture', verbose_name='Facture')),
+                ('traite_par', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='lignes_releve_traitees', to=settings.AUTH_USER_MODEL, verbose_name='Traité par')),
+                ('releve', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lignes', to='factures_app.relevebancaire', verbose_name='Relevé')),
+            ],
+            options={
+                'verbose_name': 'Ligne de relevé',
+                'verbose_name_plural': 'Lignes de relevé',
+                'ordering': ['date_operation', 'pk'],
+                'indexes': [models.Index(fields=['statut', 'date_operation'], name='factures_ap_statut_04827a_idx')],
+            },
+        ),
+    ]
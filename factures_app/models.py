@@ -48,6 +48,10 @@ class Facture(models.Model):
         verbose_name = "Facture"
         verbose_name_plural = "Factures"
         ordering = ['-date_creation']
+        indexes = [
+            # Sélection des factures échues (balance âgée, relances)
+            models.Index(fields=['statut', 'date_echeance']),
+        ]
     
     def __str__(self):
         return self.reference or f"Facture #{self.pk}"
@@ -145,4 +149,100 @@ class Facture(models.Model):
         """Vérifie si la facture est en retard de paiement"""
         if not self.date_echeance or self.statut in ['PAYEE', 'ANNULEE']:
             return False
-        return now() > self.date_echeance and self.statut not in ['PAYEE', 'ANNULEE']
\ No newline at end of file
+        return now() > self.date_echeance and self.statut not in ['PAYEE', 'ANNULEE']
+
+
+class LotRelance(models.Model):
+    """Exécution d'une campagne de relance des factures échues."""
+    date_reference = models.DateField(verbose_name="Date de référence")
+    jours_retard_min = models.PositiveIntegerField(default=1, verbose_name="Retard minimum (jours)")
+    nombre_factures = models.PositiveIntegerField(default=0, verbose_name="Nombre de factures")
+    nombre_destinataires = models.PositiveIntegerField(default=0, verbose_name="Nombre de destinataires")
+    montant_total = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal('0'), verbose_name="Montant relancé")
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, blank=True, null=True, related_name='lots_relance', verbose_name="Lancé par")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Date de lancement")
+
+    class Meta:
+        verbose_name = "Lot de relances"
+        verbose_name_plural = "Lots de relances"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Relances du {self.date_reference} ({self.nombre_factures} factures)"
+
+
+class RelanceFacture(models.Model):
+    """Relance d'une facture échue, adressée au contact client de l'offre."""
+    lot = models.ForeignKey(LotRelance, on_delete=models.CASCADE, related_name='relances', verbose_name="Lot")
+    facture = models.ForeignKey(Facture, on_delete=models.CASCADE, related_name='relances', verbose_name="Facture")
+    client = models.ForeignKey('client.Client', on_delete=models.CASCADE, related_name='relances_factures', verbose_name="Client")
+    contact = models.ForeignKey('client.Contact', on_delete=models.SET_NULL, blank=True, null=True, related_name='relances_factures', verbose_name="Contact")
+    niveau = models.PositiveSmallIntegerField(default=1, verbose_name="Niveau de relance")
+    jours_retard = models.PositiveIntegerField(verbose_name="Jours de retard")
+    solde = models.DecimalField(max_digits=15, decimal_places=2, verbose_name="Solde relancé")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Date de relance")
+
+    class Meta:
+        verbose_name = "Relance de facture"
+        verbose_name_plural = "Relances de factures"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['facture', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"Relance {self.niveau} de {self.facture}"
+
+
+class ReleveBancaire(models.Model):
+    """Relevé bancaire importé pour le rapprochement des paiements (voir ``factures_app.rapprochement``)."""
+    nom_fichier = models.CharField(max_length=255, verbose_name="Fichier")
+    compte = models.CharField(max_length=100, blank=True, verbose_name="Compte")
+    nombre_lignes = models.PositiveIntegerField(default=0, verbose_name="Lignes importées")
+    nombre_rapprochees = models.PositiveIntegerField(default=0, verbose_name="Lignes rapprochées")
+    nombre_a_verifier = models.PositiveIntegerField(default=0, verbose_name="Lignes à vérifier")
+    montant_total = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal('0'), verbose_name="Montant total")
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, blank=True, null=True, related_name='releves_bancaires', verbose_name="Importé par")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Date d'import")
+
+    class Meta:
+        verbose_name = "Relevé bancaire"
+        verbose_name_plural = "Relevés bancaires"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.nom_fichier} ({self.nombre_lignes} lignes)"
+
+
+class LigneReleve(models.Model):
+    """Encaissement d'un relevé bancaire et son rapprochement avec une facture."""
+    STATUT_CHOICES = (
+        ('NON_RAPPROCHEE', 'Non rapprochée'),
+        ('A_VERIFIER', 'À vérifier'),
+        ('RAPPROCHEE', 'Rapprochée'),
+        ('IGNOREE', 'Ignorée'),
+    )
+
+    releve = models.ForeignKey(ReleveBancaire, on_delete=models.CASCADE, related_name='lignes', verbose_name="Relevé")
+    date_operation = models.DateField(verbose_name="Date d'opération")
+    libelle = models.CharField(max_length=255, blank=True, verbose_name="Libellé")
+    reference_banque = models.CharField(max_length=100, blank=True, verbose_name="Référence bancaire")
+    montant = models.DecimalField(max_digits=15, decimal_places=2, verbose_name="Montant")
+    empreinte = models.CharField(max_length=64, unique=True, verbose_name="Empreinte")
+    statut = models.CharField(max_length=20, choices=STATUT_CHOICES, default='NON_RAPPROCHEE', verbose_name="Statut")
+    facture = models.ForeignKey(Facture, on_delete=models.SET_NULL, blank=True, null=True, related_name='lignes_releve', verbose_name="Facture")
+    motif = models.CharField(max_length=100, blank=True, verbose_name="Motif du rapprochement")
+    candidats = models.JSONField(default=list, blank=True, verbose_name="Factures candidates")
+    traite_par = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, blank=True, null=True, related_name='lignes_releve_traitees', verbose_name="Traité par")
+    traite_le = models.DateTimeField(blank=True, null=True, verbose_name="Traité le")
+
+    class Meta:
+        verbose_name = "Ligne de relevé"
+        verbose_name_plural = "Lignes de relevé"
+        ordering = ['date_operation', 'pk']
+        indexes = [
+            models.Index(fields=['statut', 'date_operation']),
+        ]
+
+    def __str__(self):
+        return f"{self.date_operation} {self.libelle} {self.montant}"
\ No newline at end of file
@@ -0,0 +1,399 @@
+"""
+Import des relevés bancaires et rapprochement avec les factures ouvertes.
+
+Le relevé (CSV / XLSX à colonnes date, libellé, montant ou crédit/débit,
+ou OFX) est lu en entier ; seuls les crédits sont conservés et une empreinte
+par ligne évite de réimporter deux fois le même encaissement.
+
+Les factures ouvertes sont chargées une fois et indexées dans des
+dictionnaires :
+
+- par solde exact (TTC - déjà payé) ;
+- par jeton de référence : référence de la facture et de l'affaire
+  (sans séparateurs), numéro client (``c_num``), code d'entité ;
+- par nom de client normalisé.
+
+Chaque libellé est découpé en jetons (et n-grammes de mots pour les noms)
+puis résolu par simples recherches dans ces index, sans boucle sur les
+factures. Un rapprochement est sûr lorsqu'une seule facture correspond à
+la référence citée et au montant, ou au client et au montant : ces lignes
+sont appliquées en masse (``bulk_update`` des factures). Les cas ambigus
+(plusieurs candidates, paiement partiel, montant seul) passent « à
+vérifier » avec leurs factures candidates.
+
+``bulk_update`` ne déclenchant pas les signaux, les agrégats journaliers
+et les compteurs des responsables sont reprogrammés explicitement.
+"""
+import hashlib
+import re
+from collections import defaultdict
+from datetime import datetime, time
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+
+from analytics_app import leaderboard, rollups
+from client.dedupe import jetons
+from client.importers import convertir, lire
+
+from .models import Facture, LigneReleve, ReleveBancaire
+from .relances import STATUTS_OUVERTS
+
+MAX_CANDIDATS = 10
+MAX_MOTS_NOM = 4
+
+COLONNES = {
+    'date': 'date', 'date_operation': 'date', 'date_valeur': 'date', 'date_comptable': 'date',
+    'libelle': 'libelle', 'description': 'libelle', 'intitule': 'libelle', 'label': 'libelle',
+    'reference': 'reference', 'ref': 'reference', 'fitid': 'reference',
+    'montant': 'montant', 'amount': 'montant', 'credit': 'credit', 'debit': 'debit',
+}
+
+
+# ---------------------------------------------------------------------------
+# Lecture
+# ---------------------------------------------------------------------------
+
+def montant(valeur):
+    """« 1 234 567,50 FCFA » -> Decimal('1234567.50') ; None si vide."""
+    if valeur in (None, ''):
+        return None
+    if isinstance(valeur, (int, float, Decimal)):
+        return Decimal(str(valeur)).quantize(Decimal('0.01'))
+    texte = re.sub(r'[^\d,.\-]', '', str(valeur))
+    if ',' in texte and '.' in texte:
+        texte = texte.replace('.', '').replace(',', '.') if texte.rfind(',') > texte.rfind('.') else texte.replace(',', '')
+    else:
+        texte = texte.replace(',', '.')
+    try:
+        return Decimal(texte).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise ValueError(f"Montant invalide : {valeur}")
+
+
+def _lire_ofx(contenu):
+    """Transactions d'un fichier OFX (SGML ou XML) : blocs <STMTTRN>."""
+    for bloc in re.split(r'<STMTTRN>', contenu, flags=re.IGNORECASE)[1:]:
+        bloc = re.split(r'</STMTTRN>', bloc, flags=re.IGNORECASE)[0]
+        balises = {nom.upper(): valeur.strip() for nom, valeur in re.findall(r'<(\w+)>([^<\r\n]*)', bloc)}
+        date = balises.get('DTPOSTED', '')[:8]
+        yield {
+            'date': f"{date[:4]}-{date[4:6]}-{date[6:8]}" if len(date) == 8 else '',
+            'libelle': ' '.join(filter(None, [balises.get('NAME'), balises.get('MEMO')])),
+            'reference': balises.get('FITID', ''),
+            'montant': balises.get('TRNAMT'),
+        }
+
+
+def _lire_tableau(fichier, nom_fichier):
+    lignes = lire(fichier, nom_fichier)
+    entetes = set(next(lignes))
+    champs = {COLONNES[entete] for entete in entetes if entete in COLONNES}
+    if 'date' not in champs or not champs & {'montant', 'credit'}:
+        raise ValueError("Colonnes obligatoires : date et montant (ou crédit / débit).")
+    for _numero, ligne in lignes:
+        valeurs = {}
+        for colonne, champ in COLONNES.items():
+            if colonne in ligne and champ not in valeurs:
+                valeurs[champ] = ligne[colonne]
+        if 'montant' not in valeurs:
+            valeurs['montant'] = (montant(valeurs.get('credit')) or 0) - (montant(valeurs.get('debit')) or 0)
+        yield valeurs
+
+
+def lire_releve(fichier, nom_fichier=''):
+    """
+    Lignes ``{date, libelle, reference, montant}`` du relevé ``fichier``
+    (binaire) ; le format est déduit de l'extension ou du contenu.
+
+    Raises:
+        ValueError: colonnes absentes, date ou montant illisible.
+    """
+    debut = fichier.read(512)
+    fichier.seek(0)
+    if str(nom_fichier).lower().endswith(('.ofx', '.qfx')) or b'<OFX' in debut.upper():
+        contenu = fichier.read()
+        try:
+            texte = contenu.decode('utf-8')
+        except UnicodeDecodeError:
+            texte = contenu.decode('latin-1')
+        brutes = _lire_ofx(texte)
+    else:
+        brutes = _lire_tableau(fichier, nom_fichier)
+
+    champ_date = LigneReleve._meta.get_field('date_operation')
+    for numero, brute in enumerate(brutes, start=1):
+        try:
+            date = convertir(champ_date, brute.get('date'))
+            valeur = montant(brute.get('montant'))
+        except ValueError as e:
+            raise ValueError(f"Ligne {numero} : {e}")
+        if date is None or valeur is None:
+            raise ValueError(f"Ligne {numero} : date et montant sont obligatoires.")
+        yield {
+            'date': date,
+            'libelle': str(brute.get('libelle') or '').strip()[:255],
+            'reference': str(brute.get('reference') or '').strip()[:100],
+            'montant': valeur,
+        }
+
+
+def _empreintes(lignes):
+    """Empreinte de chaque ligne ; les opérations identiques d'un même relevé sont numérotées."""
+    occurrences = defaultdict(int)
+    for ligne in lignes:
+        cle = f"{ligne['date']}|{ligne['montant']}|{ligne['libelle']}|{ligne['reference']}"
+        occurrences[cle] += 1
+        yield hashlib.sha256(f"{cle}|{occurrences[cle]}".encode()).hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Index des factures ouvertes
+# ---------------------------------------------------------------------------
+
+def compacter(texte):
+    return re.sub(r'[^A-Z0-9]', '', (texte or '').upper())
+
+
+def jetons_reference(libelle):
+    """Jetons d'un libellé : groupes « A/B-C » compactés et chacune de leurs parties."""
+    resultat = set()
+    for groupe in re.findall(r'[A-Z0-9]+(?:[/\-.][A-Z0-9]+)*', (libelle or '').upper()):
+        resultat.add(compacter(groupe))
+        resultat.update(re.split(r'[/\-.]', groupe))
+    return {jeton for jeton in resultat if len(jeton) >= 3}
+
+
+def _ngrammes(libelle):
+    mots = jetons(libelle)
+    return {
+        ' '.join(mots[debut:debut + taille])
+        for taille in range(1, MAX_MOTS_NOM + 1)
+        for debut in range(len(mots) - taille + 1)
+    }
+
+
+class IndexFactures:
+    """Factures ouvertes indexées par solde, jeton de référence, client et entité."""
+
+    def __init__(self, queryset=None):
+        queryset = queryset if queryset is not None else Facture.objects.filter(statut__in=STATUTS_OUVERTS)
+        self.factures = {}
+        self.par_montant = defaultdict(set)
+        self.par_reference = defaultdict(set)
+        self.par_client = defaultdict(set)
+        self.par_nom = defaultdict(set)
+        self.par_entite = defaultdict(set)
+        for facture in queryset.values(
+            'id', 'reference', 'montant_ttc', 'montant_paye', 'affaire__reference',
+            'affaire__offre__client__c_num', 'affaire__offre__client__nom', 'affaire__offre__entity__code',
+        ):
+            pk = facture['id']
+            facture['solde'] = facture['montant_ttc'] - facture['montant_paye']
+            self.factures[pk] = facture
+            self.par_montant[facture['solde']].add(pk)
+            for reference in (facture['reference'], facture['affaire__reference']):
+                if compacter(reference):
+                    self.par_reference[compacter(reference)].add(pk)
+            if facture['affaire__offre__client__c_num']:
+                self.par_client[compacter(facture['affaire__offre__client__c_num'])].add(pk)
+            nom = ' '.join(jetons(facture['affaire__offre__client__nom']))
+            if nom:
+                self.par_nom[nom].add(pk)
+            if facture['affaire__offre__entity__code']:
+                self.par_entite[compacter(facture['affaire__offre__entity__code'])].add(pk)
+
+    def _union(self, index, cles):
+        resultat = set()
+        for cle in cles:
+            resultat |= index.get(cle, set())
+        return resultat
+
+    def chercher(self, libelle, valeur, reference_banque=''):
+        """
+        Rapprochement d'un encaissement.
+
+        Returns:
+            tuple: (statut, facture_id ou None, motif, candidates)
+        """
+        cles = jetons_reference(f"{libelle} {reference_banque}")
+        par_montant = self.par_montant.get(valeur, set())
+        references = self._union(self.par_reference, cles)
+        clients = self._union(self.par_client, cles) | self._union(self.par_nom, _ngrammes(libelle))
+        entites = self._union(self.par_entite, cles)
+        if entites:
+            references = references & entites or references
+            clients = clients & entites or clients
+
+        if references:
+            exactes = references & par_montant
+            if len(exactes) == 1:
+                return 'RAPPROCHEE', next(iter(exactes)), 'reference+montant', []
+            return 'A_VERIFIER', None, 'reference', sorted(exactes or references)[:MAX_CANDIDATS]
+        if clients:
+            exactes = clients & par_montant
+            if len(exactes) == 1:
+                return 'RAPPROCHEE', next(iter(exactes)), 'client+montant', []
+            return 'A_VERIFIER', None, 'client', sorted(exactes or clients)[:MAX_CANDIDATS]
+        if par_montant:
+            return 'A_VERIFIER', None, 'montant', sorted(par_montant)[:MAX_CANDIDATS]
+        return 'NON_RAPPROCHEE', None, '', []
+
+
+# ---------------------------------------------------------------------------
+# Application des paiements
+# ---------------------------------------------------------------------------
+
+def appliquer_paiements(paiements, user=None):
+    """
+    Ajoute les encaissements ``{facture_id: (montant, date)}`` aux factures
+    en un ``bulk_update`` et reprogramme agrégats et compteurs.
+
+    Returns:
+        list: factures mises à jour.
+    """
+    if not paiements:
+        return []
+    factures = Facture.objects.select_for_update().in_bulk(list(paiements))
+    maintenant = timezone.now()
+    for pk, facture in factures.items():
+        valeur, date = paiements[pk]
+        facture.montant_paye += valeur
+        if facture.montant_paye >= facture.montant_ttc:
+            facture.statut = 'PAYEE'
+            facture.date_paiement = facture.date_paiement or timezone.make_aware(datetime.combine(date, time.min))
+        elif facture.montant_paye > 0:
+            facture.statut = 'PARTIELLEMENT_PAYEE'
+        if user is not None:
+            facture.updated_by = user
+        facture.updated_at = maintenant
+    Facture.objects.bulk_update(
+        factures.values(), ['montant_paye', 'statut', 'date_paiement', 'updated_by', 'updated_at']
+    )
+    for facture in factures.values():
+        for source, jours in rollups.jours_touches(facture).items():
+            rollups.planifier(source, jours)
+    leaderboard.planifier((set(), {facture.affaire_id for facture in factures.values()}))
+    return list(factures.values())
+
+
+def importer_releve(fichier, nom_fichier='', user=None, compte=''):
+    """
+    Importe un relevé et rapproche ses encaissements.
+
+    Raises:
+        ValueError: fichier illisible.
+
+    Returns:
+        tuple: (relevé ou None si rien de nouveau, rapport)
+    """
+    lues = list(lire_releve(fichier, nom_fichier))
+    credits = [ligne for ligne in lues if ligne['montant'] > 0]
+    for ligne, empreinte in zip(credits, _empreintes(credits)):
+        ligne['empreinte'] = empreinte
+    existantes = set(
+        LigneReleve.objects.filter(empreinte__in=[ligne['empreinte'] for ligne in credits])
+        .values_list('empreinte', flat=True)
+    )
+    nouvelles = [ligne for ligne in credits if ligne['empreinte'] not in existantes]
+    rapport = {
+        'lignes': len(lues),
+        'debits_ignores': len(lues) - len(credits),
+        'deja_importees': len(credits) - len(nouvelles),
+        'rapprochees': 0,
+        'a_verifier': 0,
+        'non_rapprochees': 0,
+    }
+    if not nouvelles:
+        return None, rapport
+
+    index = IndexFactures()
+    with transaction.atomic():
+        releve = ReleveBancaire.objects.create(nom_fichier=str(nom_fichier)[:255], compte=compte, created_by=user)
+        objets, paiements = [], {}
+        for ligne in nouvelles:
+            statut, facture_id, motif, candidats = index.chercher(ligne['libelle'], ligne['montant'], ligne['reference'])
+            if facture_id in paiements:
+                # Deux encaissements pour la même facture dans un relevé : pas de
+                # second rapprochement (la facture, soldée, est écartée plus bas)
+                statut, candidats, facture_id = 'A_VERIFIER', [facture_id], None
+            if facture_id is not None:
+                paiements[facture_id] = (ligne['montant'], ligne['date'])
+            objets.append(LigneReleve(
+                releve=releve,
+                date_operation=ligne['date'],
+                libelle=ligne['libelle'],
+                reference_banque=ligne['reference'],
+                montant=ligne['montant'],
+                empreinte=ligne['empreinte'],
+                statut=statut,
+                facture_id=facture_id,
+                motif=motif,
+                candidats=candidats,
+            ))
+        # Les factures soldées par ce relevé ne sont plus des candidates
+        # plausibles ; sans candidate restante, la ligne n'est pas rapprochée
+        for objet in objets:
+            if objet.statut != 'A_VERIFIER':
+                continue
+            objet.candidats = [pk for pk in objet.candidats if pk not in paiements]
+            if not objet.candidats:
+                objet.statut, objet.motif = 'NON_RAPPROCHEE', ''
+        LigneReleve.objects.bulk_create(objets)
+        appliquer_paiements(paiements, user=user)
+
+        for objet in objets:
+            rapport[{'RAPPROCHEE': 'rapprochees', 'A_VERIFIER': 'a_verifier'}.get(objet.statut, 'non_rapprochees')] += 1
+        releve.nombre_lignes = len(objets)
+        releve.nombre_rapprochees = rapport['rapprochees']
+        releve.nombre_a_verifier = rapport['a_verifier']
+        releve.montant_total = sum((objet.montant for objet in objets), Decimal('0'))
+        releve.save(update_fields=['nombre_lignes', 'nombre_rapprochees', 'nombre_a_verifier', 'montant_total'])
+    return releve, rapport
+
+
+def _compter(releve_id):
+    releve = ReleveBancaire.objects.get(pk=releve_id)
+    lignes = releve.lignes.all()
+    releve.nombre_rapprochees = lignes.filter(statut='RAPPROCHEE').count()
+    releve.nombre_a_verifier = lignes.filter(statut='A_VERIFIER').count()
+    releve.save(update_fields=['nombre_rapprochees', 'nombre_a_verifier'])
+
+
+def valider(ligne_id, facture_id, user=None):
+    """
+    Rapproche manuellement une ligne « à vérifier » ou non rapprochée.
+
+    Raises:
+        ValueError: ligne déjà traitée ou facture non ouverte.
+    """
+    with transaction.atomic():
+        ligne = LigneReleve.objects.select_for_update().get(pk=ligne_id)
+        if ligne.statut in ('RAPPROCHEE', 'IGNOREE'):
+            raise ValueError("Cette ligne a déjà été traitée.")
+        if not Facture.objects.filter(pk=facture_id, statut__in=STATUTS_OUVERTS).exists():
+            raise ValueError("La facture doit être émise et non soldée.")
+        appliquer_paiements({facture_id: (ligne.montant, ligne.date_operation)}, user=user)
+        ligne.statut = 'RAPPROCHEE'
+        ligne.facture_id = facture_id
+        ligne.motif = 'manuel'
+        ligne.traite_par = user
+        ligne.traite_le = timezone.now()
+        ligne.save()
+        _compter(ligne.releve_id)
+    return ligne
+
+
+def ignorer(ligne_id, user=None):
+    """Écarte une ligne du rapprochement (encaissement sans facture)."""
+    with transaction.atomic():
+        ligne = LigneReleve.objects.select_for_update().get(pk=ligne_id)
+        if ligne.statut == 'RAPPROCHEE':
+            raise ValueError("Cette ligne est déjà rapprochée.")
+        ligne.statut = 'IGNOREE'
+        ligne.traite_par = user
+        ligne.traite_le = timezone.now()
+        ligne.save()
+        _compter(ligne.releve_id)
+    return ligne
@@ -0,0 +1,191 @@
+"""
+Balance âgée des créances et campagnes de relance des factures échues.
+
+La balance âgée est calculée en une requête : les soldes (TTC - payé) des
+factures ouvertes sont répartis par tranche de retard à l'aide de sommes
+conditionnelles sur ``date_echeance``, regroupées par client et/ou entité.
+
+Les relances sélectionnent les factures échues via l'index
+(statut, date_echeance), les regroupent par contact client et
+enregistrent les relances en masse (``bulk_create``) dans un ``LotRelance``.
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+from django.utils import timezone
+
+from .models import Facture, LotRelance, RelanceFacture
+
+STATUTS_OUVERTS = ['EMISE', 'IMPAYEE', 'PARTIELLEMENT_PAYEE']
+
+# (nom, retard minimum, retard maximum) en jours ; None = non borné
+TRANCHES = [
+    ('courant', None, 0),
+    ('retard_1_30', 1, 30),
+    ('retard_31_60', 31, 60),
+    ('retard_61_90', 61, 90),
+    ('retard_90_plus', 91, None),
+]
+
+DIMENSIONS = {
+    'client': ('client_id', 'affaire__offre__client_id', 'client_nom', 'affaire__offre__client__nom'),
+    'entity': ('entity_id', 'affaire__offre__entity_id', 'entity_code', 'affaire__offre__entity__code'),
+}
+
+SOLDE = ExpressionWrapper(F('montant_ttc') - F('montant_paye'), output_field=DecimalField(max_digits=15, decimal_places=2))
+
+
+def _debut_jour(jour):
+    return timezone.make_aware(datetime.combine(jour, time.min), timezone.get_current_timezone())
+
+
+def _filtre_tranche(date_reference, minimum, maximum):
+    """Condition sur date_echeance pour un retard compris entre minimum et maximum jours."""
+    if minimum is None:
+        # Non échue : pas d'échéance ou échéance à partir du jour de référence
+        return Q(date_echeance__isnull=True) | Q(date_echeance__gte=_debut_jour(date_reference))
+    condition = Q(date_echeance__lt=_debut_jour(date_reference - timedelta(days=minimum - 1)))
+    if maximum is not None:
+        condition &= Q(date_echeance__gte=_debut_jour(date_reference - timedelta(days=maximum)))
+    return condition
+
+
+def balance_agee(queryset=None, par=('client', 'entity'), date_reference=None):
+    """
+    Balance âgée des factures ouvertes de ``queryset``.
+
+    Args:
+        par: dimensions de regroupement parmi ``client`` et ``entity``.
+        date_reference (date): date d'arrêté (aujourd'hui par défaut).
+
+    Returns:
+        dict: ``lignes`` (une par combinaison, soldes par tranche) et ``totaux``.
+    """
+    for dimension in par:
+        if dimension not in DIMENSIONS:
+            raise ValueError(f"par doit contenir {', '.join(DIMENSIONS)}.")
+    date_reference = date_reference or timezone.localdate()
+    queryset = (queryset if queryset is not None else Facture.objects.all()).filter(statut__in=STATUTS_OUVERTS)
+
+    champs = {}
+    for dimension in par:
+        id_alias, id_chemin, libelle_alias, libelle_chemin = DIMENSIONS[dimension]
+        champs[id_alias] = F(id_chemin)
+        champs[libelle_alias] = F(libelle_chemin)
+    mesures = {
+        nom: Sum(SOLDE, filter=_filtre_tranche(date_reference, minimum, maximum))
+        for nom, minimum, maximum in TRANCHES
+    }
+    mesures['total'] = Sum(SOLDE)
+    mesures['nombre'] = Count('pk')
+
+    lignes = queryset.annotate(**champs).values(*champs).annotate(**mesures).order_by(*champs)
+
+    noms = [nom for nom, _minimum, _maximum in TRANCHES] + ['total']
+    totaux = {nom: Decimal('0') for nom in noms}
+    totaux['nombre'] = 0
+    resultat = []
+    for ligne in lignes:
+        for nom in noms:
+            ligne[nom] = ligne[nom] or Decimal('0')
+            totaux[nom] += ligne[nom]
+        totaux['nombre'] += ligne['nombre']
+        resultat.append(ligne)
+    return {
+        'date_reference': date_reference.isoformat(),
+        'par': list(par),
+        'tranches': [nom for nom, _minimum, _maximum in TRANCHES],
+        'lignes': resultat,
+        'totaux': totaux,
+    }
+
+
+def factures_a_relancer(date_reference=None, jours_retard_min=1, intervalle=7):
+    """
+    Factures ouvertes échues depuis au moins ``jours_retard_min`` jours et
+    non relancées depuis ``intervalle`` jours.
+    """
+    date_reference = date_reference or timezone.localdate()
+    limite = _debut_jour(date_reference - timedelta(days=max(jours_retard_min, 1) - 1))
+    return (
+        Facture.objects
+        .filter(statut__in=STATUTS_OUVERTS, date_echeance__lt=limite)
+        .exclude(relances__created_at__gte=_debut_jour(date_reference - timedelta(days=intervalle - 1)))
+        .annotate(solde=SOLDE)
+        .filter(solde__gt=0)
+    )
+
+
+def lancer_relances(user=None, date_reference=None, jours_retard_min=1, intervalle=7, simulation=False):
+    """
+    Crée un lot de relances pour les factures échues.
+
+    Les factures sont regroupées par (client, contact de l'offre) ; le niveau
+    de chaque relance est le nombre de relances précédentes de la facture + 1.
+    En ``simulation``, rien n'est écrit.
+
+    Returns:
+        tuple: (lot ou None, liste des groupes par destinataire).
+    """
+    date_reference = date_reference or timezone.localdate()
+    factures = list(
+        factures_a_relancer(date_reference, jours_retard_min, intervalle)
+        .values(
+            'pk', 'reference', 'date_echeance', 'solde',
+            client=F('affaire__offre__client_id'),
+            client_nom=F('affaire__offre__client__nom'),
+            contact=F('affaire__offre__contact_id'),
+        )
+        .order_by('affaire__offre__client_id', 'affaire__offre__contact_id', 'date_echeance')
+    )
+    niveaux = dict(
+        RelanceFacture.objects
+        .filter(facture_id__in=[facture['pk'] for facture in factures])
+        .values('facture_id')
+        .annotate(n=Count('pk'))
+        .values_list('facture_id', 'n')
+    )
+
+    groupes = {}
+    for facture in factures:
+        facture['niveau'] = niveaux.get(facture['pk'], 0) + 1
+        facture['jours_retard'] = (date_reference - timezone.localtime(facture['date_echeance']).date()).days
+        groupe = groupes.setdefault((facture['client'], facture['contact']), {
+            'client': facture['client'],
+            'client_nom': facture['client_nom'],
+            'contact': facture['contact'],
+            'factures': [],
+            'solde': Decimal('0'),
+            'niveau': 0,
+        })
+        groupe['factures'].append(facture['reference'])
+        groupe['solde'] += facture['solde']
+        groupe['niveau'] = max(groupe['niveau'], facture['niveau'])
+
+    if simulation or not factures:
+        return None, list(groupes.values())
+
+    with transaction.atomic():
+        lot = LotRelance.objects.create(
+            date_reference=date_reference,
+            jours_retard_min=jours_retard_min,
+            nombre_factures=len(factures),
+            nombre_destinataires=len(groupes),
+            montant_total=sum((facture['solde'] for facture in factures), Decimal('0')),
+            created_by=user,
+        )
+        RelanceFacture.objects.bulk_create([
+            RelanceFacture(
+                lot=lot,
+                facture_id=facture['pk'],
+                client_id=facture['client'],
+                contact_id=facture['contact'],
+                niveau=facture['niveau'],
+                jours_retard=facture['jours_retard'],
+                solde=facture['solde'],
+            )
+            for facture in factures
+        ], batch_size=500)
+    return lot, list(groupes.values())
@@ -1,7 +1,7 @@
 from rest_framework import serializers
 
 from offres_app.serializers import ClientLightSerializer
-from .models import Facture
+from .models import Facture, LigneReleve, LotRelance, ReleveBancaire
 from affaires_app.serializers import AffaireSerializer
 
 class FactureSerializer(serializers.ModelSerializer):
@@ -84,4 +84,45 @@ class FactureCreateSerializer(serializers.ModelSerializer):
         # Calculer automatiquement les montants TVA et TTC
         facture = Facture(**validated_data)
         facture.calculate_amounts()
-        return super().create(validated_data)
\ No newline at end of file
+        return super().create(validated_data)
+
+class LotRelanceSerializer(serializers.ModelSerializer):
+    created_by_name = serializers.CharField(source='created_by.get_full_name', read_only=True)
+
+    class Meta:
+        model = LotRelance
+        fields = [
+            'id', 'date_reference', 'jours_retard_min', 'nombre_factures',
+            'nombre_destinataires', 'montant_total', 'created_by', 'created_by_name', 'created_at'
+        ]
+        read_only_fields = fields
+
+
+class ReleveBancaireSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ReleveBancaire
+        fields = [
+            'id', 'nom_fichier', 'compte', 'nombre_lignes', 'nombre_rapprochees',
+            'nombre_a_verifier', 'montant_total', 'created_by', 'created_at'
+        ]
+        read_only_fields = fields
+
+
+class LigneReleveSerializer(serializers.ModelSerializer):
+    statut_display = serializers.CharField(source='get_statut_display', read_only=True)
+    facture_reference = serializers.CharField(source='facture.reference', read_only=True, default=None)
+    factures_candidates = serializers.SerializerMethodField()
+
+    class Meta:
+        model = LigneReleve
+        fields = [
+            'id', 'releve', 'date_operation', 'libelle', 'reference_banque', 'montant',
+            'statut', 'statut_display', 'facture', 'facture_reference', 'motif',
+            'candidats', 'factures_candidates', 'traite_par', 'traite_le'
+        ]
+        read_only_fields = fields
+
+    def get_factures_candidates(self, obj):
+        """Détail des candidates, chargé en une requête par la vue (contexte ``factures``)."""
+        factures = self.context.get('factures', {})
+        return [factures[pk] for pk in obj.candidats if pk in factures]
@@ -1,9 +1,11 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import FactureViewSet
+from .views import FactureViewSet, LigneReleveViewSet, ReleveBancaireViewSet
 
 router = DefaultRouter()
 router.register(r'factures', FactureViewSet)
+router.register(r'releves', ReleveBancaireViewSet)
+router.register(r'lignes-releve', LigneReleveViewSet)
 
 app_name = 'factures_api'
 
@@ -5,15 +5,25 @@ from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from django.utils.timezone import now
 from django.db.models import Sum, Count, Q
+from django.utils.dateparse import parse_date
 
+from analytics_app.timeseries import parametres_serie, serie_temporelle
+from document.cache import stale_while_revalidate
+from exports_app.mixins import ArchiveMixin, ExportMixin
 from factures_app.filters import FactureFilter
-from .models import Facture
-from .serializers import FactureSerializer, FactureDetailSerializer, FactureCreateSerializer
+from .models import Facture, LigneReleve, LotRelance, ReleveBancaire
+from .rapprochement import ignorer as ignorer_ligne, importer_releve, valider as valider_ligne
+from .relances import balance_agee as calculer_balance_agee, lancer_relances
+from .serializers import (
+    FactureSerializer, FactureDetailSerializer, FactureCreateSerializer, LigneReleveSerializer,
+    LotRelanceSerializer, ReleveBancaireSerializer,
+)
 
-class FactureViewSet(viewsets.ModelViewSet):
+class FactureViewSet(ArchiveMixin, ExportMixin, viewsets.ModelViewSet):
     """
     API endpoint pour gérer les factures.
     """
+    identity_map = True
     queryset = Facture.objects.all()
     
     serializer_class = FactureSerializer
@@ -33,7 +43,29 @@ class FactureViewSet(viewsets.ModelViewSet):
     search_fields = ['reference', 'affaire__reference', 'affaire__offre__client__nom', 'notes']
     ordering_fields = ['date_creation', 'date_emission', 'date_echeance', 'montant_ttc', 'reference']
     ordering = ['-date_creation']
-    
+    stats_dimensions = {
+        'statut': 'statut',
+        'entity': 'affaire__offre__entity__code',
+        'client': 'affaire__offre__client__nom',
+    }
+
+    export_filename = 'factures'
+    export_columns = [
+        ('Référence', 'reference'),
+        ('Affaire', 'affaire__reference'),
+        ('Client', 'affaire__offre__client__nom'),
+        ('Entité', 'affaire__offre__entity__code'),
+        ('Statut', 'statut'),
+        ('Date de création', 'date_creation'),
+        ("Date d'émission", 'date_emission'),
+        ("Date d'échéance", 'date_echeance'),
+        ('Date de paiement', 'date_paiement'),
+        ('Montant HT', 'montant_ht'),
+        ('Montant TVA', 'montant_tva'),
+        ('Montant TTC', 'montant_ttc'),
+        ('Montant payé', 'montant_paye'),
+    ]
+
     def get_serializer_class(self):
         if self.action == 'create' or self.action == 'update' or self.action == 'partial_update':
             return FactureCreateSerializer
@@ -158,54 +190,191 @@ class FactureViewSet(viewsets.ModelViewSet):
         })
     
     @action(detail=False, methods=['get'])
+    @stale_while_revalidate()
     def stats(self, request):
         """
         Statistiques sur les factures
         """
+        try:
+            parametres = parametres_serie(request.query_params, self.stats_dimensions)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = self.get_queryset()
+
         # Statistiques globales
-        total_count = self.get_queryset().count()
-        montant_total = self.get_queryset().aggregate(total=Sum('montant_ttc'))['total'] or 0
-        montant_paye = self.get_queryset().aggregate(total=Sum('montant_paye'))['total'] or 0
+        totaux = queryset.aggregate(
+            total_count=Count('id'),
+            montant_total=Sum('montant_ttc'),
+            montant_paye=Sum('montant_paye'),
+        )
+        total_count = totaux['total_count']
+        montant_total = totaux['montant_total'] or 0
+        montant_paye = totaux['montant_paye'] or 0
         
         # Statistiques par statut
-        stats_par_statut = self.get_queryset().values('statut').annotate(
+        stats_par_statut = queryset.values('statut').annotate(
             count=Count('id'),
             montant=Sum('montant_ttc')
         ).order_by('statut')
         
         # Factures en retard
-        factures_en_retard = self.get_queryset().filter(
+        factures_en_retard = queryset.filter(
             Q(statut='EMISE') | Q(statut='IMPAYEE'),
             date_echeance__lt=now()
         ).count()
         
-        # Statistiques par mois
-        current_year = now().year
-        stats_par_mois = []
-        
-        for month in range(1, 13):
-            month_data = self.get_queryset().filter(
-                date_creation__year=current_year,
-                date_creation__month=month
-            ).aggregate(
-                count=Count('id'),
-                montant=Sum('montant_ttc'),
-                paye=Sum('montant_paye')
-            )
-            
-            stats_par_mois.append({
-                'mois': month,
-                'count': month_data['count'] or 0,
-                'montant': float(month_data['montant'] or 0),
-                'paye': float(month_data['paye'] or 0)
-            })
+        # Série temporelle : une seule requête quelle que soit la période
+        serie = serie_temporelle(
+            queryset,
+            'date_creation',
+            {'count': Count('id'), 'montant': Sum('montant_ttc'), 'paye': Sum('montant_paye')},
+            **parametres
+        )
         
-        return Response({
+        data = {
             'total_count': total_count,
             'montant_total': float(montant_total),
             'montant_paye': float(montant_paye),
             'taux_recouvrement': float(montant_paye / montant_total) if montant_total > 0 else 0,
             'factures_en_retard': factures_en_retard,
             'stats_par_statut': stats_par_statut,
-            'stats_par_mois': stats_par_mois,
-        })
\ No newline at end of file
+            'serie': serie,
+        }
+        # Format historique conservé pour les séries mensuelles sans dimension
+        if serie['granularite'] == 'month' and not serie['dimension']:
+            data['stats_par_mois'] = [
+                dict(point, mois=int(point['periode'][5:7]))
+                for point in serie['series'][0]['points']
+            ]
+        return Response(data)
+
+    @action(detail=False, methods=['get'])
+    @stale_while_revalidate()
+    def balance_agee(self, request):
+        """
+        Balance âgée des créances : soldes par tranche de retard
+        (courant, 1-30, 31-60, 61-90, 90+ jours), par client et/ou entité.
+
+        Paramètres : ``par`` (client, entity ou client,entity) et ``date``.
+        """
+        par = [p for p in request.query_params.get('par', 'client,entity').split(',') if p]
+        date_reference = None
+        if request.query_params.get('date'):
+            date_reference = parse_date(request.query_params['date'])
+            if date_reference is None:
+                return Response({"detail": "date doit être au format AAAA-MM-JJ."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            data = calculer_balance_agee(
+                self.filter_queryset(self.get_queryset()), par=par, date_reference=date_reference
+            )
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(data)
+
+    @action(detail=False, methods=['get', 'post'])
+    def relances(self, request):
+        """
+        GET : derniers lots de relance.
+        POST : lance une campagne de relance des factures échues
+        (``jours_retard_min``, ``intervalle`` en jours, ``simulation``).
+        """
+        if request.method == 'GET':
+            lots = LotRelance.objects.select_related('created_by')[:50]
+            return Response(LotRelanceSerializer(lots, many=True).data)
+
+        try:
+            jours_retard_min = int(request.data.get('jours_retard_min', 1))
+            intervalle = int(request.data.get('intervalle', 7))
+        except (TypeError, ValueError):
+            return Response(
+                {"detail": "jours_retard_min et intervalle doivent être des entiers."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        simulation = str(request.data.get('simulation', '')).lower() in ('1', 'true', 'oui')
+        lot, destinataires = lancer_relances(
+            user=request.user, jours_retard_min=jours_retard_min,
+            intervalle=intervalle, simulation=simulation,
+        )
+        return Response({
+            'lot': LotRelanceSerializer(lot).data if lot else None,
+            'simulation': simulation,
+            'destinataires': destinataires,
+        }, status=status.HTTP_201_CREATED if lot else status.HTTP_200_OK)
+
+
+class ReleveBancaireViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Relevés bancaires importés. POST (multipart : ``fichier`` CSV, XLSX ou
+    OFX, ``compte``) importe un relevé et rapproche ses encaissements avec
+    les factures ouvertes.
+    """
+    queryset = ReleveBancaire.objects.all()
+    serializer_class = ReleveBancaireSerializer
+    permission_classes = [IsAuthenticated]
+    parser_classes = [parsers.MultiPartParser, parsers.FormParser, parsers.JSONParser]
+
+    def create(self, request):
+        fichier = request.FILES.get('fichier')
+        if fichier is None:
+            return Response({"detail": "Le fichier est requis."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            releve, rapport = importer_releve(
+                fichier, nom_fichier=fichier.name, user=request.user, compte=request.data.get('compte', '')
+            )
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'releve': ReleveBancaireSerializer(releve).data if releve else None,
+            'rapport': rapport,
+        }, status=status.HTTP_201_CREATED if releve else status.HTTP_200_OK)
+
+
+class LigneReleveViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Lignes de relevé ; ``?statut=A_VERIFIER`` donne la file de revue avec
+    le détail des factures candidates.
+    """
+    queryset = LigneReleve.objects.select_related('facture')
+    serializer_class = LigneReleveSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filterset_fields = ['statut', 'releve']
+    search_fields = ['libelle', 'reference_banque']
+    ordering_fields = ['date_operation', 'montant']
+
+    def get_serializer(self, *args, **kwargs):
+        if args and self.action in ('list', 'retrieve'):
+            lignes = args[0] if kwargs.get('many') else [args[0]]
+            ids = {pk for ligne in lignes for pk in ligne.candidats}
+            kwargs.setdefault('context', self.get_serializer_context())['factures'] = {
+                facture['id']: facture
+                for facture in Facture.objects.filter(pk__in=ids).values(
+                    'id', 'reference', 'statut', 'montant_ttc', 'montant_paye', 'affaire__offre__client__nom'
+                )
+            }
+        return super().get_serializer(*args, **kwargs)
+
+    @action(detail=True, methods=['post'])
+    def rapprocher(self, request, pk=None):
+        """Rapproche la ligne de la facture ``facture`` et enregistre le paiement."""
+        ligne = self.get_object()
+        try:
+            facture_id = int(request.data.get('facture'))
+        except (TypeError, ValueError):
+            return Response({"detail": "facture doit être un identifiant de facture."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            ligne = valider_ligne(ligne.pk, facture_id, user=request.user)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(LigneReleveSerializer(ligne).data)
+
+    @action(detail=True, methods=['post'])
+    def ignorer(self, request, pk=None):
+        """Écarte la ligne du rapprochement."""
+        ligne = self.get_object()
+        try:
+            ligne = ignorer_ligne(ligne.pk, user=request.user)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(LigneReleveSerializer(ligne).data)
@@ -0,0 +1,20 @@
+from analytics_app.pivot import annee, mois, register, trimestre
+
+from .models import Offre
+
+register(
+    'offres', Offre,
+    champ_date='date_creation',
+    dimensions={
+        'statut': 'statut',
+        'entity': 'entity__code',
+        'entity_nom': 'entity__name',
+        'client': 'client__nom',
+        'produit': 'produit_principal__code',
+        'departement': 'produit_principal__departement__code',
+        'mois': mois('date_creation'),
+        'trimestre': trimestre('date_creation'),
+        'annee': annee('date_creation'),
+    },
+    mesures={'montant': 'montant'},
+)
@@ -0,0 +1,206 @@
+"""
+Co-occurrence des produits et suggestions « souvent proposés ensemble ».
+
+Chaque offre (produits de ``OffreProduit`` et produit principal) et chaque
+opportunité (``produits`` et produit principal) forme un panier. La
+matrice produit × produit ``C`` compte les paniers contenant chaque paire ;
+sa diagonale compte les paniers contenant chaque produit. Elle est
+calculée par blocs de paniers (``X.T @ X`` sur la matrice d'incidence du
+bloc) et enregistrée dans un fichier ``.npz`` par la commande
+``construire_cooccurrences``, à lancer chaque nuit.
+
+Pour une paire (a, b) sur N paniers :
+
+- confiance(a → b) = C[a, b] / C[a, a]
+- lift(a, b) = C[a, b] × N / (C[a, a] × C[b, b])
+
+L'index en mémoire (``index()``) charge le fichier une fois par processus,
+le recharge lorsqu'il est régénéré, et sert les suggestions sans requête.
+La matrice est dense : le catalogue compte au plus quelques centaines de
+produits.
+"""
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from document.models import Product
+from opportunites_app.models import Opportunite
+
+from .models import Offre, OffreProduit
+
+TAILLE_BLOC = 4096
+
+# Nombre minimum de paniers communs pour qu'une paire soit suggérée
+MIN_COOCCURRENCES = 2
+
+# Suggestions précalculées par produit
+MAX_SUGGESTIONS = 20
+
+
+def chemin_fichier():
+    return Path(settings.COOCCURRENCE_PRODUITS_FICHIER)
+
+
+def _paniers():
+    """Liste des paniers (ensembles d'identifiants de produits)."""
+    paniers = {}
+    for offre_id, produit_id in OffreProduit.objects.values_list('offre_id', 'produit_id').iterator(chunk_size=5000):
+        paniers.setdefault(('offre', offre_id), set()).add(produit_id)
+    for offre_id, produit_id in Offre.objects.values_list('pk', 'produit_principal_id').iterator(chunk_size=5000):
+        paniers.setdefault(('offre', offre_id), set()).add(produit_id)
+
+    liens = Opportunite.produits.through.objects.values_list('opportunite_id', 'product_id')
+    for opportunite_id, produit_id in liens.iterator(chunk_size=5000):
+        paniers.setdefault(('opportunite', opportunite_id), set()).add(produit_id)
+    for opportunite_id, produit_id in Opportunite.objects.values_list('pk', 'produit_principal_id').iterator(chunk_size=5000):
+        paniers.setdefault(('opportunite', opportunite_id), set()).add(produit_id)
+    return [panier for panier in paniers.values() if panier]
+
+
+def construire(paniers=None):
+    """
+    Calcule la matrice de co-occurrence.
+
+    Returns:
+        dict: ``produits`` (identifiants), ``codes``, ``noms``, ``matrice``
+        (int32, produits × produits), ``paniers`` (N) et ``genere_le``.
+    """
+    if paniers is None:
+        paniers = _paniers()
+    catalogue = list(Product.objects.order_by('pk').values_list('pk', 'code', 'name'))
+    position = {pk: i for i, (pk, _code, _nom) in enumerate(catalogue)}
+    n = len(catalogue)
+
+    matrice = np.zeros((n, n), dtype=np.float64)
+    for debut in range(0, len(paniers), TAILLE_BLOC):
+        bloc = paniers[debut:debut + TAILLE_BLOC]
+        couples = np.array(
+            [(i, position[pk]) for i, panier in enumerate(bloc) for pk in panier if pk in position], dtype=np.intp
+        ).reshape(-1, 2)
+        incidence = np.zeros((len(bloc), n), dtype=np.float32)
+        incidence[couples[:, 0], couples[:, 1]] = 1.0
+        matrice += incidence.T @ incidence
+
+    return {
+        'produits': np.array([pk for pk, _code, _nom in catalogue], dtype=np.int64),
+        'codes': np.array([code for _pk, code, _nom in catalogue], dtype=str),
+        'noms': np.array([nom for _pk, _code, nom in catalogue], dtype=str),
+        'matrice': np.rint(matrice).astype(np.int32),
+        'paniers': np.int64(len(paniers)),
+        'genere_le': np.str_(timezone.now().isoformat()),
+    }
+
+
+def enregistrer(donnees, chemin=None):
+    """Écrit ``donnees`` de façon atomique (fichier temporaire puis renommage)."""
+    chemin = Path(chemin or chemin_fichier())
+    chemin.parent.mkdir(parents=True, exist_ok=True)
+    temporaire = chemin.with_name(chemin.name + '.tmp')
+    with open(temporaire, 'wb') as fichier:
+        np.savez_compressed(fichier, **donnees)
+    os.replace(temporaire, chemin)
+    return chemin
+
+
+class IndexCooccurrence:
+    """Scores et suggestions précalculés à partir d'une matrice de co-occurrence."""
+
+    def __init__(self, donnees, min_cooccurrences=MIN_COOCCURRENCES, max_suggestions=MAX_SUGGESTIONS):
+        self.produits = donnees['produits']
+        self.codes = donnees['codes']
+        self.noms = donnees['noms']
+        self.paniers = int(donnees['paniers'])
+        self.genere_le = str(donnees['genere_le'])
+        self.position = {int(pk): i for i, pk in enumerate(self.produits)}
+
+        matrice = donnees['matrice'].astype(np.float64)
+        self.frequences = np.diag(matrice).copy()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.confiance = np.nan_to_num(matrice / self.frequences[:, None])
+            self.lift = np.nan_to_num(matrice * self.paniers / np.outer(self.frequences, self.frequences))
+        np.fill_diagonal(self.confiance, 0.0)
+        np.fill_diagonal(self.lift, 0.0)
+        self.cooccurrences = matrice.astype(np.int64)
+        np.fill_diagonal(self.cooccurrences, 0)
+
+        # Meilleures suggestions par produit : confiance, puis lift décroissants
+        eligibles = self.cooccurrences >= min_cooccurrences
+        cle = np.where(eligibles, self.confiance, -1.0)
+        self.meilleurs = []
+        for i in range(len(self.produits)):
+            ordre = np.lexsort((-self.lift[i], -cle[i]))[:max_suggestions]
+            self.meilleurs.append(ordre[eligibles[i, ordre]])
+
+    def _produit(self, j):
+        return {'id': int(self.produits[j]), 'code': str(self.codes[j]), 'name': str(self.noms[j])}
+
+    def _suggestion(self, i, j):
+        return {
+            **self._produit(j),
+            'cooccurrences': int(self.cooccurrences[i, j]),
+            'confiance': round(float(self.confiance[i, j]), 4),
+            'lift': round(float(self.lift[i, j]), 4),
+        }
+
+    def suggestions(self, produit_id, limite=10):
+        """Produits les plus souvent proposés avec ``produit_id``."""
+        i = self.position.get(produit_id)
+        if i is None:
+            return []
+        return [self._suggestion(i, j) for j in self.meilleurs[i][:limite]]
+
+    def suggestions_panier(self, produit_ids, limite=10, min_cooccurrences=MIN_COOCCURRENCES):
+        """
+        Suggestions pour un panier de plusieurs produits : score = somme des
+        confiances depuis chaque produit du panier (produits du panier exclus).
+        """
+        indices = [self.position[pk] for pk in dict.fromkeys(produit_ids) if pk in self.position]
+        if not indices:
+            return []
+        if len(indices) == 1:
+            return self.suggestions(int(self.produits[indices[0]]), limite)
+        eligibles = (self.cooccurrences[indices] >= min_cooccurrences).any(axis=0)
+        score = np.where(self.cooccurrences[indices] >= min_cooccurrences, self.confiance[indices], 0.0).sum(axis=0)
+        eligibles[indices] = False
+        candidats = np.flatnonzero(eligibles)
+        candidats = candidats[np.argsort(-score[candidats], kind='stable')][:limite]
+        return [
+            {
+                **self._produit(j),
+                'score': round(float(score[j]), 4),
+                'cooccurrences': int(self.cooccurrences[indices, j].sum()),
+            }
+            for j in candidats
+        ]
+
+    def populaires(self, limite=10):
+        """Produits présents dans le plus grand nombre de paniers."""
+        ordre = np.argsort(-self.frequences, kind='stable')[:limite]
+        return [{**self._produit(j), 'paniers': int(self.frequences[j])} for j in ordre if self.frequences[j] > 0]
+
+
+_verrou = threading.Lock()
+_cache = {'mtime': None, 'index': None}
+
+
+def index():
+    """
+    Index du processus, rechargé si le fichier a été régénéré depuis le
+    dernier chargement. Retourne None si la matrice n'a jamais été construite.
+    """
+    chemin = chemin_fichier()
+    try:
+        mtime = chemin.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+    if _cache['mtime'] != mtime:
+        with _verrou:
+            if _cache['mtime'] != mtime:
+                with np.load(chemin) as donnees:
+                    _cache['index'] = IndexCooccurrence(donnees)
+                _cache['mtime'] = mtime
+    return _cache['index']
@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from offres_app.cooccurrence import construire, enregistrer
+
+
+class Command(BaseCommand):
+    help = "Construit la matrice de co-occurrence des produits (offres et opportunités)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fichier', help="Fichier .npz de sortie (COOCCURRENCE_PRODUITS_FICHIER par défaut)")
+
+    def handle(self, *args, **options):
+        debut = time.perf_counter()
+        donnees = construire()
+        chemin = enregistrer(donnees, options['fichier'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(donnees['produits'])} produit(s), {int(donnees['paniers'])} panier(s) "
+            f"-> {chemin} en {time.perf_counter() - debut:.2f} s"
+        ))
@@ -14,6 +14,7 @@ from .views import (
     EntityListView,
     OffreWonView,
     ProductListView,
+    ProduitSuggestionsView,
     OffreDraftView,
     OffreSubmitView,
     OffreStatusChangeView
@@ -29,6 +30,7 @@ urlpatterns = [
     
     # Endpoint d'initialisation pour la création d'offre
     path('offress/init_data/', OffreInitDataView.as_view(), name='offre-init-data'),
+    path('offress/suggestions_produits/', ProduitSuggestionsView.as_view(), name='offre-suggestions-produits'),
     
     # Clients et contacts
     path('clients/', ClientListView.as_view(), name='client-list'),
@@ -1,4 +1,6 @@
 # views.py
+import os
+
 from rest_framework import viewsets, generics, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
@@ -11,7 +13,9 @@ from rest_framework.decorators import action
 from client.models import Client, Contact
 from document.models import Entity, Product
 from document.utils import log_user_action
+from exports_app.mixins import ExportMixin
 
+from . import cooccurrence
 from .models import Offre
 from .serializers import (
     OffreSerializer, 
@@ -27,14 +31,28 @@ from .serializers import (
 )
 
 
-class OffreViewSet(viewsets.ModelViewSet):
+class OffreViewSet(ExportMixin, viewsets.ModelViewSet):
     """
     Viewset complet pour la gestion des offres (CRUD)
     """
     permission_classes = [IsAuthenticated]
+    identity_map = True
     queryset = Offre.objects.all().order_by('date_creation')
 
-
+    export_filename = 'offres'
+    export_columns = [
+        ('Référence', 'reference'),
+        ('Client', 'client__nom'),
+        ('Contact', 'contact__nom'),
+        ('Entité', 'entity__code'),
+        ('Produit principal', 'produit_principal__code'),
+        ('Statut', 'statut'),
+        ('Montant', 'montant'),
+        ('Date de création', 'date_creation'),
+        ("Date d'envoi", 'date_envoi'),
+        ('Date de validation', 'date_validation'),
+        ('Date de clôture', 'date_cloture'),
+    ]
 
     def get_serializer_class(self):
         if self.action in ['create', 'update', 'partial_update']:
@@ -166,12 +184,9 @@ class OffreInitDataView(APIView):
         clients = Client.objects.all().order_by('nom')
         entities = Entity.objects.all().order_by('code')
         
-        # Les produits les plus utilisés dans les offres récentes (top 10)
-        popular_products = Product.objects.annotate(
-            usage_count=Count('offres')
-        ).order_by('-usage_count')[:10]
         produits = Product.objects.all().order_by('code')
         contacts = Contact.objects.all().order_by('nom')
+        index_produits = cooccurrence.index()
         
         # Sérialisation des données
         data = {
@@ -179,12 +194,42 @@ class OffreInitDataView(APIView):
             'entities': EntitySerializer(entities, many=True).data,
             'produits': ProductSerializer(produits, many=True).data,
             'contacts': ContactSerializer(contacts, many=True).data,
-            
+            # Produits les plus proposés, lus dans l'index de co-occurrence
+            'produits_populaires': index_produits.populaires() if index_produits else [],
         }
         
         return Response(data)
 
 
+class ProduitSuggestionsView(APIView):
+    """
+    Produits souvent proposés avec ceux du formulaire d'offre.
+
+    ``produits`` : identifiants séparés par des virgules ; ``limite`` :
+    nombre de suggestions (10 par défaut). Servi depuis l'index de
+    co-occurrence en mémoire, sans requête.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            produits = [int(pk) for pk in request.query_params.get('produits', '').split(',') if pk.strip()]
+            limite = min(max(int(request.query_params.get('limite', 10)), 1), cooccurrence.MAX_SUGGESTIONS)
+        except ValueError:
+            return Response({"detail": "produits et limite doivent être des entiers."}, status=status.HTTP_400_BAD_REQUEST)
+        if not produits:
+            return Response({"detail": "Paramètre produits requis."}, status=status.HTTP_400_BAD_REQUEST)
+
+        index = cooccurrence.index()
+        if index is None:
+            return Response({'produits': produits, 'genere_le': None, 'suggestions': []})
+        return Response({
+            'produits': produits,
+            'genere_le': index.genere_le,
+            'suggestions': index.suggestions_panier(produits, limite),
+        })
+
+
 class ClientListView(generics.ListAPIView):
     """
     Liste des clients disponibles pour la création d'offre
@@ -405,7 +450,6 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
 from django.conf import settings
-import os
 from .models import Offre
 
 class OffreFileUploadView(views.APIView):
@@ -0,0 +1,23 @@
+from analytics_app.pivot import annee, mois, register, trimestre
+
+from .models import Opportunite
+
+register(
+    'opportunites', Opportunite,
+    champ_date='date_creation',
+    dimensions={
+        'statut': 'statut',
+        'entity': 'entity__code',
+        'client': 'client__nom',
+        'produit': 'produit_principal__code',
+        'responsable': 'responsable__username',
+        'mois': mois('date_creation'),
+        'trimestre': trimestre('date_creation'),
+        'annee': annee('date_creation'),
+    },
+    mesures={
+        'montant': 'montant',
+        'montant_estime': 'montant_estime',
+        'probabilite': 'probabilite',
+    },
+)
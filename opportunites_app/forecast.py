@@ -0,0 +1,218 @@
+"""
+Prévision Monte Carlo du chiffre d'affaires du pipeline.
+
+Les opportunités ouvertes sont chargées en tableaux NumPy (montant estimé,
+probabilité, mois de clôture attendu, groupe). Chaque simulation tire
+l'issue de toutes les opportunités d'un coup ; les gains sont ensuite
+cumulés par (groupe, mois) avec ``np.add.reduceat`` sur des opportunités
+triées par groupe puis par mois. Les simulations sont traitées par blocs
+pour borner la mémoire (bloc × opportunités en float32) ; 10 000
+opportunités × 10 000 simulations prennent environ 0,4 s.
+"""
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.utils import timezone
+
+from analytics_app.timeseries import debut_periode, periode_suivante
+from .models import Opportunite
+
+STATUTS_OUVERTS = ['PROSPECT', 'QUALIFICATION', 'PROPOSITION', 'NEGOCIATION']
+
+# Délai de clôture supposé (en jours) quand date_cloture_prevue est absente
+DELAIS_CLOTURE = {
+    'PROSPECT': 120,
+    'QUALIFICATION': 90,
+    'PROPOSITION': 45,
+    'NEGOCIATION': 20,
+}
+
+GROUPES = {
+    'entity': 'entity__code',
+    'responsable': 'responsable__username',
+}
+
+MAX_SIMULATIONS = 100000
+MAX_HORIZON = 36
+# Nombre de cellules (simulations × opportunités) traitées par bloc
+TAILLE_BLOC = 4_000_000
+
+
+def _probabilites(probabilites, statuts, par_statut):
+    """Probabilité saisie, sinon celle du statut ; ramenée dans [0, 1]."""
+    defaut = np.array([par_statut.get(statut, 0) for statut in statuts], dtype=np.float32)
+    return np.clip(np.where(probabilites > 0, probabilites, defaut) / 100.0, 0.0, 1.0).astype(np.float32)
+
+
+def _index_mois(dates_prevues, statuts, debut, horizon):
+    """Indice (0..horizon-1) du mois de clôture attendu ; -1 au-delà de l'horizon."""
+    aujourd_hui = timezone.localdate()
+    bornes = [debut]
+    for _ in range(horizon):
+        bornes.append(periode_suivante(bornes[-1], 'month'))
+    bornes = np.array(bornes, dtype='datetime64[D]')
+
+    dates = np.array([
+        prevue if prevue is not None else aujourd_hui + timedelta(days=DELAIS_CLOTURE.get(statut, 30))
+        for prevue, statut in zip(dates_prevues, statuts)
+    ], dtype='datetime64[D]')
+    # Une clôture prévue déjà dépassée est attendue dans le mois courant
+    dates = np.maximum(dates, bornes[0])
+    index = np.searchsorted(bornes, dates, side='right') - 1
+    index[index >= horizon] = -1
+    return index
+
+
+def charger(queryset, par=None, horizon=12):
+    """
+    Charge les opportunités ouvertes de ``queryset`` en tableaux.
+
+    Returns:
+        dict: montants, probabilites, mois, groupes (indices), cles (libellés
+        des groupes), hors_horizon, debut (date du premier mois).
+    """
+    champs = ['montant_estime', 'probabilite', 'statut', 'date_cloture_prevue']
+    if par:
+        champs.append(GROUPES[par])
+    lignes = list(queryset.filter(statut__in=STATUTS_OUVERTS).values_list(*champs))
+
+    debut = debut_periode(timezone.localdate(), 'month')
+    if lignes:
+        colonnes = list(zip(*lignes))
+    else:
+        colonnes = [()] * len(champs)
+    montants = np.array([float(m or 0) for m in colonnes[0]], dtype=np.float32)
+    probabilites = _probabilites(
+        np.array(colonnes[1], dtype=np.float32), colonnes[2], Opportunite.PROBABILITES_STATUT
+    )
+    mois = _index_mois(colonnes[3], colonnes[2], debut, horizon) if lignes else np.array([], dtype=np.int64)
+
+    if par:
+        cles, groupes = np.unique(np.array([str(c) if c is not None else '' for c in colonnes[4]], dtype=object),
+                                  return_inverse=True)
+        cles = [c or None for c in cles]
+    else:
+        cles, groupes = [None], np.zeros(len(lignes), dtype=np.int64)
+
+    dans_horizon = mois >= 0
+    return {
+        'montants': montants[dans_horizon],
+        'probabilites': probabilites[dans_horizon],
+        'mois': mois[dans_horizon],
+        'groupes': np.asarray(groupes, dtype=np.int64)[dans_horizon],
+        'cles': list(cles),
+        'hors_horizon': int((~dans_horizon).sum()),
+        'debut': debut,
+    }
+
+
+def simuler(montants, probabilites, mois, groupes, nb_groupes, horizon, simulations=10000, graine=None):
+    """
+    Simule le chiffre d'affaires mensuel par groupe.
+
+    Returns:
+        np.ndarray: tableau (simulations, nb_groupes, horizon) en float32.
+    """
+    resultat = np.zeros((simulations, nb_groupes, horizon), dtype=np.float32)
+    plat = resultat.reshape(simulations, nb_groupes * horizon)
+    cellules = groupes * horizon + mois
+
+    # Les issues certaines (0 % ou 100 %) ne sont pas tirées au sort
+    certaines = probabilites >= 1
+    if certaines.any():
+        fixe = np.zeros(nb_groupes * horizon, dtype=np.float32)
+        np.add.at(fixe, cellules[certaines], montants[certaines])
+        plat += fixe
+    aleatoires = (probabilites > 0) & ~certaines
+    montants, probabilites, cellules = montants[aleatoires], probabilites[aleatoires], cellules[aleatoires]
+    n = len(montants)
+    if n == 0:
+        return resultat
+
+    # Tri par cellule (groupe, mois) : chaque segment contigu alimente une cellule
+    ordre = np.argsort(cellules, kind='stable')
+    montants, probabilites, cellules = montants[ordre], probabilites[ordre], cellules[ordre]
+    debuts = np.flatnonzero(np.r_[True, cellules[1:] != cellules[:-1]])
+    cibles = cellules[debuts]
+
+    # Tirages sur 16 bits : quatre par mot de 64 bits du générateur,
+    # résolution de 1/65536 sur les probabilités
+    seuils = np.clip(probabilites * 65536, 1, 65535).astype(np.uint16)
+    generateur = np.random.default_rng(graine).bit_generator
+    bloc = max(1, TAILLE_BLOC // n)
+    gains = np.empty((min(bloc, simulations), n), dtype=np.float32)
+    for depart in range(0, simulations, bloc):
+        taille = min(bloc, simulations - depart)
+        tirages = generateur.random_raw(-(-taille * n // 4)).view(np.uint16)[:taille * n].reshape(taille, n)
+        np.multiply(tirages < seuils, montants, out=gains[:taille])
+        plat[depart:depart + taille, cibles] += np.add.reduceat(gains[:taille], debuts, axis=1)
+    return resultat
+
+
+def _bandes(valeurs, percentiles):
+    """Moyenne et percentiles sur l'axe des simulations, arrondis au centime."""
+    bandes = {'attendu': np.round(valeurs.mean(axis=0, dtype=np.float64), 2).tolist()}
+    quantiles = np.percentile(valeurs, percentiles, axis=0)
+    for p, q in zip(percentiles, quantiles):
+        bandes[f'p{p:g}'] = np.round(q.astype(np.float64), 2).tolist()
+    return bandes
+
+
+def prevision(queryset, par=None, horizon=12, simulations=10000, percentiles=(10, 50, 90), graine=None):
+    """
+    Prévision mensuelle du chiffre d'affaires de ``queryset``.
+
+    Args:
+        par (str): None, ``entity`` ou ``responsable``.
+        horizon (int): nombre de mois simulés à partir du mois courant.
+        simulations (int): nombre de tirages.
+        percentiles: bandes retournées en plus de l'espérance.
+        graine (int): graine du générateur, pour des résultats reproductibles.
+    """
+    if par is not None and par not in GROUPES:
+        raise ValueError(f"par doit valoir {', '.join(GROUPES)}.")
+    if not 1 <= horizon <= MAX_HORIZON:
+        raise ValueError(f"horizon doit être compris entre 1 et {MAX_HORIZON}.")
+    if not 1 <= simulations <= MAX_SIMULATIONS:
+        raise ValueError(f"simulations doit être compris entre 1 et {MAX_SIMULATIONS}.")
+    if any(not 0 <= p <= 100 for p in percentiles):
+        raise ValueError("Les percentiles doivent être compris entre 0 et 100.")
+
+    depart = time.perf_counter()
+    donnees = charger(queryset, par=par, horizon=horizon)
+    tirages = simuler(
+        donnees['montants'], donnees['probabilites'], donnees['mois'], donnees['groupes'],
+        len(donnees['cles']), horizon, simulations=simulations, graine=graine,
+    )
+
+    periodes = [donnees['debut']]
+    for _ in range(horizon - 1):
+        periodes.append(periode_suivante(periodes[-1], 'month'))
+
+    total = tirages.sum(axis=1)
+
+    def resume(valeurs):
+        return {
+            'mensuel': _bandes(valeurs, percentiles),
+            'cumul': _bandes(valeurs.sum(axis=1), percentiles),
+        }
+
+    resultat = {
+        'simulations': simulations,
+        'horizon': horizon,
+        'periodes': [p.isoformat() for p in periodes],
+        'opportunites': len(donnees['montants']),
+        'hors_horizon': donnees['hors_horizon'],
+        'valeur_ponderee': round(float((donnees['montants'].astype(np.float64) * donnees['probabilites']).sum()), 2),
+        'total': resume(total),
+        'par': par,
+        'groupes': [],
+    }
+    if par:
+        resultat['groupes'] = [
+            {'cle': cle, **resume(tirages[:, index, :])}
+            for index, cle in enumerate(donnees['cles'])
+        ]
+    resultat['duree_ms'] = round((time.perf_counter() - depart) * 1000, 1)
+    return resultat
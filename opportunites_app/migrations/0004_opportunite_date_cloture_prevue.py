@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-18 22:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('opportunites_app', '0003_rename_commantaire_opportunite_commentaire'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='opportunite',
+            name='date_cloture_prevue',
+            field=models.DateField(blank=True, help_text='Date de clôture attendue, utilisée par la prévision du pipeline', null=True, verbose_name='Date de clôture prévue'),
+        ),
+    ]
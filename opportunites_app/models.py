@@ -140,6 +140,12 @@ class Opportunite(models.Model):
         null=True,
         verbose_name="Date de clôture"
     )
+    date_cloture_prevue = models.DateField(
+        blank=True,
+        null=True,
+        help_text="Date de clôture attendue, utilisée par la prévision du pipeline",
+        verbose_name="Date de clôture prévue"
+    )
     relance = models.DateTimeField(
         blank=True, 
         null=True,
@@ -1,5 +1,7 @@
 from rest_framework import permissions
 
+from document.permissions import memoize_for_request
+
 
 class OpportunitePermission(permissions.BasePermission):
     """
@@ -11,6 +13,13 @@ class OpportunitePermission(permissions.BasePermission):
       ou s'il a les permissions appropriées
     """
     
+    def _has_perm(self, request, perm):
+        """Permission Django mémorisée pour la durée de la requête."""
+        return memoize_for_request(
+            request, ('perm', request.user.pk, perm),
+            lambda: request.user.has_perm(perm)
+        )
+
     def has_permission(self, request, view):
         # Vérifier si l'utilisateur est authentifié
         if not request.user or not request.user.is_authenticated:
@@ -21,7 +30,7 @@ class OpportunitePermission(permissions.BasePermission):
             return True
         
         # Pour la méthode POST, l'utilisateur doit avoir la permission 'add_opportunite'
-        if request.method == 'POST' and not request.user.has_perm('opportunites_app.add_opportunite'):
+        if request.method == 'POST' and not self._has_perm(request, 'opportunites_app.add_opportunite'):
             return False
         
         # Pour les méthodes de liste et de lecture, pas de restrictions supplémentaires
@@ -39,22 +48,25 @@ class OpportunitePermission(permissions.BasePermission):
         # Les méthodes de lecture sont autorisées si l'utilisateur appartient à l'entité
         if request.method in permissions.SAFE_METHODS:
             # Vérifier si l'utilisateur est associé à l'entité de l'opportunité
-            user_entities = request.user.entities.all()
-            return obj.entity in user_entities
+            user_entities = memoize_for_request(
+                request, ('entities', request.user.pk),
+                lambda: set(request.user.entities.values_list('pk', flat=True))
+            )
+            return obj.entity_id in user_entities
         
         # Pour la mise à jour, l'utilisateur doit être le créateur
         # ou avoir la permission 'change_opportunite'
         if request.method in ['PUT', 'PATCH']:
-            if obj.created_by == request.user:
+            if obj.created_by_id == request.user.pk:
                 return True
-            return request.user.has_perm('opportunites_app.change_opportunite')
+            return self._has_perm(request, 'opportunites_app.change_opportunite')
         
         # Pour la suppression, l'utilisateur doit être le créateur
         # ou avoir la permission 'delete_opportunite'
         if request.method == 'DELETE':
-            if obj.created_by == request.user:
+            if obj.created_by_id == request.user.pk:
                 return True
-            return request.user.has_perm('opportunites_app.delete_opportunite')
+            return self._has_perm(request, 'opportunites_app.delete_opportunite')
         
         # Pour les actions personnalisées (transitions d'état)
         if view.action in ['qualifier', 'proposer', 'negocier', 'gagner', 'perdre', 'creer_offre']:
@@ -69,12 +81,12 @@ class OpportunitePermission(permissions.BasePermission):
             }
             
             # Le créateur a toujours le droit d'effectuer ces actions
-            if obj.created_by == request.user:
+            if obj.created_by_id == request.user.pk:
                 return True
             
             # Sinon, vérifier les permissions spécifiques
             permission = action_permissions.get(view.action)
             if permission:
-                return request.user.has_perm(permission)
+                return self._has_perm(request, permission)
         
         return False
\ No newline at end of file
@@ -39,7 +39,7 @@ class OpportuniteSerializer(serializers.ModelSerializer):
             'entity', 'entity_code', 'produit_principal', 'produit_principal_nom',
             'statut', 'statut_display', 'montant', 'montant_estime', 'probabilite', 
             'valeur_ponderee', 'date_creation', 'date_modification', 'date_cloture',
-            'relance', 'created_by', 'created_by_nom', 'necessite_relance'
+            'date_cloture_prevue', 'relance', 'created_by', 'created_by_nom', 'necessite_relance'
         ]
         read_only_fields = ['reference', 'valeur_ponderee', 'created_by', 'necessite_relance']
 
@@ -74,7 +74,7 @@ class OpportuniteCreateSerializer(serializers.ModelSerializer):
         fields = [
             'client', 'contact', 'entity', 'produit_principal', 'produits',
             'montant', 'montant_estime', 'description', 'besoins_client',
-            'relance', 'statut'
+            'relance', 'date_cloture_prevue', 'statut'
         ]
     
     def validate(self, data):
@@ -114,8 +114,8 @@ class OpportuniteUpdateSerializer(serializers.ModelSerializer):
         model = Opportunite
         fields = [
             'montant', 'montant_estime', 'probabilite', 'description', 
-            'besoins_client', 'relance', 'contact', 'produit_principal', 
-            'produits'
+            'besoins_client', 'relance', 'date_cloture_prevue', 'contact',
+            'produit_principal', 'produits'
         ]
     
     def validate(self, data):
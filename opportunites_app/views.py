@@ -6,6 +6,9 @@ from django_filters.rest_framework import DjangoFilterBackend
 from django.utils.timezone import now
 from django.db.models import Sum, Count, Q
 
+from document.cache import stale_while_revalidate
+from exports_app.mixins import ExportMixin
+from .forecast import prevision as prevision_pipeline
 from .models import Opportunite
 from .serializers import (
     OpportuniteSerializer, 
@@ -19,7 +22,7 @@ from .filters import OpportuniteFilter
 from .permissions import OpportunitePermission
 
 
-class OpportuniteViewSet(viewsets.ModelViewSet):
+class OpportuniteViewSet(ExportMixin, viewsets.ModelViewSet):
     """
     API pour la gestion des opportunités commerciales.
     
@@ -33,7 +36,23 @@ class OpportuniteViewSet(viewsets.ModelViewSet):
     search_fields = ['reference', 'client__nom', 'description', 'besoins_client']
     ordering_fields = ['date_creation', 'date_modification', 'montant_estime', 'probabilite', 'statut']
     ordering = ['-date_creation']
-    
+
+    export_filename = 'opportunites'
+    export_columns = [
+        ('Référence', 'reference'),
+        ('Client', 'client__nom'),
+        ('Contact', 'contact__nom'),
+        ('Entité', 'entity__code'),
+        ('Produit principal', 'produit_principal__code'),
+        ('Responsable', 'responsable__username'),
+        ('Statut', 'statut'),
+        ('Montant estimé', 'montant_estime'),
+        ('Probabilité', 'probabilite'),
+        ('Date de création', 'date_creation'),
+        ('Clôture prévue', 'date_cloture_prevue'),
+        ('Date de clôture', 'date_cloture'),
+    ]
+
     def get_serializer_class(self):
         """
         Retourne le serializer approprié en fonction de l'action.
@@ -222,6 +241,7 @@ class OpportuniteViewSet(viewsets.ModelViewSet):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
     @action(detail=False, methods=['get'])
+    @stale_while_revalidate()
     def statistics(self, request):
         """
         Retourne des statistiques sur les opportunités.
@@ -259,6 +279,28 @@ class OpportuniteViewSet(viewsets.ModelViewSet):
         })
 
 
+    @action(detail=False, methods=['get'])
+    @stale_while_revalidate()
+    def prevision(self, request):
+        """
+        Prévision Monte Carlo du chiffre d'affaires des opportunités ouvertes.
+
+        Paramètres : ``par`` (entity, responsable), ``horizon`` (mois),
+        ``simulations``, ``percentiles`` (ex. 10,50,90) et ``graine``.
+        """
+        params = request.query_params
+        try:
+            options = {
+                'par': params.get('par') or None,
+                'horizon': int(params.get('horizon', 12)),
+                'simulations': int(params.get('simulations', 10000)),
+                'percentiles': [float(p) for p in params.get('percentiles', '10,50,90').split(',') if p],
+                'graine': int(params['graine']) if params.get('graine') else None,
+            }
+            return Response(prevision_pipeline(self.filter_queryset(self.get_queryset()), **options))
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
 class OpportuniteTransitionViewSet(viewsets.GenericViewSet):
     """
     API pour effectuer des transitions d'état groupées sur plusieurs opportunités.
@@ -0,0 +1,21 @@
+from analytics_app.pivot import annee, mois, register, trimestre
+
+from .models import Proforma
+
+register(
+    'proformas', Proforma,
+    champ_date='date_creation',
+    dimensions={
+        'statut': 'statut',
+        'entity': 'offre__entity__code',
+        'client': 'offre__client__nom',
+        'produit': 'offre__produit_principal__code',
+        'mois': mois('date_creation'),
+        'trimestre': trimestre('date_creation'),
+        'annee': annee('date_creation'),
+    },
+    mesures={
+        'montant_ht': 'montant_ht',
+        'montant_ttc': 'montant_ttc',
+    },
+)
@@ -4,13 +4,19 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from django.utils.timezone import now
+from django.db.models import Count, Q
+
+from analytics_app.timeseries import parametres_serie, serie_temporelle
+from document.cache import stale_while_revalidate
+from exports_app.mixins import ExportMixin
 from .models import Proforma
 from .serializers import ProformaSerializer, ProformaDetailSerializer, ProformaCreateSerializer
 
-class ProformaViewSet(viewsets.ModelViewSet):
+class ProformaViewSet(ExportMixin, viewsets.ModelViewSet):
     """
     API endpoint pour gérer les proformas.
     """
+    identity_map = True
     queryset = Proforma.objects.all().select_related(
         'offre', 'offre__client', 'offre__entity', 'created_by', 'updated_by'
     )
@@ -27,7 +33,27 @@ class ProformaViewSet(viewsets.ModelViewSet):
     search_fields = ['reference', 'offre__reference', 'offre__client__nom', 'notes']
     ordering_fields = ['date_creation', 'date_validation', 'montant_ttc', 'reference']
     ordering = ['-date_creation']
-    
+    stats_dimensions = {
+        'statut': 'statut',
+        'entity': 'offre__entity__code',
+        'client': 'offre__client__nom',
+    }
+
+    export_filename = 'proformas'
+    export_columns = [
+        ('Référence', 'reference'),
+        ('Offre', 'offre__reference'),
+        ('Client', 'offre__client__nom'),
+        ('Entité', 'offre__entity__code'),
+        ('Statut', 'statut'),
+        ('Date de création', 'date_creation'),
+        ('Date de validation', 'date_validation'),
+        ("Date d'expiration", 'date_expiration'),
+        ('Montant HT', 'montant_ht'),
+        ('Montant TVA', 'montant_tva'),
+        ('Montant TTC', 'montant_ttc'),
+    ]
+
     def get_serializer_class(self):
         if self.action == 'create' or self.action == 'update' or self.action == 'partial_update':
             return ProformaCreateSerializer
@@ -130,39 +156,53 @@ class ProformaViewSet(viewsets.ModelViewSet):
         })
     
     @action(detail=False, methods=['get'])
+    @stale_while_revalidate()
     def stats(self, request):
         """
         Statistiques sur les proformas
         """
-        total = self.get_queryset().count()
-        validated = self.get_queryset().filter(statut='VALIDE').count()
-        expired = self.get_queryset().filter(statut='EXPIRE').count()
-        
-        # Statistiques par mois (pour l'année en cours)
-        current_year = now().year
-        monthly_stats = []
+        try:
+            parametres = parametres_serie(request.query_params, self.stats_dimensions)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = self.get_queryset()
+        totaux = queryset.aggregate(
+            total=Count('id'),
+            validated=Count('id', filter=Q(statut='VALIDE')),
+            expired=Count('id', filter=Q(statut='EXPIRE')),
+        )
+        total = totaux['total']
+        validated = totaux['validated']
+        expired = totaux['expired']
         
-        for month in range(1, 13):
-            month_count = self.get_queryset().filter(
-                date_creation__year=current_year,
-                date_creation__month=month
-            ).count()
-            month_validated = self.get_queryset().filter(
-                statut='VALIDE',
-                date_validation__year=current_year,
-                date_validation__month=month
-            ).count()
-            
-            monthly_stats.append({
-                'month': month,
-                'count': month_count,
-                'validated': month_validated
-            })
+        # Deux séries (une requête chacune) : créations par date de création,
+        # validations par date de validation
+        serie = serie_temporelle(
+            queryset, 'date_creation', {'count': Count('id')}, **parametres
+        )
+        serie_validations = serie_temporelle(
+            queryset.filter(statut='VALIDE'), 'date_validation', {'validated': Count('id')}, **parametres
+        )
         
-        return Response({
+        data = {
             'total': total,
             'validated': validated,
             'expired': expired,
             'validation_rate': validated / total if total > 0 else 0,
-            'monthly_stats': monthly_stats
-        })
\ No newline at end of file
+            'serie': serie,
+            'serie_validations': serie_validations,
+        }
+        # Format historique conservé pour les séries mensuelles sans dimension
+        if serie['granularite'] == 'month' and not serie['dimension']:
+            data['monthly_stats'] = [
+                {
+                    'month': int(point['periode'][5:7]),
+                    'count': point['count'],
+                    'validated': point_valide['validated'],
+                }
+                for point, point_valide in zip(
+                    serie['series'][0]['points'], serie_validations['series'][0]['points']
+                )
+            ]
+        return Response(data)
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.4 on 2026-10-18 22:48
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('status_traking', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='statuschange',
+            name='status_trak_content_0f5f01_idx',
+        ),
+        migrations.AddIndex(
+            model_name='statuschange',
+            index=models.Index(fields=['content_type', 'object_id', 'date_changement'], name='status_trak_content_be2370_idx'),
+        ),
+    ]
@@ -2,6 +2,8 @@ from django.db import models, transaction
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.contrib.contenttypes.models import ContentType
+from django.db.models import F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, NullIf
 import json
 from datetime import datetime
 from django.conf import settings
@@ -27,7 +29,8 @@ class StatusChange(models.Model):
         verbose_name = "Historique de changement de statut"
         verbose_name_plural = "Historique des changements de statut"
         indexes = [
-            models.Index(fields=['content_type', 'object_id']),
+            # Historique d'un objet et recherche du dernier changement à une date (as_of)
+            models.Index(fields=['content_type', 'object_id', 'date_changement']),
             models.Index(fields=['date_changement']),
             models.Index(fields=['nouveau_statut']),
             models.Index(fields=['utilisateur']),
@@ -51,6 +54,57 @@ class StatusChange(models.Model):
             return None
 
 
+# Changements enregistrés par Affaire.assigner_responsable : pas des statuts
+PREFIXE_PSEUDO_STATUT = 'RESPONSABLE:'
+
+
+class StatusTrackingQuerySet(models.QuerySet):
+    """QuerySet des modèles à statut suivi."""
+
+    def as_of(self, moment, statut=None):
+        """
+        Objets existant à ``moment``, annotés de ``statut_a_date`` : le
+        nouveau statut du dernier StatusChange enregistré au plus tard à
+        ``moment`` (une sous-requête par objet, servie par l'index
+        (content_type, object_id, date_changement)).
+
+        Un objet sans historique avant ``moment`` prend l'ancien statut de
+        son premier changement ultérieur, à défaut son statut courant.
+
+        Args:
+            moment (date | datetime): une date désigne la fin de ce jour
+                (fuseau courant).
+            statut (str | list): ne garde que les objets dans ce ou ces statuts.
+
+        Exemple : ``Affaire.objects.as_of(date(2024, 12, 31), statut='EN_COURS')``
+        """
+        if not isinstance(moment, datetime):
+            moment = timezone.make_aware(
+                datetime.combine(moment, datetime.max.time()), timezone.get_current_timezone()
+            )
+        elif timezone.is_naive(moment):
+            moment = timezone.make_aware(moment, timezone.get_current_timezone())
+
+        historique = StatusChange.objects.filter(
+            content_type=ContentType.objects.get_for_model(self.model),
+            object_id=OuterRef('pk'),
+        ).exclude(nouveau_statut__startswith=PREFIXE_PSEUDO_STATUT)
+        dernier = historique.filter(date_changement__lte=moment).order_by('-date_changement', '-pk')
+        suivant = historique.filter(date_changement__gt=moment).order_by('date_changement', 'pk')
+
+        queryset = self.filter(date_creation__lte=moment).annotate(
+            statut_a_date=Coalesce(
+                Subquery(dernier.values('nouveau_statut')[:1]),
+                NullIf(Subquery(suivant.values('ancien_statut')[:1]), Value('')),
+                F('statut'),
+            )
+        )
+        if statut is not None:
+            statuts = [statut] if isinstance(statut, str) else list(statut)
+            queryset = queryset.filter(statut_a_date__in=statuts)
+        return queryset
+
+
 class StatusTrackingModel(models.Model):
     """
     Classe abstraite pour la gestion des statuts et le suivi des modifications.
@@ -84,6 +138,8 @@ class StatusTrackingModel(models.Model):
     
     # Dates spécifiques pour les changements de statut importants
     dates_statuts = models.JSONField(default=dict, blank=True, verbose_name="Dates des statuts")
+
+    objects = StatusTrackingQuerySet.as_manager()
     
     class Meta:
         abstract = True